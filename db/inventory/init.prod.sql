@@ -110,6 +110,20 @@ CREATE TABLE booked_seat (
     UNIQUE (flight_id, seat_row, seat_column)
 );
 
+-- Changes of the flights' seats availability, which let the flights service follow
+-- the availability of flights without querying all of them. Changes are only
+-- inserted, so recording a change does not lock the changed flight, and expire
+-- after a day.
+CREATE TABLE flight_availability_change (
+    id bigint PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    flight_id uuid NOT NULL REFERENCES flight (id) ON DELETE CASCADE,
+    changed_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX flight_availability_change_changed_at_idx
+    ON flight_availability_change (changed_at);
+CREATE INDEX flight_availability_change_flight_id_idx
+    ON flight_availability_change (flight_id, changed_at);
+
 
 /*
  * Create views
@@ -147,3 +161,76 @@ CREATE VIEW available_flight_seats_count AS
                    ON flight_cabin_class.aircraft_model_id = cabin_seats_count.aircraft_model_id
                    AND flight_cabin_class.cabin_class = cabin_seats_count.cabin_class
     WHERE cabin_seats_count.seat_count > 0;
+
+
+/*
+ * Create triggers
+ */
+
+CREATE FUNCTION record_flight_availability_change() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'flight' THEN
+        INSERT INTO flight_availability_change (flight_id) VALUES (NEW.id);
+    ELSIF TG_TABLE_NAME = 'booked_seat' THEN
+        IF TG_OP <> 'INSERT' THEN
+            INSERT INTO flight_availability_change (flight_id) VALUES (OLD.flight_id);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO flight_availability_change (flight_id) VALUES (NEW.flight_id);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'seat_map' THEN
+        -- The seats counts of all upcoming flights of the aircraft model change
+        IF TG_OP <> 'INSERT' THEN
+            INSERT INTO flight_availability_change (flight_id)
+                SELECT id FROM flight
+                WHERE aircraft_model_id = OLD.aircraft_model_id AND departure_time >= now();
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO flight_availability_change (flight_id)
+                SELECT id FROM flight
+                WHERE aircraft_model_id = NEW.aircraft_model_id AND departure_time >= now();
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE FUNCTION delete_expired_flight_availability_changes() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Deletes a bounded number of expired changes, and skips changes which are
+    -- being deleted by concurrent transactions instead of waiting for them
+    DELETE FROM flight_availability_change
+    WHERE id IN (
+        SELECT id FROM flight_availability_change
+        WHERE changed_at < clock_timestamp() - interval '1 day'
+        ORDER BY changed_at
+        LIMIT 100
+        FOR UPDATE SKIP LOCKED
+    );
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER record_flight_availability_change
+    AFTER INSERT OR UPDATE OF aircraft_model_id ON flight
+    FOR EACH ROW
+    EXECUTE FUNCTION record_flight_availability_change();
+
+CREATE TRIGGER record_flight_availability_change
+    AFTER INSERT OR UPDATE OF flight_id, cabin_class OR DELETE ON booked_seat
+    FOR EACH ROW
+    EXECUTE FUNCTION record_flight_availability_change();
+
+CREATE TRIGGER record_flight_availability_change
+    AFTER INSERT OR UPDATE OR DELETE ON seat_map
+    FOR EACH ROW
+    EXECUTE FUNCTION record_flight_availability_change();
+
+CREATE TRIGGER delete_expired_flight_availability_changes
+    AFTER INSERT ON flight_availability_change
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION delete_expired_flight_availability_changes();
@@ -0,0 +1,187 @@
+"""
+Inventory manager response data for the benchmarks, scaled up from the data used
+by the tests to realistic sizes.
+"""
+
+import logging
+from copy import deepcopy
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+tlv_airport: dict[str, Any] = {
+    "iata_code": "TLV",
+    "icao_code": "LLBG",
+    "name": "Ben Gurion Airport",
+    "subdivision_code": "IL-M",
+    "city": "Tel Aviv-Yafo",
+    "geo_location": {
+        "type": "Point",
+        "crs": {
+            "type": "name",
+            "properties": {"name": "urn:ogc:def:crs:EPSG::4326"},
+        },
+        "coordinates": [32.009444, 34.882778],
+    },
+}
+
+lax_airport: dict[str, Any] = {
+    "iata_code": "LAX",
+    "icao_code": "KLAX",
+    "name": "Los Angeles International Airport",
+    "subdivision_code": "US-CA",
+    "city": "Los Angeles",
+    "geo_location": {
+        "type": "Point",
+        "crs": {
+            "type": "name",
+            "properties": {"name": "urn:ogc:def:crs:EPSG::4326"},
+        },
+        "coordinates": [33.9425, -61.591944],
+    },
+}
+
+aircraft_model: dict[str, Any] = {
+    "icao_code": "B789",
+    "iata_code": "789",
+    "name": "Boeing 787-9 Dreamliner",
+}
+
+seat_maps: list[dict[str, Any]] = [
+    {"cabin_class": "F", "start_row": 1, "end_row": 8, "column_layout": "A-DG-K"},
+    {"cabin_class": "B", "start_row": 10, "end_row": 14, "column_layout": "AC-DFG-HK"},
+    {
+        "cabin_class": "E",
+        "start_row": 21,
+        "end_row": 28,
+        "column_layout": "ABC-DFG-HJK",
+    },
+    {
+        "cabin_class": "E",
+        "start_row": 29,
+        "end_row": 30,
+        "column_layout": "###-###-HJK",
+    },
+    {
+        "cabin_class": "E",
+        "start_row": 35,
+        "end_row": 36,
+        "column_layout": "ABC-###-HJK",
+    },
+    {
+        "cabin_class": "E",
+        "start_row": 37,
+        "end_row": 48,
+        "column_layout": "ABC-DFG-HJK",
+    },
+    {
+        "cabin_class": "E",
+        "start_row": 49,
+        "end_row": 50,
+        "column_layout": "###-DFG-###",
+    },
+]
+
+
+def service_flights_data(flights_count: int) -> dict[str, Any]:
+    """
+    Creates the data of a service with the given number of flights, as returned by
+    the inventory manager for the ``findFlights`` query.
+
+    :param flights_count: The number of flights of the service.
+    :return: The service's data.
+    """
+    departure_time = datetime(2019, 12, 31, 23, 5, tzinfo=timezone.utc)
+    flights = []
+    for i in range(flights_count):
+        flight_departure_time = departure_time + timedelta(minutes=i)
+        flights.append(
+            {
+                "id": str(UUID(int=i)),
+                "departure_terminal": "3",
+                "departure_time": flight_departure_time.isoformat(),
+                "arrival_terminal": "B",
+                "arrival_time": (
+                    flight_departure_time + timedelta(hours=14, minutes=55)
+                ).isoformat(),
+                "aircraft_model": dict(aircraft_model),
+                "available_seats_counts": [
+                    {
+                        "cabin_class": "E",
+                        "total_seats_count": 204,
+                        "available_seats_count": 151 - i % 151,
+                    },
+                    {
+                        "cabin_class": "B",
+                        "total_seats_count": 35,
+                        "available_seats_count": 16 - i % 16,
+                    },
+                    {
+                        "cabin_class": "F",
+                        "total_seats_count": 32,
+                        "available_seats_count": 20 - i % 20,
+                    },
+                ],
+            }
+        )
+    return {
+        "id": 1,
+        "origin_airport": deepcopy(tlv_airport),
+        "destination_airport": deepcopy(lax_airport),
+        "flights": flights,
+    }
+
+
+def flight_seats_data(booked_seats_ratio: float) -> dict[str, Any]:
+    """
+    Creates the seats data of a wide-body aircraft flight, as returned by the
+    inventory manager for the ``getFlightsSeats`` query.
+
+    :param booked_seats_ratio: The ratio of booked seats out of all of the seats of
+        the aircraft, between 0 and 1.
+    :return: The flight's seats data.
+    """
+    seats = [
+        {"seat_row": row, "seat_column": column}
+        for section in seat_maps
+        for row in range(section["start_row"], section["end_row"] + 1)
+        for column in section["column_layout"]
+        if column not in "-#"
+    ]
+    booked_seats_count = round(len(seats) * booked_seats_ratio)
+    return {
+        "id": str(UUID(int=0)),
+        "aircraft_model": aircraft_model | {"seat_maps": deepcopy(seat_maps)},
+        "booked_seats": seats[:booked_seats_count],
+    }
+
+
+def access_log_record() -> logging.LogRecord:
+    """
+    Creates a log record like those of the access log.
+    """
+    params = {
+        "host": "172.18.0.1",
+        "method": "GET",
+        "path": "/flight/eb2e5080-000e-440d-8242-46428e577ce5",
+        "duration": 3,
+        "responseCode": 200,
+    }
+    extra = {
+        "type": "access",
+        "startTime": "2022-01-15T20:36:10.409012Z",
+        "endTime": "2022-01-15T20:36:10.412635Z",
+        "port": 41234,
+        "httpVersion": "1.1",
+    }
+    record = logging.LogRecord(
+        name="flights.main",
+        level=logging.INFO,
+        pathname=__file__,
+        lineno=0,
+        msg="%(host)s - %(method)s %(path)s - %(responseCode)s (%(duration)sms)",
+        args=(params,),
+        exc_info=None,
+    )
+    record.extra = params | extra
+    return record
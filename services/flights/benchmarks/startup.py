@@ -0,0 +1,116 @@
+"""
+Benchmark of the service's cold start: the time to import the application, and the
+latency of the first request for the OpenAPI document, either generated on the
+request or prebuilt (see :mod:`flights.openapi`).
+
+Each measurement runs in a new interpreter, as a new pod would.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+project_path = Path(__file__).parents[1]
+
+_measure_script = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from flights import main, openapi
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+
+client = TestClient(main.app)
+request_start = time.perf_counter()
+if sys.argv[1] == "prebuilt":
+    openapi.load_openapi(main.app)
+response = client.get("/openapi.json")
+response.raise_for_status()
+request_end = time.perf_counter()
+
+print(json.dumps({"import": imported - start, "request": request_end - request_start}))
+"""
+
+
+@dataclass
+class StartupMeasurement:
+    import_time: float
+    """Time to import the application, in seconds."""
+    first_request_time: float
+    """Latency of the first request for the OpenAPI document, in seconds."""
+
+
+def measure_startup(prebuilt: bool, repeat: int) -> StartupMeasurement:
+    """
+    Measures the median cold start times of the given number of new interpreters.
+
+    :param prebuilt: Whether the prebuilt OpenAPI document is served.
+    :param repeat: The number of interpreters to measure.
+    :return: The median measurement.
+    """
+    env = {
+        "SKYLINE_INVENTORY_MANAGER_URL": "http://localhost:8080/v1/graphql"
+    } | os.environ
+    import_times: list[float] = []
+    request_times: list[float] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                _measure_script,
+                "prebuilt" if prebuilt else "generated",
+            ],
+            cwd=project_path,
+            env=env,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        times = json.loads(output.splitlines()[-1])
+        import_times.append(times["import"])
+        request_times.append(times["request"])
+    return StartupMeasurement(
+        import_time=statistics.median(import_times),
+        first_request_time=statistics.median(request_times),
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup",
+        description=(
+            "Measures the cold start of the service: the time to import the "
+            "application and the latency of the first request for the OpenAPI "
+            "document."
+        ),
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of interpreters to measure (default: 5)",
+    )
+    args = parser.parse_args(argv)
+
+    print(f"{'OpenAPI document':<18} {'Import':>10} {'First request':>15}")
+    for prebuilt in [False, True]:
+        result = measure_startup(prebuilt, args.repeat)
+        print(
+            f"{'prebuilt' if prebuilt else 'generated':<18} "
+            f"{result.import_time * 1000:>7.0f} ms "
+            f"{result.first_request_time * 1000:>12.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,278 @@
+"""
+Microbenchmarks of the conversion of inventory manager responses to the service's
+responses: parsing the models, dumping the response schemas and encoding to JSON,
+and of formatting log records.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+# The settings are required by the response schemas
+os.environ.setdefault(
+    "SKYLINE_INVENTORY_MANAGER_URL", "http://localhost:8080/v1/graphql"
+)
+
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+from flights import models, schemas  # noqa: E402
+from flights.config import JsonLogFormatter  # noqa: E402
+
+from .fixtures import (  # noqa: E402
+    access_log_record,
+    flight_seats_data,
+    service_flights_data,
+    tlv_airport,
+)
+
+baselines_path = Path(__file__).parent / "baselines.json"
+
+flights_counts = [1, 50, 500, 5000]
+booked_seats_ratios = [0.1, 0.9]
+
+
+@dataclass
+class Measurement:
+    time: float
+    """Time of a single operation, in seconds."""
+    peak_memory: int
+    """Peak memory allocated during a single operation, in bytes."""
+
+
+def create_benchmarks() -> dict[str, dict[str, Callable[[], Any]]]:
+    """
+    Creates the benchmarks, each with the stages to measure.
+
+    :return: The stages of each benchmark, by benchmark name and stage name.
+    """
+    benchmarks: dict[str, dict[str, Callable[[], Any]]] = {}
+
+    geo_location_data = tlv_airport["geo_location"]
+    benchmarks["geo_location"] = {
+        "parse": lambda: models.GeoLocation(**geo_location_data),
+    }
+
+    for flights_count in flights_counts:
+        flights_data = service_flights_data(flights_count)
+        service_flights = models.ServiceFlights(**flights_data)
+        flights_content = schemas.FlightsList.dump_model(service_flights)
+        benchmarks[f"flights_list[{flights_count}]"] = {
+            "parse": lambda d=flights_data: models.ServiceFlights(**d),
+            "dump": lambda m=service_flights: schemas.FlightsList.dump_model(m),
+            "encode": lambda c=flights_content: ORJSONResponse(c),
+            "total": lambda d=flights_data: ORJSONResponse(
+                schemas.FlightsList.dump_model(models.ServiceFlights(**d))
+            ),
+        }
+
+    for booked_seats_ratio in booked_seats_ratios:
+        seats_data = flight_seats_data(booked_seats_ratio)
+        flight_seats = models.FlightSeats(**seats_data)
+        seats_content = schemas.FlightSeats.dump_model(flight_seats)
+        name = f"flight_seats[{len(seats_data['booked_seats'])} booked]"
+        benchmarks[name] = {
+            "parse": lambda d=seats_data: models.FlightSeats(**d),
+            "dump": lambda m=flight_seats: schemas.FlightSeats.dump_model(m),
+            "encode": lambda c=seats_content: ORJSONResponse(c),
+            "total": lambda d=seats_data: ORJSONResponse(
+                schemas.FlightSeats.dump_model(models.FlightSeats(**d))
+            ),
+        }
+
+    record = access_log_record()
+    formatter = JsonLogFormatter()
+    fast_formatter = JsonLogFormatter(fast=True)
+    benchmarks["access_log_record"] = {
+        "format": lambda: formatter.format(record),
+        "fast": lambda: fast_formatter.format(record),
+    }
+
+    return benchmarks
+
+
+def measure(stage: Callable[[], Any], repeat: int) -> Measurement:
+    """
+    Measures the time and peak memory allocation of a single run of a stage.
+
+    The time is the best time of the given number of repeats, each running the stage
+    enough times to take at least 0.2 seconds.
+
+    :param stage: The stage to measure.
+    :param repeat: The number of times to repeat the time measurement.
+    :return: The stage's measurement.
+    """
+    timer = timeit.Timer(stage)
+    number, _ = timer.autorange()
+    time = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(time=time, peak_memory=peak_memory)
+
+
+def find_regressions(
+    results: dict[str, dict[str, Measurement]],
+    baselines: dict[str, dict[str, Measurement]],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> list[str]:
+    """
+    Compares the results of the benchmarks to their baselines.
+
+    :param results: The measurements of each stage, by benchmark and stage name.
+    :param baselines: The baseline measurements, by benchmark and stage name.
+        Stages without a baseline are not compared.
+    :param time_tolerance: The allowed relative increase in time, e.g. 0.5 for 50%.
+    :param memory_tolerance: The allowed relative increase in peak memory.
+    :return: A description of each regression.
+    """
+    regressions: list[str] = []
+    for benchmark, stages in results.items():
+        for stage, result in stages.items():
+            baseline = baselines.get(benchmark, {}).get(stage)
+            if baseline is None:
+                continue
+            if result.time > baseline.time * (1 + time_tolerance):
+                regressions.append(
+                    f"{benchmark} {stage}: time {format_time(result.time)} "
+                    f"exceeds baseline {format_time(baseline.time)}"
+                )
+            if result.peak_memory > baseline.peak_memory * (1 + memory_tolerance):
+                regressions.append(
+                    f"{benchmark} {stage}: peak memory "
+                    f"{format_memory(result.peak_memory)} exceeds baseline "
+                    f"{format_memory(baseline.peak_memory)}"
+                )
+    return regressions
+
+
+def load_baselines(path: Path) -> dict[str, dict[str, Measurement]]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    return {
+        benchmark: {stage: Measurement(**m) for stage, m in stages.items()}
+        for benchmark, stages in data.items()
+    }
+
+
+def save_baselines(path: Path, baselines: dict[str, dict[str, Measurement]]):
+    data = {
+        benchmark: {stage: asdict(m) for stage, m in stages.items()}
+        for benchmark, stages in baselines.items()
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n")
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-6:.2f} us"
+
+
+def format_memory(size: int) -> str:
+    for unit, scale in (("MiB", 1024**2), ("KiB", 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size} B"
+
+
+def format_change(value: float, baseline: float | None) -> str:
+    if not baseline:
+        return ""
+    return f"{(value - baseline) / baseline:+.0%}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=(
+            "Runs the conversion microbenchmarks, and compares them to the stored "
+            "baselines. Exits with a non-zero status if any stage regressed."
+        ),
+    )
+    parser.add_argument(
+        "-k",
+        dest="filter",
+        default="",
+        help="Only run benchmarks whose name contains this string",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of times to repeat each time measurement (default: 5)",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative increase in time over the baseline (default: 0.5)",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed relative increase in peak memory over the baseline "
+        "(default: 0.1)",
+    )
+    parser.add_argument(
+        "--baselines",
+        type=Path,
+        default=baselines_path,
+        help="Path of the baselines file (default: benchmarks/baselines.json)",
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="Store the results as the new baselines, instead of comparing them",
+    )
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    results: dict[str, dict[str, Measurement]] = {}
+
+    print(f"{'Benchmark':<28} {'Stage':<8} {'Time':>20} {'Peak memory':>22}")
+    for benchmark, stages in create_benchmarks().items():
+        if args.filter not in benchmark:
+            continue
+        results[benchmark] = {}
+        for stage_name, stage in stages.items():
+            result = measure(stage, args.repeat)
+            results[benchmark][stage_name] = result
+            baseline = baselines.get(benchmark, {}).get(stage_name)
+            time_change = format_change(result.time, baseline and baseline.time)
+            memory_change = format_change(
+                result.peak_memory, baseline and baseline.peak_memory
+            )
+            print(
+                f"{benchmark:<28} {stage_name:<8} "
+                f"{format_time(result.time):>12} {time_change:>7} "
+                f"{format_memory(result.peak_memory):>14} {memory_change:>7}"
+            )
+
+    if args.save:
+        save_baselines(args.baselines, baselines | results)
+        print(f"Saved baselines to {args.baselines}")
+        return 0
+
+    regressions = find_regressions(
+        results, baselines, args.time_tolerance, args.memory_tolerance
+    )
+    if regressions:
+        print("\nRegressions:", *regressions, sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
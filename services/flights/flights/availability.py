@@ -0,0 +1,347 @@
+import asyncio
+import itertools
+import json
+import logging
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID
+
+import websockets
+from pydantic.datetime_parse import parse_datetime
+from websockets.legacy.client import WebSocketClientProtocol
+
+from .models import Cabin, ServiceFlights
+
+log = logging.getLogger(__name__)
+
+GRAPHQL_WS_SUBPROTOCOL = "graphql-ws"
+
+_watch_flights_subscription = """subscription watchFlightsAvailability(
+  $from_time: timestamptz!
+  $to_time: timestamptz!
+) {
+  flight(where: { departure_time: { _gte: $from_time, _lte: $to_time } }) {
+    id
+    available_seats_counts {
+      cabin_class
+      total_seats_count
+      available_seats_count
+    }
+    availability_changes_aggregate {
+      aggregate {
+        max {
+          changed_at
+        }
+      }
+    }
+  }
+}
+"""
+
+_watch_changes_subscription = """subscription watchFlightsAvailabilityChanges(
+  $from_time: timestamptz!
+  $to_time: timestamptz!
+  $changed_after: timestamptz!
+) {
+  flight_availability_change(
+    where: {
+      changed_at: { _gt: $changed_after }
+      flight: { departure_time: { _gte: $from_time, _lte: $to_time } }
+    }
+  ) {
+    changed_at
+    flight {
+      id
+      available_seats_counts {
+        cabin_class
+        total_seats_count
+        available_seats_count
+      }
+    }
+  }
+}
+"""
+
+
+class AvailabilityMirror:
+    """
+    An in-memory mirror of the cabins availability of upcoming flights, kept current
+    by a live query subscription to the inventory manager over a single websocket.
+
+    The subscription uses the ``graphql-ws`` protocol of Apollo's
+    subscriptions-transport-ws, which is supported by Hasura. The mirror is loaded by
+    a subscription to the availability of all flights departing within the mirrored
+    time window, along with the time of the latest availability change of each
+    flight (see the inventory's ``flight_availability_change`` table). Afterwards,
+    the mirror subscribes only to the changes which are later than the latest
+    change received, and updates the changed flights. The subscription is restarted
+    whenever later changes are received, to move this cursor forward. The cursor is
+    moved back by an overlap, so that changes of transactions which were committed
+    out of order are not missed. The mirror is reloaded periodically to move the
+    time window forward, and the connection is reestablished after any error.
+
+    The mirror is only used while it is ready, i.e. while it is connected and after
+    the first message of a subscription was received. Flights which are not mirrored
+    should be looked up in the inventory manager as usual.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        days: int,
+        resubscribe_interval: float,
+        reconnect_delay: float,
+        cursor_overlap: float,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        """
+        Initializes the mirror, without connecting to the inventory manager.
+
+        :param url: The websocket URL of the inventory manager's GraphQL API.
+        :param days: The number of days, from the time of subscribing, in which the
+            departing flights are mirrored.
+        :param resubscribe_interval: The time between reloads of the whole mirror,
+            in seconds.
+        :param reconnect_delay: The time to wait before reconnecting after an error,
+            in seconds.
+        :param cursor_overlap: The time before the latest change received from which
+            changes are subscribed to again, in seconds.
+        :param clock: Returns the current time, used for the mirrored time window.
+        """
+        self.url = url
+        self.days = days
+        self.resubscribe_interval = resubscribe_interval
+        self.reconnect_delay = reconnect_delay
+        self.cursor_overlap = timedelta(seconds=cursor_overlap)
+        self._clock = clock
+        self._flights: dict[UUID, list[Cabin]] = {}
+        self._changed_at: datetime | None = None
+        self._ready = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the mirror is current and may be used.
+        """
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._flights) if self._ready else 0
+
+    def get(self, flight_id: UUID) -> list[Cabin] | None:
+        """
+        Gets the current cabins availability of a flight.
+
+        :param flight_id: The flight's ID.
+        :return: The cabins of the flight, or None if the mirror is not ready or the
+            flight is not mirrored.
+        """
+        if not self._ready:
+            return None
+        return self._flights.get(flight_id)
+
+    def apply(self, service_flights: ServiceFlights) -> ServiceFlights:
+        """
+        Replaces the cabins of a service's flights with their mirrored availability.
+
+        :param service_flights: The flights of a service. The given model is not
+            modified.
+        :return: The service's flights with their current availability, or the given
+            flights if the mirror is not ready.
+        """
+        if not self._ready:
+            return service_flights
+        flights = [
+            flight.copy(update={"cabins": cabins})
+            if (cabins := self._flights.get(flight.id)) is not None
+            else flight
+            for flight in service_flights.flights
+        ]
+        return service_flights.copy(update={"flights": flights})
+
+    def start(self):
+        """
+        Starts mirroring in the background, unless it was already started.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops mirroring, and closes the connection to the inventory manager.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._reset()
+
+    def _reset(self):
+        self._ready = False
+        self._flights = {}
+        self._changed_at = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._mirror()
+            except (
+                OSError,
+                websockets.WebSocketException,
+                LookupError,
+                ValueError,
+            ) as exc:
+                log.warning(
+                    "Availability mirror disconnected from %s: %s", self.url, exc
+                )
+            self._reset()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _mirror(self):
+        async with websockets.connect(
+            self.url, subprotocols=[GRAPHQL_WS_SUBPROTOCOL]
+        ) as websocket:
+            await websocket.send(json.dumps({"type": "connection_init", "payload": {}}))
+            message = await self._receive_message(websocket)
+            if message["type"] != "connection_ack":
+                raise ConnectionError(f"Connection was not acknowledged: {message}")
+            log.info("Availability mirror connected to %s", self.url)
+
+            subscription_ids = map(str, itertools.count(1))
+            loop = asyncio.get_running_loop()
+            while True:
+                # Reloads the whole mirror, to move the mirrored time window forward
+                self._changed_at = None
+                from_time = self._clock()
+                to_time = from_time + timedelta(days=self.days)
+                reload_time = loop.time() + self.resubscribe_interval
+                while (timeout := reload_time - loop.time()) > 0:
+                    subscription_id = next(subscription_ids)
+                    await self._subscribe(
+                        websocket, subscription_id, from_time, to_time
+                    )
+                    try:
+                        await asyncio.wait_for(
+                            self._receive_subscription(websocket, subscription_id),
+                            timeout=timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    await websocket.send(
+                        json.dumps({"id": subscription_id, "type": "stop"})
+                    )
+
+    async def _subscribe(
+        self,
+        websocket: WebSocketClientProtocol,
+        subscription_id: str,
+        from_time: datetime,
+        to_time: datetime,
+    ):
+        variables = {"from_time": from_time.isoformat(), "to_time": to_time.isoformat()}
+        if self._changed_at is None:
+            query = _watch_flights_subscription
+        else:
+            query = _watch_changes_subscription
+            changed_after = self._changed_at - self.cursor_overlap
+            variables["changed_after"] = changed_after.isoformat()
+        await websocket.send(
+            json.dumps(
+                {
+                    "id": subscription_id,
+                    "type": "start",
+                    "payload": {"query": query, "variables": variables},
+                }
+            )
+        )
+
+    async def _receive_subscription(
+        self, websocket: WebSocketClientProtocol, subscription_id: str
+    ):
+        """
+        Receives the messages of a subscription until a change later than the
+        subscription's cursor is received.
+        """
+        reload = self._changed_at is None
+        while True:
+            message = await self._receive_message(websocket)
+            if message.get("id") != subscription_id:
+                # Keep alive messages, or messages of a previous subscription
+                continue
+            if message["type"] == "data" and "errors" not in message["payload"]:
+                changed_at = self._changed_at
+                data = message["payload"]["data"]
+                if reload:
+                    self._reload(data["flight"])
+                else:
+                    self._update(data["flight_availability_change"])
+                if self._changed_at != changed_at:
+                    return
+            elif message["type"] == "complete":
+                raise ConnectionError("Subscription was completed by the server")
+            else:
+                raise ConnectionError(f"Subscription failed: {message}")
+
+    async def _receive_message(
+        self, websocket: WebSocketClientProtocol
+    ) -> dict[str, Any]:
+        message: dict[str, Any] = json.loads(await websocket.recv())
+        if message.get("type") == "connection_error":
+            raise ConnectionError(f"Connection failed: {message}")
+        return message
+
+    def _reload(self, flights_data: list[dict[str, Any]]):
+        """
+        Replaces the whole mirror with the availability of the mirrored flights.
+
+        :param flights_data: The flights received from the subscription, with the
+            time of their latest availability change, if any.
+        """
+        self._flights = {
+            UUID(flight_data["id"]): _parse_cabins(flight_data)
+            for flight_data in flights_data
+        }
+        self._changed_at = max(
+            (
+                parse_datetime(changed_at)
+                for flight_data in flights_data
+                if (
+                    changed_at := flight_data["availability_changes_aggregate"][
+                        "aggregate"
+                    ]["max"]["changed_at"]
+                )
+                is not None
+            ),
+            default=None,
+        )
+        self._ready = True
+        log.debug("Availability mirror loaded %d flights", len(self._flights))
+
+    def _update(self, changes_data: list[dict[str, Any]]):
+        """
+        Updates the availability of the changed flights in the mirror.
+
+        :param changes_data: The availability changes received from the
+            subscription, with the current availability of their flights.
+        """
+        for change_data in changes_data:
+            flight_data = change_data["flight"]
+            self._flights[UUID(flight_data["id"])] = _parse_cabins(flight_data)
+            changed_at = parse_datetime(change_data["changed_at"])
+            if self._changed_at is None or changed_at > self._changed_at:
+                self._changed_at = changed_at
+        log.debug(
+            "Availability mirror updated with %d changes of %d flights",
+            len(changes_data),
+            len(self._flights),
+        )
+
+
+def _parse_cabins(flight_data: dict[str, Any]) -> list[Cabin]:
+    return [Cabin(**c) for c in flight_data["available_seats_counts"]]
@@ -0,0 +1,214 @@
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStatistics:
+    """
+    Counters describing the usage of a cache.
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+@dataclass
+class _CacheEntry(Generic[V]):
+    value: V
+    size: int
+    expires_at: float
+    revalidate_until: float
+    stale_until: float
+
+
+@dataclass
+class CacheLookup(Generic[V]):
+    """
+    A fresh or stale entry found in a cache.
+    """
+
+    value: V
+    fresh: bool
+    """Whether the entry has not expired yet."""
+    revalidate: bool
+    """
+    Whether the entry has expired, but may still be used while it is revalidated
+    (stale-while-revalidate).
+    """
+
+
+class TtlLruCache(Generic[V]):
+    """
+    A bounded in-process cache with a time to live (TTL) for each entry.
+
+    The cache is bounded both by the number of entries and by the total (estimated)
+    size of its entries in bytes. When either bound is exceeded, the least recently
+    used entries are evicted. Expired entries are removed lazily, when accessed.
+
+    Entries may be kept after they expire for a stale window, in which they are
+    only returned by :meth:`lookup`, marked as stale.
+
+    The cache is not thread-safe, and is meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the cache.
+
+        :param max_entries: Maximum number of entries in the cache.
+            The cache is disabled if set to 0.
+        :param max_bytes: Maximum total size of the entries in the cache, in bytes.
+            The cache is disabled if set to 0.
+        :param clock: Clock function used to expire entries, in seconds.
+            Defaults to :func:`time.monotonic`.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.statistics = CacheStatistics()
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, _CacheEntry[V]] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        The total size of the entries in the cache, in bytes.
+        """
+        return self._size
+
+    def get(self, key: Hashable) -> V | None:
+        """
+        Gets the value of a fresh entry, and marks it as recently used.
+
+        :param key: The entry's key.
+        :return: The entry's value, or None if the entry is missing or expired.
+        """
+        lookup = self.lookup(key)
+        if lookup is None or not lookup.fresh:
+            return None
+        return lookup.value
+
+    def lookup(self, key: Hashable) -> CacheLookup[V] | None:
+        """
+        Looks up an entry, either fresh or stale, and marks it as recently used.
+
+        :param key: The entry's key.
+        :return: The entry, or None if the entry is missing or its stale window has
+            passed.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.statistics.misses += 1
+            return None
+        now = self._clock()
+        if entry.stale_until <= now:
+            self._remove(key)
+            self.statistics.expirations += 1
+            self.statistics.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.expires_at <= now:
+            self.statistics.stale_hits += 1
+            return CacheLookup(
+                entry.value, fresh=False, revalidate=now < entry.revalidate_until
+            )
+        self.statistics.hits += 1
+        return CacheLookup(entry.value, fresh=True, revalidate=False)
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        *,
+        ttl: float,
+        size: int,
+        stale_while_revalidate: float = 0.0,
+        stale_if_error: float = 0.0,
+    ):
+        """
+        Adds or replaces an entry in the cache, evicting the least recently used
+        entries if needed.
+
+        Entries which would never be fresh nor stale, or which are larger than the
+        maximum size of the cache, are not added.
+
+        :param key: The entry's key.
+        :param value: The entry's value.
+        :param ttl: The entry's time to live, in seconds.
+        :param size: The entry's estimated size, in bytes.
+        :param stale_while_revalidate: The time after the entry expires, in seconds,
+            in which it may be used while it is revalidated. Ignored if the TTL is not
+            positive.
+        :param stale_if_error: The time after the entry expires, in seconds, in which
+            it may be used if it cannot be revalidated.
+        """
+        if key in self._entries:
+            self._remove(key)
+        ttl = max(ttl, 0.0)
+        if ttl <= 0:
+            stale_while_revalidate = 0.0
+        stale_ttl = max(stale_while_revalidate, stale_if_error)
+        if ttl + stale_ttl <= 0 or self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        expires_at = self._clock() + ttl
+        self._entries[key] = _CacheEntry(
+            value,
+            size,
+            expires_at=expires_at,
+            revalidate_until=expires_at + stale_while_revalidate,
+            stale_until=expires_at + stale_ttl,
+        )
+        self._size += size
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.statistics.evictions += 1
+
+    def delete(self, key: Hashable):
+        """
+        Removes an entry from the cache, if it exists.
+
+        :param key: The entry's key.
+        """
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+
+def json_size(value: Any) -> int:
+    """
+    Estimates the size of a JSON compatible value by the length of its JSON encoding.
+
+    :param value: The value to estimate the size of.
+    :return: The estimated size of the value, in bytes.
+    """
+    return len(json.dumps(value, separators=(",", ":"), default=str))
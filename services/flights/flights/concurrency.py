@@ -0,0 +1,337 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from .exceptions import ServiceUnavailableException
+from .util import get_remaining_time
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent calls that share the same key, so that at most one call
+    per key is in flight at any time.
+
+    The first caller for a key starts the call, and every caller arriving while it is
+    still in flight awaits the same call and receives the same result (or exception).
+    Once the call completes the key is forgotten, so subsequent callers start a new
+    call - results are never reused after completion.
+
+    Note that all callers receive the same result object, which must therefore be
+    treated as read-only.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future[T]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Calls ``fn`` unless a call with the same key is already in flight, in which
+        case the result of the in-flight call is awaited instead.
+
+        Cancelling a caller does not cancel the shared call, as other callers may
+        still be waiting for it.
+
+        :param key: The key identifying identical calls.
+        :param fn: The function to call, returning an awaitable of the result.
+        :return: The result of the call.
+        """
+        call = self._calls.get(key)
+        if call is None or call.get_loop() is not asyncio.get_running_loop():
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda c: self._forget(key, c))
+        return await asyncio.shield(call)
+
+    def in_flight(self) -> int:
+        """
+        :return: The number of calls currently in flight.
+        """
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: asyncio.Future[Any]):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved, in case all callers were cancelled
+        if not call.cancelled():
+            call.exception()
+
+
+class BatchLoader(Generic[K, T]):
+    """
+    Collects concurrent loads of single keys, and loads them together with a single
+    call to a batch load function.
+
+    Keys are collected from the first load until the batch window elapses, or until
+    the batch reaches its maximum size, whichever comes first. Concurrent loads of
+    the same key within a batch share the same result.
+    """
+
+    def __init__(
+        self,
+        load_batch: Callable[[list[K]], Awaitable[dict[K, T]]],
+        *,
+        max_batch_size: int,
+        batch_window: float,
+    ):
+        """
+        Initializes the batch loader.
+
+        :param load_batch: The batch load function. Receives a list of unique keys,
+            and returns the loaded values by their keys. Keys missing from the
+            returned dictionary are loaded as None.
+        :param max_batch_size: The maximum number of keys to load in a single batch.
+        :param batch_window: The time to wait for more keys since the first key of a
+            batch was requested, in seconds.
+        """
+        self._load_batch = load_batch
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self._batch: dict[K, asyncio.Future[T | None]] = {}
+        self._dispatch_handle: asyncio.TimerHandle | None = None
+        self._loads: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> T | None:
+        """
+        Loads a single key as part of the next batch.
+
+        Cancelling a caller does not cancel the batch, as other callers may still be
+        waiting for it.
+
+        :param key: The key to load.
+        :return: The loaded value, or None if the key was not found.
+        """
+        loop = asyncio.get_running_loop()
+        future = self._batch.get(key)
+        if future is None or future.get_loop() is not loop:
+            if self._batch and next(iter(self._batch.values())).get_loop() is not loop:
+                # A batch of a previous event loop will never be dispatched
+                self._batch = {}
+                self._dispatch_handle = None
+            future = loop.create_future()
+            self._batch[key] = future
+            if len(self._batch) >= self.max_batch_size:
+                self._dispatch()
+            elif self._dispatch_handle is None:
+                self._dispatch_handle = loop.call_later(
+                    self.batch_window, self._dispatch
+                )
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+        batch, self._batch = self._batch, {}
+        if not batch:
+            return
+        load = asyncio.ensure_future(self._load(batch))
+        # Keep a reference to the task until it is done, so it is not garbage collected
+        self._loads.add(load)
+        load.add_done_callback(self._loads.discard)
+
+    async def _load(self, batch: dict[K, asyncio.Future[T | None]]):
+        try:
+            results = await self._load_batch(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+
+
+@dataclass
+class ConcurrencyLimiterStatistics:
+    """
+    Counters describing the usage of a concurrency limiter.
+    """
+
+    acquired: int = 0
+    queued: int = 0
+    rejected: int = 0
+    limit_increases: int = 0
+    limit_decreases: int = 0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent calls to an upstream dependency, adapting the
+    limit to the dependency's measured latency with additive increase,
+    multiplicative decrease (AIMD).
+
+    The limit is increased by one per round trip while the limit is in use and the
+    latency is within the tolerance of its long-term average, and decreased by the
+    backoff ratio (at most once per round trip) when the latency exceeds the
+    tolerance or a call is dropped, e.g. times out.
+
+    Calls beyond the limit wait in a bounded FIFO queue. Calls are rejected with
+    :class:`ServiceUnavailableException` when the queue is full, or when the deadline
+    of the current request passes while waiting, shedding the excess load instead of
+    piling it onto the overloaded dependency.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue_size: int,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.9,
+        smoothing: float = 0.05,
+        retry_after: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initializes the limiter.
+
+        :param initial_limit: The initial concurrency limit.
+        :param min_limit: The minimal concurrency limit.
+        :param max_limit: The maximal concurrency limit.
+        :param max_queue_size: The maximal number of calls waiting for the limit.
+            Calls beyond the limit are rejected immediately if set to 0.
+        :param latency_tolerance: The ratio between a call's latency and the
+            long-term average latency above which the dependency is considered
+            overloaded.
+        :param backoff_ratio: The ratio by which the limit is decreased.
+        :param smoothing: The weight of each latency in the long-term average.
+        :param retry_after: The time to wait before retrying a rejected call, in
+            seconds.
+        :param clock: Clock function used to space limit decreases, in seconds.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue_size = max_queue_size
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.retry_after = retry_after
+        self.statistics = ConcurrencyLimiterStatistics()
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._average_latency: float | None = None
+        self._last_decrease = -math.inf
+        self._clock = clock
+
+    @property
+    def limit(self) -> int:
+        """
+        The current concurrency limit.
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of calls currently holding the limit.
+        """
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """
+        The number of calls currently waiting for the limit.
+        """
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        """
+        Acquires the limit without waiting, e.g. for optional calls such as hedges.
+
+        :return: True if the limit was acquired, otherwise False.
+        """
+        if self._in_flight >= self.limit or self._waiters:
+            return False
+        self._in_flight += 1
+        self.statistics.acquired += 1
+        return True
+
+    async def acquire(self):
+        """
+        Acquires the limit, waiting in the queue if needed. Each acquisition must be
+        followed by a call to :meth:`release`.
+
+        :raises ServiceUnavailableException: If the queue is full, or the deadline of
+            the current request passed while waiting.
+        """
+        if self.try_acquire():
+            return
+        if len(self._waiters) >= self.max_queue_size:
+            self.statistics.rejected += 1
+            raise ServiceUnavailableException(self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.statistics.queued += 1
+        remaining = get_remaining_time()
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except asyncio.TimeoutError:
+            self.statistics.rejected += 1
+            raise ServiceUnavailableException(self.retry_after)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The limit was handed over just as the call was cancelled
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: float | None = None, *, dropped: bool = False):
+        """
+        Releases the limit, and adapts it to the outcome of the call.
+
+        :param latency: The latency of a successful call, in seconds, or None if the
+            call failed for a reason unrelated to the dependency's load.
+        :param dropped: Whether the call was dropped by the dependency, e.g. timed
+            out or was rejected, which indicates that it is overloaded.
+        """
+        in_flight = self._in_flight
+        self._in_flight -= 1
+        if dropped:
+            self._decrease(self._average_latency or 0)
+        elif latency is not None:
+            self._sample(latency, in_flight)
+        self._wake_waiters()
+
+    def _sample(self, latency: float, in_flight: int):
+        average = self._average_latency
+        self._average_latency = (
+            latency
+            if average is None
+            else average + self.smoothing * (latency - average)
+        )
+        if average is not None and latency > average * self.latency_tolerance:
+            self._decrease(latency)
+        elif in_flight * 2 >= self.limit and self._limit < self.max_limit:
+            self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+            self.statistics.limit_increases += 1
+
+    def _decrease(self, round_trip: float):
+        now = self._clock()
+        if now - self._last_decrease < round_trip:
+            return
+        self._last_decrease = now
+        self._limit = max(self._limit * self.backoff_ratio, self.min_limit)
+        self.statistics.limit_decreases += 1
+
+    def _wake_waiters(self):
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            self.statistics.acquired += 1
+            waiter.set_result(None)
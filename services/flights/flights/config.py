@@ -1,11 +1,24 @@
 import json
 import logging
+import queue
+import threading
 import time
+from contextlib import suppress
 from enum import Enum
 from functools import cache
-from typing import Any
+from typing import Any, TextIO
+from urllib.parse import urlsplit
 
-from pydantic import AnyHttpUrl, BaseModel, BaseSettings, Field
+import orjson
+from pydantic import (
+    AnyHttpUrl,
+    AnyUrl,
+    BaseModel,
+    BaseSettings,
+    Field,
+    PositiveFloat,
+    validator,
+)
 
 
 class LogLevel(str, Enum):
@@ -20,6 +33,15 @@ class LogLevel(str, Enum):
     DEBUG = "DEBUG"
 
 
+class TracingExporter(str, Enum):
+    """
+    Exporter of the spans of traces, as JSON lines.
+    """
+
+    CONSOLE = "console"
+    FILE = "file"
+
+
 class Settings(BaseSettings):
     """
     Provides application setting for the entire application, which are configurable
@@ -31,15 +53,102 @@ class Settings(BaseSettings):
     """
 
     log_level: LogLevel | None = None
+    log_body_sample_rate: float = Field(0.01, ge=0, le=1)
+    log_body_max_size: int = Field(4096, ge=0)
+    request_timeout: float = Field(10.0, gt=0)
+    tracing: bool = False
+    tracing_sample_rate: float = Field(0.1, ge=0, le=1)
+    tracing_exporter: TracingExporter = TracingExporter.CONSOLE
+    tracing_file: str = "traces.jsonl"
     openapi_server_url: str = "/"
     openapi_schema_prefix: str = "/"
     inventory_manager_url: AnyHttpUrl
+    inventory_manager_max_connections: int = Field(100, ge=1)
+    inventory_manager_max_keepalive_connections: int = Field(20, ge=0)
+    inventory_manager_keepalive_expiry: float = Field(5.0, ge=0)
+    inventory_manager_timeout: float = Field(5.0, gt=0)
+    inventory_manager_http2: bool = False
+    inventory_manager_persisted_queries: bool = True
+    inventory_manager_rest_url: AnyHttpUrl | None = None
+    inventory_manager_batch_window: float = Field(0.002, ge=0)
+    inventory_manager_max_batch_size: int = Field(100, ge=1)
+    inventory_manager_operation_timeouts: dict[str, PositiveFloat] = {}
+    inventory_manager_retries: int = Field(2, ge=0)
+    inventory_manager_retry_backoff: float = Field(0.05, ge=0)
+    inventory_manager_retry_max_backoff: float = Field(1.0, ge=0)
+    inventory_manager_hedging: bool = False
+    inventory_manager_hedge_quantile: float = Field(0.95, gt=0, lt=1)
+    inventory_manager_adaptive_concurrency: bool = False
+    inventory_manager_concurrency_limit: int = Field(20, ge=1)
+    inventory_manager_min_concurrency_limit: int = Field(2, ge=1)
+    inventory_manager_max_concurrency_limit: int = Field(100, ge=1)
+    inventory_manager_concurrency_queue_size: int = Field(100, ge=0)
+    inventory_manager_latency_tolerance: float = Field(2.0, gt=1)
+    inventory_manager_ws_url: AnyUrl | None = None
+    availability_mirror: bool = False
+    availability_mirror_days: int = Field(14, ge=1)
+    availability_mirror_resubscribe_interval: float = Field(3600.0, gt=0)
+    availability_mirror_reconnect_delay: float = Field(1.0, gt=0)
+    availability_mirror_cursor_overlap: float = Field(60.0, ge=0)
+    flights_search_cache_max_entries: int = Field(1_000, ge=0)
+    flights_search_cache_max_bytes: int = Field(64 * 1024 * 1024, ge=0)
+    flights_search_cache_ttl: float = Field(10.0, ge=0)
+    flight_details_cache_max_entries: int = Field(10_000, ge=0)
+    flight_details_cache_max_bytes: int = Field(64 * 1024 * 1024, ge=0)
+    flight_details_cache_static_ttl: float = Field(300.0, ge=0)
+    flight_details_cache_availability_ttl: float = Field(5.0, ge=0)
+    reference_data_refresh_interval: float = Field(3600.0, gt=0)
+    cache_stale_while_revalidate: float = Field(5.0, ge=0)
+    cache_stale_if_error: float = Field(300.0, ge=0)
+    flight_seats_stream_poll_interval: float = Field(2.0, gt=0)
+    flight_seats_stream_heartbeat_interval: float = Field(15.0, gt=0)
+    flight_seats_stream_queue_size: int = Field(16, ge=1)
+    flight_seats_stream_max_streams: int = Field(1_000, ge=0)
+    flights_batch_max_size: int = Field(50, ge=1)
+    flights_calendar_max_days: int = Field(62, ge=1)
+    flights_calendar_cache_max_entries: int = Field(10_000, ge=0)
+    flights_calendar_cache_max_bytes: int = Field(16 * 1024 * 1024, ge=0)
+    flights_calendar_cache_ttl: float = Field(60.0, ge=0)
     iata_airline_code: str = Field("SK", regex=r"^[A-Z0-9]{2,3}$")
     icao_airline_code: str = Field("SKL", regex=r"^[A-Z]{3}$")
 
     class Config:
         env_prefix = "skyline_"
 
+    @validator("inventory_manager_rest_url", always=True)
+    def default_inventory_manager_rest_url(
+        cls, rest_url: str | None, values: dict[str, Any]
+    ) -> str | None:
+        if rest_url or "inventory_manager_url" not in values:
+            return rest_url
+        # The REST API is served at /api/rest, next to the GraphQL API at /v1/graphql
+        url = urlsplit(values["inventory_manager_url"])
+        return f"{url.scheme}://{url.netloc}/api/rest"
+
+    @validator("flights_batch_max_size")
+    def check_flights_batch_max_size(
+        cls, batch_max_size: int, values: dict[str, Any]
+    ) -> int:
+        # A batch request should be looked up in a single batched query
+        max_batch_size = values.get("inventory_manager_max_batch_size")
+        if max_batch_size is not None and batch_max_size > max_batch_size:
+            raise ValueError(
+                "must not exceed inventory_manager_max_batch_size "
+                f"({max_batch_size})"
+            )
+        return batch_max_size
+
+    @validator("inventory_manager_ws_url", always=True)
+    def default_inventory_manager_ws_url(
+        cls, ws_url: str | None, values: dict[str, Any]
+    ) -> str | None:
+        if ws_url or "inventory_manager_url" not in values:
+            return ws_url
+        # Subscriptions are served over a websocket at the GraphQL API's URL
+        url = urlsplit(values["inventory_manager_url"])
+        scheme = "wss" if url.scheme == "https" else "ws"
+        return url._replace(scheme=scheme).geturl()
+
 
 @cache
 def get_settings() -> Settings:
@@ -113,6 +222,7 @@ class JsonLogFormatter(logging.Formatter):
         time_format: str = "%Y-%m-%dT%H:%M:%S",
         msec_format: str = "%s.%03dZ",
         validate: bool = True,
+        fast: bool = False,
     ):
         """
         Initializes the formatter.
@@ -127,6 +237,11 @@ class JsonLogFormatter(logging.Formatter):
         :param validate: If the fields list should be validated for containing
             supported fields.
             Defaults to True.
+        :param fast: If the logs should be formatted in the fast mode, which caches
+            the formatted time of the current second and encodes the logs with
+            orjson. In this mode, datetimes in extra data are encoded in RFC 3339
+            format.
+            Defaults to False.
 
         :raises ConfigurationException: Raised when validation is enabled and the given
             fields list is invalid.
@@ -137,6 +252,16 @@ class JsonLogFormatter(logging.Formatter):
             self._validate_fields(fields)
 
         self._fields = fields if fields else self.default_fields
+        self._field_attributes = [
+            (field, attribute)
+            for field, attribute in self.fields_mapping.items()
+            if field in self._fields
+        ]
+        self._uses_time = "time" in self._fields
+        self._fast = fast
+        self._time_format = time_format
+        self._msec_format = msec_format
+        self._cached_time: tuple[int, str] = (-1, "")
 
         self.default_time_format = time_format
         self.default_msec_format = msec_format
@@ -152,7 +277,16 @@ class JsonLogFormatter(logging.Formatter):
         """
         Checks if "time" should be used in the log (if is included in the fields list).
         """
-        return "time" in self._fields
+        return self._uses_time
+
+    def _format_time_fast(self, record: logging.LogRecord) -> str:
+        # Only the milliseconds are formatted for records of the last formatted second
+        second = int(record.created)
+        cached_second, formatted_second = self._cached_time
+        if second != cached_second:
+            formatted_second = time.strftime(self._time_format, time.gmtime(second))
+            self._cached_time = (second, formatted_second)
+        return self._msec_format % (formatted_second, record.msecs)
 
     @staticmethod
     def _json_dumps_fallback(o: Any) -> Any:
@@ -163,14 +297,27 @@ class JsonLogFormatter(logging.Formatter):
         else:
             return str(o)
 
+    @staticmethod
+    def _orjson_dumps_fallback(o: Any) -> Any:
+        # orjson natively encodes UUIDs, datetimes, enums and dataclasses
+        if isinstance(o, BaseModel):
+            return o.dict()
+        elif isinstance(o, (set, frozenset)):
+            return list(o)
+        else:
+            return str(o)
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Formats the :class:`logging.LogRecord` to a structured JSON log.
         """
         record.message = record.getMessage().strip()
 
-        if self.usesTime():
-            record.asctime = self.formatTime(record)
+        if self._uses_time:
+            if self._fast:
+                record.asctime = self._format_time_fast(record)
+            else:
+                record.asctime = self.formatTime(record)
 
         if record.exc_info:
             # Cache the traceback text to avoid converting it multiple times
@@ -178,10 +325,10 @@ class JsonLogFormatter(logging.Formatter):
             if not record.exc_text:
                 record.exc_text = self.formatException(record.exc_info)
 
-        message_dict: dict[str, Any] = {}
-        for field, attribute in self.fields_mapping.items():
-            if field in self._fields:
-                message_dict[field] = getattr(record, attribute)
+        message_dict: dict[str, Any] = {
+            field: getattr(record, attribute)
+            for field, attribute in self._field_attributes
+        }
 
         if extra := record.__dict__.get("extra"):
             message_dict["extra"] = extra
@@ -198,9 +345,128 @@ class JsonLogFormatter(logging.Formatter):
         if record.stack_info:
             message_dict["extra"]["stackFrame"] = self.formatStack(record.stack_info)
 
+        if self._fast:
+            return orjson.dumps(
+                message_dict,
+                default=JsonLogFormatter._orjson_dumps_fallback,
+                option=orjson.OPT_NON_STR_KEYS,
+            ).decode()
         return json.dumps(message_dict, default=JsonLogFormatter._json_dumps_fallback)
 
 
+class LogDropPolicy(str, Enum):
+    """
+    Which log records are dropped by a :class:`QueuedStreamHandler` when its queue
+    is full.
+    """
+
+    NEWEST = "newest"
+    OLDEST = "oldest"
+
+
+class QueuedStreamHandler(logging.StreamHandler):
+    """
+    :class:`logging.StreamHandler` which formats and writes the records to the stream
+    in a background writer thread, so that logging never blocks on the stream (e.g.
+    when the stream is consumed slowly by the container log driver).
+
+    The records are handed to the writer thread through a bounded queue. When the
+    queue is full, records are dropped according to the drop policy, and are
+    counted by the ``dropped`` attribute. The writer reports the number of dropped
+    records once it catches up.
+
+    Can be configured in a logging configuration file like a
+    :class:`logging.StreamHandler`, with the additional ``queue_size`` and
+    ``drop_policy`` parameters.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        queue_size: int = 10000,
+        drop_policy: str = LogDropPolicy.NEWEST,
+    ):
+        """
+        Initializes the handler and starts its writer thread.
+
+        :param stream: The stream to write the records to. Defaults to stderr.
+        :param queue_size: The maximal number of records waiting to be written.
+            Defaults to 10000.
+        :param drop_policy: Which records are dropped when the queue is full: the
+            ``newest`` records, which are not queued, or the ``oldest`` queued
+            records. Defaults to newest.
+        """
+        super().__init__(stream)
+        self.drop_policy = LogDropPolicy(drop_policy)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: queue.Queue[logging.LogRecord | None] = queue.Queue(queue_size)
+        self._writer = threading.Thread(
+            target=self._write, name="log-writer", daemon=True
+        )
+        self._writer.start()
+
+    def emit(self, record: logging.LogRecord):
+        """
+        Queues the record to be written, or drops a record if the queue is full.
+        """
+        try:
+            # Merge the message arguments now, as they may change after logging
+            record.msg = record.getMessage()
+            record.args = None
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.drop_policy == LogDropPolicy.OLDEST:
+                with suppress(queue.Empty, queue.Full):
+                    self._queue.get_nowait()
+                    self._queue.put_nowait(record)
+
+    def _write(self):
+        while (record := self._queue.get()) is not None:
+            self._write_record(record)
+            if self._queue.empty() and self.dropped > self._reported_dropped:
+                self._report_dropped()
+
+    def _write_record(self, record: logging.LogRecord):
+        # Unlike StreamHandler.emit, the handler's lock is not acquired for flushing,
+        # as it is held by the logging threads while they queue the records
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _report_dropped(self):
+        dropped = self.dropped
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records, as the log queue was full",
+            args=(dropped - self._reported_dropped,),
+            exc_info=None,
+        )
+        self._reported_dropped = dropped
+        self._write_record(record)
+
+    def close(self):
+        """
+        Writes the queued records and stops the writer thread.
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        super().close()
+
+
 def config_logging():
     """
     Configures logging for the application. Should be called before instantiating
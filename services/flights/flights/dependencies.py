@@ -1,68 +1,562 @@
+import asyncio
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Any
+import re
+from collections.abc import Awaitable, Callable, Hashable
+from datetime import date, datetime, time, timedelta, timezone
+from functools import cache
+from typing import Any, TypeVar, cast
 from uuid import UUID
 
 import httpx
 from fastapi import Path, Query
+from fastapi.exceptions import RequestValidationError
+from opentelemetry.trace import SpanKind
+from pydantic.error_wrappers import ErrorWrapper
 
+from .availability import AvailabilityMirror
+from .cache import CacheLookup, TtlLruCache, json_size
+from .concurrency import AdaptiveConcurrencyLimiter, BatchLoader, SingleFlight
 from .config import get_settings
-from .exceptions import ExternalDependencyException
-from .models import FlightDetails, FlightSeats, ServiceFlights
-from .util import CabinClass, log_response
+from .exceptions import (
+    ExternalDependencyException,
+    ServiceUnavailableException,
+    TransientExternalDependencyException,
+)
+from .metrics import observe_inventory_manager_query
+from .models import (
+    Cabin,
+    CabinAvailability,
+    CalendarDay,
+    Flight,
+    FlightDetails,
+    FlightSeats,
+    ServiceCalendar,
+    ServiceFlights,
+    ServiceFlightsAvailability,
+)
+from .reference import ReferenceData, ReferenceDataIndex
+from .schemas import FlightIds
+from .streams import FlightSeatsStreams
+from .tracing import trace_context_headers, tracer
+from .upstream import UpstreamCaller, UpstreamStatistics
+from .util import (
+    CabinClass,
+    get_remaining_time,
+    log_response,
+    mark_stale_response,
+    set_request_deadline,
+)
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_inventory_manager_client: httpx.AsyncClient | None = None
+_inventory_manager_queries: SingleFlight[dict[str, Any]] = SingleFlight()
+_persisted_query_endpoints: dict[str, str] = {}
+_unavailable_persisted_query_endpoints: set[str] = set()
+_revalidations: dict[Hashable, asyncio.Task[Any]] = {}
+
+
+def _create_inventory_manager_client() -> httpx.AsyncClient:
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.inventory_manager_max_connections,
+        max_keepalive_connections=settings.inventory_manager_max_keepalive_connections,
+        keepalive_expiry=settings.inventory_manager_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=settings.inventory_manager_timeout,
+        http2=settings.inventory_manager_http2,
+    )
+
+
+async def open_inventory_manager_client():
+    """
+    Creates the shared HTTP client used to query the inventory manager.
+    Should be called once on application startup.
+    """
+    global _inventory_manager_client
+    if _inventory_manager_client is None:
+        _inventory_manager_client = _create_inventory_manager_client()
+
+
+async def close_inventory_manager_client():
+    """
+    Closes the shared HTTP client used to query the inventory manager, along with
+    all of its pooled connections. Should be called once on application shutdown.
+    """
+    global _inventory_manager_client
+    if _inventory_manager_client is not None:
+        await _inventory_manager_client.aclose()
+        _inventory_manager_client = None
+
+
+def get_inventory_manager_client() -> httpx.AsyncClient:
+    """
+    Returns the shared HTTP client used to query the inventory manager.
+
+    The client is created lazily if it was not opened on application startup
+    (e.g. when the application's startup event handlers were not run).
+
+    :return: The shared HTTP client instance.
+    """
+    global _inventory_manager_client
+    if _inventory_manager_client is None:
+        _inventory_manager_client = _create_inventory_manager_client()
+    return _inventory_manager_client
+
+
+@cache
+def get_inventory_manager_caller() -> UpstreamCaller:
+    """
+    Creates the caller of the inventory manager's queries on first call, and returns
+    the cached instance on subsequent calls.
+
+    :return: The caller instance, which tracks the latencies and statistics of the
+        inventory manager's operations.
+    """
+    settings = get_settings()
+    limiter = None
+    if settings.inventory_manager_adaptive_concurrency:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=settings.inventory_manager_concurrency_limit,
+            min_limit=settings.inventory_manager_min_concurrency_limit,
+            max_limit=settings.inventory_manager_max_concurrency_limit,
+            max_queue_size=settings.inventory_manager_concurrency_queue_size,
+            latency_tolerance=settings.inventory_manager_latency_tolerance,
+        )
+    return UpstreamCaller(
+        limiter=limiter,
+        retries=settings.inventory_manager_retries,
+        retry_backoff=settings.inventory_manager_retry_backoff,
+        retry_max_backoff=settings.inventory_manager_retry_max_backoff,
+        hedging=settings.inventory_manager_hedging,
+        hedge_quantile=settings.inventory_manager_hedge_quantile,
+    )
+
+
+def get_inventory_manager_statistics() -> dict[str, UpstreamStatistics]:
+    """
+    :return: The statistics of the calls to the inventory manager, by the names of
+        their GraphQL operations.
+    """
+    return dict(get_inventory_manager_caller().statistics)
+
+
+@cache
+def _operation_name(query: str) -> str:
+    match = re.match(r"\s*(?:query|subscription|mutation)\s+(\w+)", query)
+    return match.group(1) if match else "anonymous"
+
+
+def persisted_query(endpoint: str, query: str) -> str:
+    """
+    Registers a GraphQL query which is persisted in the inventory manager's
+    ``flights`` query collection, and is exposed by it as a REST endpoint.
+
+    Persisted queries are sent to the inventory manager by their REST endpoint,
+    with only their variables, instead of sending the full query text.
+
+    :param endpoint: The REST endpoint of the persisted query, relative to the
+        inventory manager's REST API URL.
+    :param query: The GraphQL query string, identical to the persisted query.
+    :return: The given GraphQL query string.
+    """
+    _persisted_query_endpoints[query] = endpoint
+    return query
+
 
 async def query_inventory_manager(
     query: str,
     variables: dict[str, Any],
 ) -> dict[str, Any]:
     """
-    Sends a GraphQL query (or mutation) to the inventory manager.
+    Sends a GraphQL query to the inventory manager.
+
+    Concurrent identical queries (same query and variables) are coalesced into a
+    single request to the inventory manager, whose response is shared by all callers.
+    Therefore, the returned response must not be modified.
 
-    :param query: The GraphQL query or mutation string.
+    Each attempt is bounded by the query operation's timeout, and attempts which
+    fail transiently are retried (all queries are idempotent reads), or hedged if
+    enabled. Each caller waits for the response until the deadline of its own
+    request, while the shared request is not bound to the deadline of any of its
+    callers, so a caller with a short deadline does not fail the other callers.
+
+    :param query: The GraphQL query string.
     :param variables: Variables for the request.
     :return: The JSON response.
+    :raises ExternalDependencyException: If the query failed, or the deadline of
+        the current request was exceeded.
     """
-    settings = get_settings()
-    async with httpx.AsyncClient() as client:
-        request_body = {"query": query, "variables": variables}
+    key = (query, json.dumps(variables, sort_keys=True, default=str))
+    operation = _operation_name(query)
+    with tracer.start_as_current_span(
+        "query_inventory_manager",
+        attributes={"graphql.operation.name": operation},
+    ):
+        call = _inventory_manager_queries.do(
+            key, lambda: _call_inventory_manager(query, variables)
+        )
+        remaining = get_remaining_time()
+        if remaining is None:
+            return await call
         try:
-            response: httpx.Response = await client.post(
-                settings.inventory_manager_url,
-                json=request_body,
-            )
-        except httpx.RequestError as exc:
-            log.exception(
-                "Error connecting to inventory manager at %s", exc.request.url
-            )
+            return await asyncio.wait_for(call, max(remaining, 0))
+        except asyncio.TimeoutError:
+            get_inventory_manager_caller().statistics[operation].deadline_exceeded += 1
+            log.warning("Deadline exceeded while waiting for %s", operation)
             raise ExternalDependencyException
 
-        body: dict[str, Any] = response.json()
 
-        if "errors" in body:
-            log_response(
-                log,
-                "Error with inventory manager GraphQL query: %s",
-                ", ".join([e.get("message") for e in body["errors"]]),
-                request_body=request_body,
-                response=response,
-                level=logging.ERROR,
-            )
-            raise ExternalDependencyException
+async def _call_inventory_manager(
+    query: str,
+    variables: dict[str, Any],
+) -> dict[str, Any]:
+    # The call may be shared by several requests, which wait for it until their own
+    # deadlines, so it is not bound to the deadline of the request which started it
+    set_request_deadline(None)
+    settings = get_settings()
+    operation = _operation_name(query)
+    timeout = settings.inventory_manager_operation_timeouts.get(
+        operation, settings.inventory_manager_timeout
+    )
+
+    async def attempt() -> dict[str, Any]:
+        with tracer.start_as_current_span(
+            f"inventory_manager {operation}", kind=SpanKind.CLIENT
+        ), observe_inventory_manager_query(operation):
+            return await _send_inventory_manager_query(query, variables)
+
+    return await get_inventory_manager_caller().call(
+        operation, attempt, timeout=timeout
+    )
+
+
+async def _send_inventory_manager_query(
+    query: str,
+    variables: dict[str, Any],
+) -> dict[str, Any]:
+    settings = get_settings()
+    endpoint = _persisted_query_endpoints.get(query)
+    if (
+        settings.inventory_manager_persisted_queries
+        and endpoint is not None
+        and endpoint not in _unavailable_persisted_query_endpoints
+    ):
+        body = await _send_persisted_query(endpoint, variables)
+        if body is not None:
+            return body
+
+    client = get_inventory_manager_client()
+    request_body = {"query": query, "variables": variables}
+    try:
+        response: httpx.Response = await client.post(
+            settings.inventory_manager_url,
+            json=request_body,
+            headers=trace_context_headers(),
+        )
+    except httpx.RequestError as exc:
+        log.warning(
+            "Error connecting to inventory manager at %s: %r", exc.request.url, exc
+        )
+        raise TransientExternalDependencyException
 
+    _raise_for_unavailable(response)
+    body = response.json()
+
+    if "errors" in body:
         log_response(
             log,
-            "Queried inventory manager successfully",
+            "Error with inventory manager GraphQL query: %s",
+            ", ".join([e.get("message") for e in body["errors"]]),
             request_body=request_body,
             response=response,
+            response_body=body,
+            level=logging.ERROR,
+            max_body_size=settings.log_body_max_size,
         )
+        raise ExternalDependencyException
 
-        return body
+    log_response(
+        log,
+        "Queried inventory manager successfully",
+        request_body=request_body,
+        response=response,
+        response_body=body,
+        body_sample_rate=settings.log_body_sample_rate,
+        max_body_size=settings.log_body_max_size,
+    )
 
+    return body
+
+
+async def _send_persisted_query(
+    endpoint: str,
+    variables: dict[str, Any],
+) -> dict[str, Any] | None:
+    settings = get_settings()
+    client = get_inventory_manager_client()
+    rest_url = str(settings.inventory_manager_rest_url).rstrip("/")
+    try:
+        response: httpx.Response = await client.post(
+            f"{rest_url}/{endpoint}",
+            json=variables,
+            headers=trace_context_headers(),
+        )
+    except httpx.RequestError as exc:
+        log.warning(
+            "Error connecting to inventory manager at %s: %r", exc.request.url, exc
+        )
+        raise TransientExternalDependencyException
+
+    if response.status_code == httpx.codes.NOT_FOUND:
+        log.warning(
+            "Persisted query endpoint %s is not available in the inventory manager, "
+            "falling back to sending the full query",
+            endpoint,
+        )
+        _unavailable_persisted_query_endpoints.add(endpoint)
+        return None
 
-_get_flights_query = """query findFlights(
+    _raise_for_unavailable(response)
+    body: dict[str, Any] = response.json()
+
+    if "error" in body or "errors" in body:
+        log_response(
+            log,
+            "Error with inventory manager persisted query %s: %s",
+            endpoint,
+            body.get("error") or ", ".join([e.get("message") for e in body["errors"]]),
+            request_body=variables,
+            response=response,
+            response_body=body,
+            level=logging.ERROR,
+            max_body_size=settings.log_body_max_size,
+        )
+        raise ExternalDependencyException
+
+    log_response(
+        log,
+        "Queried inventory manager successfully",
+        request_body=variables,
+        response=response,
+        response_body=body,
+        body_sample_rate=settings.log_body_sample_rate,
+        max_body_size=settings.log_body_max_size,
+    )
+
+    # REST endpoints respond with the query's data, without the GraphQL envelope
+    return body if "data" in body else {"data": body}
+
+
+def _raise_for_unavailable(response: httpx.Response):
+    if response.status_code >= httpx.codes.INTERNAL_SERVER_ERROR:
+        log.warning(
+            "Inventory manager at %s responded with status code %d",
+            response.url,
+            response.status_code,
+        )
+        raise TransientExternalDependencyException
+
+
+def _set_cached(
+    cache_: TtlLruCache[Any], key: Hashable, value: Any, *, ttl: float, size: int
+):
+    settings = get_settings()
+    cache_.set(
+        key,
+        value,
+        ttl=ttl,
+        size=size,
+        stale_while_revalidate=settings.cache_stale_while_revalidate,
+        stale_if_error=settings.cache_stale_if_error,
+    )
+
+
+async def _get_cached(
+    cache_: TtlLruCache[Any],
+    key: Hashable,
+    load: Callable[[], Awaitable[T | None]],
+) -> tuple[T | None, bool]:
+    """
+    Gets a value from a cache, or loads it if it is not cached.
+    The load function is expected to cache the loaded value by itself.
+
+    An expired entry is used while it is revalidated in the background, within its
+    stale-while-revalidate window, or instead of the loaded value if it cannot be
+    loaded from the inventory manager, within its stale-if-error window.
+    In both cases the response is marked as stale.
+
+    :param cache_: The cache to get the value from.
+    :param key: The key of the value in the cache.
+    :param load: Loads the value from the inventory manager, and caches it.
+    :return: The value, or None if it was not found, and whether it was loaded.
+    """
+    lookup: CacheLookup[T] | None = cache_.lookup(key)
+    if lookup is not None and lookup.fresh:
+        return lookup.value, False
+    if lookup is not None and lookup.revalidate:
+        _revalidate((id(cache_), key), load)
+        mark_stale_response()
+        return lookup.value, False
+
+    try:
+        return await load(), True
+    except (ExternalDependencyException, ServiceUnavailableException):
+        if lookup is None:
+            raise
+        log.warning("Using stale cached value of %s, as it could not be loaded", key)
+        mark_stale_response()
+        return lookup.value, False
+
+
+def _revalidate(key: Hashable, load: Callable[[], Awaitable[Any]]):
+    """
+    Loads an expired cached value in the background, unless it is already being
+    loaded.
+
+    :param key: Identifies the revalidation, to avoid concurrent revalidations of the
+        same value.
+    :param load: Loads the value from the inventory manager, and caches it.
+    """
+    revalidation = _revalidations.get(key)
+    if (
+        revalidation is not None
+        and not revalidation.done()
+        and revalidation.get_loop() is asyncio.get_running_loop()
+    ):
+        return
+    revalidation = asyncio.create_task(_run_revalidation(key, load))
+    _revalidations[key] = revalidation
+    revalidation.add_done_callback(lambda r: _forget_revalidation(key, r))
+
+
+async def _run_revalidation(key: Hashable, load: Callable[[], Awaitable[Any]]):
+    # Revalidations outlive the request which started them
+    set_request_deadline(None)
+    try:
+        await load()
+    except (ExternalDependencyException, ServiceUnavailableException):
+        log.warning("Could not revalidate the stale cached value of %s", key)
+
+
+def _forget_revalidation(key: Hashable, revalidation: asyncio.Task[Any]):
+    if _revalidations.get(key) is revalidation:
+        del _revalidations[key]
+
+
+@cache
+def get_availability_mirror() -> AvailabilityMirror:
+    """
+    Creates the availability mirror on first call, and returns the cached instance
+    on subsequent calls.
+
+    The mirror is only started if enabled with the ``availability_mirror`` setting,
+    and is never ready otherwise.
+
+    :return: The availability mirror instance.
+    """
+    settings = get_settings()
+    return AvailabilityMirror(
+        str(settings.inventory_manager_ws_url),
+        days=settings.availability_mirror_days,
+        resubscribe_interval=settings.availability_mirror_resubscribe_interval,
+        reconnect_delay=settings.availability_mirror_reconnect_delay,
+        cursor_overlap=settings.availability_mirror_cursor_overlap,
+    )
+
+
+async def start_availability_mirror():
+    """
+    Starts mirroring the availability of upcoming flights, if enabled.
+    Should be called once on application startup.
+    """
+    if get_settings().availability_mirror:
+        get_availability_mirror().start()
+
+
+async def stop_availability_mirror():
+    """
+    Stops mirroring the availability of upcoming flights.
+    Should be called once on application shutdown.
+    """
+    await get_availability_mirror().stop()
+
+
+_get_reference_data_query = persisted_query(
+    "flights/reference",
+    """query getReferenceData {
+  airport {
+    iata_code
+    icao_code
+    name
+    subdivision_code
+    city
+    geo_location
+  }
+  aircraft_model {
+    icao_code
+    iata_code
+    name
+    seat_maps {
+      cabin_class
+      start_row
+      end_row
+      column_layout
+    }
+  }
+}
+""",
+)
+
+
+@cache
+def get_reference_data_index() -> ReferenceDataIndex:
+    """
+    Creates the reference data index on first call, and returns the cached instance
+    on subsequent calls.
+
+    The index holds all airports and aircraft models, which are joined locally with
+    the results of queries to the inventory manager, instead of being queried with
+    every result.
+
+    :return: The reference data index instance.
+    """
+    settings = get_settings()
+    return ReferenceDataIndex(
+        _load_reference_data,
+        refresh_interval=settings.reference_data_refresh_interval,
+    )
+
+
+async def _load_reference_data() -> ReferenceData:
+    response = await query_inventory_manager(_get_reference_data_query, {})
+    return ReferenceData.parse(response["data"])
+
+
+async def start_reference_data_refresh():
+    """
+    Loads the reference data, and starts refreshing it periodically.
+    Should be called once on application startup.
+    """
+    get_reference_data_index().start()
+
+
+async def stop_reference_data_refresh():
+    """
+    Stops refreshing the reference data periodically.
+    Should be called once on application shutdown.
+    """
+    await get_reference_data_index().stop()
+
+
+_get_flights_query = persisted_query(
+    "flights/find",
+    """query findFlights(
   $origin: String!
   $destination: String!
   $from_time: timestamptz!
@@ -78,10 +572,10 @@ _get_flights_query = """query findFlights(
   ) {
     id
     origin_airport {
-      ...airportFragment
+      iata_code
     }
     destination_airport {
-      ...airportFragment
+      iata_code
     }
     flights(
       where: {
@@ -96,8 +590,6 @@ _get_flights_query = """query findFlights(
       arrival_time
       aircraft_model {
         icao_code
-        iata_code
-        name
       }
       available_seats_counts(
         where: {
@@ -112,16 +604,8 @@ _get_flights_query = """query findFlights(
     }
   }
 }
-
-fragment airportFragment on airport {
-  iata_code
-  icao_code
-  name
-  subdivision_code
-  city
-  geo_location
-}
-"""
+""",
+)
 
 
 async def get_flights(
@@ -158,16 +642,57 @@ async def get_flights(
         description="The cabin classes of the flight.",
     ),
 ) -> ServiceFlights | None:
-    variables = {
-        "origin": origin.upper(),
-        "destination": destination.upper(),
-        "from_time": departure_time.isoformat(),
-        "to_time": (departure_time + timedelta(days=1)).isoformat(),
-        "passengers": passengers,
-    }
-    if cabin_classes:
-        cabin_classes = list(set(cabin_classes))
-        variables["cabin_classes"] = cabin_classes
+    settings = get_settings()
+    origin = origin.upper()
+    destination = destination.upper()
+    cabin_classes = sorted(set(cabin_classes)) if cabin_classes else list(CabinClass)
+    if departure_time.tzinfo is None:
+        # Timestamps without a timezone are treated as UTC by the inventory manager
+        departure_time = departure_time.replace(tzinfo=timezone.utc)
+    from_time = departure_time
+    to_time = departure_time + timedelta(days=1)
+
+    if (
+        settings.flights_search_cache_ttl <= 0
+        or settings.flights_search_cache_max_entries <= 0
+    ):
+        variables = {
+            "origin": origin,
+            "destination": destination,
+            "from_time": from_time.isoformat(),
+            "to_time": to_time.isoformat(),
+            "passengers": passengers,
+            "cabin_classes": cabin_classes,
+        }
+        return await _query_service_flights(variables)
+
+    # Fetch (or get from the cache) all flights of each UTC day in the searched
+    # time range, and filter them locally to match the search
+    first_day = from_time.astimezone(timezone.utc).date()
+    last_day = to_time.astimezone(timezone.utc).date()
+    days = [
+        first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)
+    ]
+    days_flights = await asyncio.gather(
+        *[_get_day_service_flights(origin, destination, day) for day in days]
+    )
+    if any(day_flights is None for day_flights in days_flights):
+        return None
+
+    availability_mirror = get_availability_mirror()
+    return filter_service_flights(
+        [
+            availability_mirror.apply(day_flights)
+            for day_flights in cast(list[ServiceFlights], days_flights)
+        ],
+        from_time,
+        to_time,
+        passengers,
+        cabin_classes,
+    )
+
+
+async def _query_service_flights(variables: dict[str, Any]) -> ServiceFlights | None:
     response = await query_inventory_manager(_get_flights_query, variables)
     services = response["data"]["service"]
     if not services:
@@ -175,19 +700,484 @@ async def get_flights(
     # There should be only one airline service with this combination
     # of origin and destination airports
     flights_data = services[0]
-    return ServiceFlights(**flights_data)
+    return await _parse_service_flights(flights_data)
+
+
+@cache
+def get_flights_search_cache() -> TtlLruCache[ServiceFlights]:
+    """
+    Creates the flights search cache on first call, and returns the cached instance
+    on subsequent calls.
+
+    The cache holds all flights of a service departing on a single UTC day,
+    with all of their cabins, keyed by ``(origin, destination, day)``.
+
+    :return: The flights search cache instance.
+    """
+    settings = get_settings()
+    return TtlLruCache(
+        max_entries=settings.flights_search_cache_max_entries,
+        max_bytes=settings.flights_search_cache_max_bytes,
+    )
+
+
+async def _get_day_service_flights(
+    origin: str, destination: str, day: date
+) -> ServiceFlights | None:
+    service_flights, _ = await _get_cached(
+        get_flights_search_cache(),
+        (origin, destination, day),
+        lambda: _load_day_service_flights(origin, destination, day),
+    )
+    return service_flights
+
+
+async def _load_day_service_flights(
+    origin: str, destination: str, day: date
+) -> ServiceFlights | None:
+    settings = get_settings()
+    day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    day_end = day_start + timedelta(days=1, microseconds=-1)
+    variables = {
+        "origin": origin,
+        "destination": destination,
+        "from_time": day_start.isoformat(),
+        "to_time": day_end.isoformat(),
+        # Include all flights and cabins, even fully booked ones
+        "passengers": 0,
+    }
+    response = await query_inventory_manager(_get_flights_query, variables)
+    services = response["data"]["service"]
+    if not services:
+        return None
+    flights_data = services[0]
+    service_flights = await _parse_service_flights(flights_data)
+    _set_cached(
+        get_flights_search_cache(),
+        (origin, destination, day),
+        service_flights,
+        ttl=settings.flights_search_cache_ttl,
+        size=json_size(flights_data),
+    )
+    return service_flights
+
+
+async def _parse_service_flights(service_data: dict[str, Any]) -> ServiceFlights:
+    flights_data = service_data["flights"]
+    reference = await get_reference_data_index().get(
+        airports=[
+            service_data["origin_airport"]["iata_code"],
+            service_data["destination_airport"]["iata_code"],
+        ],
+        aircraft_models=[f["aircraft_model"]["icao_code"] for f in flights_data],
+    )
+    with tracer.start_as_current_span("parse ServiceFlights"):
+        return ServiceFlights(
+            **reference.join_service(service_data)
+            | {"flights": [reference.join_flight(f) for f in flights_data]}
+        )
+
+
+def filter_service_flights(
+    days_flights: list[ServiceFlights],
+    from_time: datetime,
+    to_time: datetime,
+    passengers: int,
+    cabin_classes: list[CabinClass],
+) -> ServiceFlights:
+    """
+    Filters the flights of a service to match a flights search, exactly as the
+    inventory manager filters the flights for the ``findFlights`` query.
+
+    A flight matches the search if it departs within the given time range, and it
+    has any cabin with enough available seats for the passengers.
+    Only the flight's cabins of the requested cabin classes with enough available
+    seats are included.
+
+    :param days_flights: Flights of the same service, grouped by departure day.
+        The given models are not modified.
+    :param from_time: The minimal departure time, inclusive.
+    :param to_time: The maximal departure time, inclusive.
+    :param passengers: The number of passengers.
+    :param cabin_classes: The requested cabin classes.
+    :return: The service's flights which match the search.
+    """
+    flights: list[Flight] = []
+    for day_flights in days_flights:
+        for flight in day_flights.flights:
+            if not from_time <= flight.departure_time <= to_time:
+                continue
+            if all(c.available_seats_count < passengers for c in flight.cabins):
+                continue
+            cabins = [
+                c
+                for c in flight.cabins
+                if c.cabin_class in cabin_classes
+                and c.available_seats_count >= passengers
+            ]
+            flights.append(flight.copy(update={"cabins": cabins}))
+    return days_flights[0].copy(update={"flights": flights})
 
 
-_get_flight_query = """query getFlight($flight_id: uuid!) {
-  flight_by_pk(id: $flight_id) {
+_get_flights_calendar_query = persisted_query(
+    "flights/calendar",
+    """query getFlightsCalendar(
+  $origin: String!
+  $destination: String!
+  $from_time: timestamptz!
+  $to_time: timestamptz!
+) {
+  service(
+    where: {
+      origin_airport: { iata_code: { _eq: $origin } }
+      destination_airport: { iata_code: { _eq: $destination } }
+    }
+  ) {
+    id
+    flights(where: { departure_time: { _gte: $from_time, _lte: $to_time } }) {
+      departure_time
+      available_seats_counts {
+        cabin_class
+        available_seats_count
+      }
+    }
+  }
+}
+""",
+)
+
+
+async def get_flights_calendar(
+    origin: str = Path(
+        ...,
+        regex=r"^[a-zA-Z]{3}$",
+        description="The IATA airport code of the airport to depart from.",
+    ),
+    destination: str = Path(
+        ...,
+        regex=r"^[a-zA-Z]{3}$",
+        description="The IATA airport code of the destination airport.",
+    ),
+    from_date: date = Query(
+        ...,
+        alias="from",
+        description="The first day of the calendar (UTC), inclusive.",
+    ),
+    to_date: date = Query(
+        ...,
+        alias="to",
+        description="The last day of the calendar (UTC), inclusive.",
+    ),
+    passengers: int = Query(
+        1,
+        ge=1,
+        description="The number of passengers to find flights for.",
+    ),
+    cabin_classes: list[CabinClass]
+    | None = Query(
+        None,
+        alias="cabin",
+        description="The cabin classes of the flights.",
+    ),
+) -> ServiceCalendar | None:
+    settings = get_settings()
+    origin = origin.upper()
+    destination = destination.upper()
+    cabin_classes = sorted(set(cabin_classes)) if cabin_classes else list(CabinClass)
+
+    days_count = (to_date - from_date).days + 1
+    if days_count < 1:
+        raise RequestValidationError(
+            [
+                ErrorWrapper(
+                    ValueError("ensure this value is not before the from date"),
+                    loc=("query", "to"),
+                )
+            ]
+        )
+    if days_count > settings.flights_calendar_max_days:
+        raise RequestValidationError(
+            [
+                ErrorWrapper(
+                    ValueError(
+                        "ensure the calendar has at most "
+                        f"{settings.flights_calendar_max_days} days"
+                    ),
+                    loc=("query", "to"),
+                )
+            ]
+        )
+    days = [from_date + timedelta(days=i) for i in range(days_count)]
+
+    days_flights = await _get_days_flights_availability(origin, destination, days)
+    if days_flights is None:
+        return None
+
+    return ServiceCalendar(
+        id=next(iter(days_flights.values())).id,
+        origin=origin,
+        destination=destination,
+        days=summarize_flights_calendar(days_flights, passengers, cabin_classes),
+    )
+
+
+@cache
+def get_flights_calendar_cache() -> TtlLruCache[ServiceFlightsAvailability]:
+    """
+    Creates the flights calendar cache on first call, and returns the cached instance
+    on subsequent calls.
+
+    The cache holds the seats availability of all flights of a service departing on
+    a single UTC day, keyed by ``(origin, destination, day)``.
+
+    :return: The flights calendar cache instance.
+    """
+    settings = get_settings()
+    return TtlLruCache(
+        max_entries=settings.flights_calendar_cache_max_entries,
+        max_bytes=settings.flights_calendar_cache_max_bytes,
+    )
+
+
+async def _get_days_flights_availability(
+    origin: str, destination: str, days: list[date]
+) -> dict[date, ServiceFlightsAvailability] | None:
+    calendar_cache = get_flights_calendar_cache()
+
+    days_flights: dict[date, ServiceFlightsAvailability] = {}
+    stale_days_flights: dict[date, ServiceFlightsAvailability] = {}
+    missing_days: list[date] = []
+    for day in days:
+        lookup = calendar_cache.lookup((origin, destination, day))
+        if lookup is not None and lookup.fresh:
+            days_flights[day] = lookup.value
+            continue
+        if lookup is not None:
+            stale_days_flights[day] = lookup.value
+        if lookup is None or not lookup.revalidate:
+            missing_days.append(day)
+
+    revalidated_days = [day for day in stale_days_flights if day not in missing_days]
+    if not missing_days:
+        if revalidated_days:
+            key = (id(calendar_cache), origin, destination, tuple(revalidated_days))
+            _revalidate(
+                key,
+                lambda: _load_days_flights_availability(
+                    origin, destination, revalidated_days
+                ),
+            )
+            mark_stale_response()
+        return days_flights | stale_days_flights
+
+    # Query all missing days at once, along with the days to revalidate
+    try:
+        loaded_days_flights = await _load_days_flights_availability(
+            origin, destination, sorted(missing_days + revalidated_days)
+        )
+    except (ExternalDependencyException, ServiceUnavailableException):
+        if any(day not in stale_days_flights for day in missing_days):
+            raise
+        log.warning(
+            "Using stale cached flights calendar of %s to %s, "
+            "as it could not be loaded",
+            origin,
+            destination,
+        )
+        mark_stale_response()
+        loaded_days_flights = stale_days_flights
+    if loaded_days_flights is None:
+        return None
+
+    days_flights |= loaded_days_flights
+    return {day: days_flights[day] for day in days}
+
+
+async def _load_days_flights_availability(
+    origin: str, destination: str, days: list[date]
+) -> dict[date, ServiceFlightsAvailability] | None:
+    settings = get_settings()
+
+    # Query all days at once, including any cached days in between
+    from_time = datetime.combine(days[0], time.min, tzinfo=timezone.utc)
+    to_time = datetime.combine(days[-1], time.min, tzinfo=timezone.utc) + timedelta(
+        days=1, microseconds=-1
+    )
+    variables = {
+        "origin": origin,
+        "destination": destination,
+        "from_time": from_time.isoformat(),
+        "to_time": to_time.isoformat(),
+    }
+    response = await query_inventory_manager(_get_flights_calendar_query, variables)
+    services = response["data"]["service"]
+    if not services:
+        return None
+    service_data = services[0]
+
+    flights_data_by_day: dict[date, list[dict[str, Any]]] = {day: [] for day in days}
+    for flight_data in service_data["flights"]:
+        departure_time = datetime.fromisoformat(flight_data["departure_time"])
+        day = departure_time.astimezone(timezone.utc).date()
+        if day in flights_data_by_day:
+            flights_data_by_day[day].append(flight_data)
+
+    days_flights: dict[date, ServiceFlightsAvailability] = {}
+    with tracer.start_as_current_span("parse ServiceFlightsAvailability"):
+        days_flights_data = {
+            day: {"id": service_data["id"], "flights": flights_data}
+            for day, flights_data in flights_data_by_day.items()
+        }
+        parsed_days_flights = {
+            day: ServiceFlightsAvailability(**day_flights_data)
+            for day, day_flights_data in days_flights_data.items()
+        }
+    for day, day_flights in parsed_days_flights.items():
+        day_flights_data = days_flights_data[day]
+        _set_cached(
+            get_flights_calendar_cache(),
+            (origin, destination, day),
+            day_flights,
+            ttl=settings.flights_calendar_cache_ttl,
+            size=json_size(day_flights_data),
+        )
+        days_flights[day] = day_flights
+
+    return days_flights
+
+
+def summarize_flights_calendar(
+    days_flights: dict[date, ServiceFlightsAvailability],
+    passengers: int,
+    cabin_classes: list[CabinClass],
+) -> list[CalendarDay]:
+    """
+    Summarizes the seats availability of a service's flights for each day.
+
+    A flight is counted for a day if it has any of the requested cabins with enough
+    available seats for the passengers, and each requested cabin class is summarized
+    by its maximal available seats count among the counted flights.
+
+    :param days_flights: Flights of the same service, by UTC departure day.
+        The given models are not modified.
+    :param passengers: The number of passengers.
+    :param cabin_classes: The requested cabin classes.
+    :return: The summary of each of the given days.
+    """
+    days: list[CalendarDay] = []
+    for day, day_flights in days_flights.items():
+        flights_count = 0
+        max_available_seats: dict[CabinClass, int] = {}
+        for flight in day_flights.flights:
+            cabins = [
+                c
+                for c in flight.cabins
+                if c.cabin_class in cabin_classes
+                and c.available_seats_count >= passengers
+            ]
+            if not cabins:
+                continue
+            flights_count += 1
+            for cabin in cabins:
+                max_available_seats[cabin.cabin_class] = max(
+                    max_available_seats.get(cabin.cabin_class, 0),
+                    cabin.available_seats_count,
+                )
+        days.append(
+            CalendarDay(
+                day=day,
+                flights_count=flights_count,
+                cabins=[
+                    CabinAvailability(cabin_class=c, available_seats_count=count)
+                    for c in CabinClass
+                    if (count := max_available_seats.get(c)) is not None
+                ],
+            )
+        )
+    return days
+
+
+@cache
+def get_flight_details_cache() -> TtlLruCache[Any]:
+    """
+    Creates the flight details cache on first call, and returns the cached instance
+    on subsequent calls.
+
+    The cache holds two kinds of entries for each flight, each with its own TTL:
+
+    * ``("flight", flight_id)`` - The flight details, which rarely change.
+    * ``("availability", flight_id)`` - The flight's cabins availability.
+
+    Additionally, the seats of each flight are kept as ``("seats", flight_id)``
+    entries, which are never fresh, and are used only within their stale-if-error
+    window.
+
+    :return: The flight details cache instance.
+    """
+    settings = get_settings()
+    return TtlLruCache(
+        max_entries=settings.flight_details_cache_max_entries,
+        max_bytes=settings.flight_details_cache_max_bytes,
+    )
+
+
+async def get_flight_details(
+    flight_id: UUID = Path(
+        ...,
+        alias="flightId",
+        description="The flight ID of the requested flight.",
+    )
+) -> FlightDetails | None:
+    details_cache = get_flight_details_cache()
+
+    flight: FlightDetails | None
+    flight, loaded = await _get_cached(
+        details_cache,
+        ("flight", flight_id),
+        lambda: get_flight_details_loader().load(flight_id),
+    )
+    if flight is None or loaded:
+        return flight
+
+    cabins: list[Cabin] | None = get_availability_mirror().get(flight_id)
+    if cabins is not None:
+        return flight.copy(update={"cabins": cabins})
+
+    cabins, _ = await _get_cached(
+        details_cache,
+        ("availability", flight_id),
+        lambda: get_flight_availability_loader().load(flight_id),
+    )
+    if cabins is None:
+        details_cache.delete(("flight", flight_id))
+        return None
+
+    return flight.copy(update={"cabins": cabins})
+
+
+def _create_batch_loader(
+    load_batch: Callable[[list[UUID]], Awaitable[dict[UUID, T]]]
+) -> BatchLoader[UUID, T]:
+    settings = get_settings()
+    return BatchLoader(
+        load_batch,
+        max_batch_size=settings.inventory_manager_max_batch_size,
+        batch_window=settings.inventory_manager_batch_window,
+    )
+
+
+_get_flights_details_query = persisted_query(
+    "flights/batch",
+    """query getFlightsDetails($flight_ids: [uuid!]!) {
+  flight(where: { id: { _in: $flight_ids } }) {
     id
     service {
       id
       origin_airport {
-        ...airportFragment
+        iata_code
       }
       destination_airport {
-        ...airportFragment
+        iata_code
       }
     }
     departure_terminal
@@ -195,9 +1185,7 @@ _get_flight_query = """query getFlight($flight_id: uuid!) {
     arrival_terminal
     arrival_time
     aircraft_model {
-      iata_code
       icao_code
-      name
     }
     available_seats_counts {
       cabin_class
@@ -206,46 +1194,157 @@ _get_flight_query = """query getFlight($flight_id: uuid!) {
     }
   }
 }
+""",
+)
+
+
+@cache
+def get_flight_details_loader() -> BatchLoader[UUID, FlightDetails]:
+    """
+    Creates the flight details loader on first call, and returns the cached instance
+    on subsequent calls.
+
+    The loader batches concurrent flight details lookups into a single query to the
+    inventory manager, and caches the loaded flight details.
+
+    :return: The flight details loader instance.
+    """
+    return _create_batch_loader(_load_flights_details)
 
-fragment airportFragment on airport {
-  iata_code
-  icao_code
-  name
-  subdivision_code
-  city
-  geo_location
+
+async def _load_flights_details(flight_ids: list[UUID]) -> dict[UUID, FlightDetails]:
+    variables = {"flight_ids": [str(i) for i in flight_ids]}
+    response = await query_inventory_manager(_get_flights_details_query, variables)
+    flights_data = response["data"]["flight"]
+    reference = await get_reference_data_index().get(
+        airports=[
+            f["service"][airport]["iata_code"]
+            for f in flights_data
+            for airport in ("origin_airport", "destination_airport")
+        ],
+        aircraft_models=[f["aircraft_model"]["icao_code"] for f in flights_data],
+    )
+    flights: dict[UUID, FlightDetails] = {}
+    with tracer.start_as_current_span("parse FlightDetails"):
+        for flight_data in flights_data:
+            flight = _cache_flight_details(flight_data, reference)
+            flights[flight.id] = flight
+    return flights
+
+
+def _cache_flight_details(
+    flight_data: dict[str, Any], reference: ReferenceData
+) -> FlightDetails:
+    settings = get_settings()
+    details_cache = get_flight_details_cache()
+    flight = FlightDetails(**reference.join_flight(flight_data))
+    _set_cached(
+        details_cache,
+        ("flight", flight.id),
+        flight,
+        ttl=settings.flight_details_cache_static_ttl,
+        size=json_size(flight_data),
+    )
+    _set_cached(
+        details_cache,
+        ("availability", flight.id),
+        flight.cabins,
+        ttl=settings.flight_details_cache_availability_ttl,
+        size=json_size(flight_data["available_seats_counts"]),
+    )
+    return flight
+
+
+_get_flights_availability_query = persisted_query(
+    "flights/batch/availability",
+    """query getFlightsAvailability($flight_ids: [uuid!]!) {
+  flight(where: { id: { _in: $flight_ids } }) {
+    id
+    available_seats_counts {
+      cabin_class
+      total_seats_count
+      available_seats_count
+    }
+  }
 }
-"""
+""",
+)
 
 
-async def get_flight_details(
+@cache
+def get_flight_availability_loader() -> BatchLoader[UUID, list[Cabin]]:
+    """
+    Creates the flight availability loader on first call, and returns the cached
+    instance on subsequent calls.
+
+    The loader batches concurrent flight cabins availability lookups into a single
+    query to the inventory manager, and caches the loaded availability.
+
+    :return: The flight availability loader instance.
+    """
+    return _create_batch_loader(_load_flights_availability)
+
+
+async def _load_flights_availability(
+    flight_ids: list[UUID],
+) -> dict[UUID, list[Cabin]]:
+    settings = get_settings()
+    details_cache = get_flight_details_cache()
+    variables = {"flight_ids": [str(i) for i in flight_ids]}
+    response = await query_inventory_manager(_get_flights_availability_query, variables)
+    flights_cabins: dict[UUID, list[Cabin]] = {}
+    for flight_data in response["data"]["flight"]:
+        flight_id = UUID(flight_data["id"])
+        cabins_data = flight_data["available_seats_counts"]
+        cabins = [Cabin(**c) for c in cabins_data]
+        _set_cached(
+            details_cache,
+            ("availability", flight_id),
+            cabins,
+            ttl=settings.flight_details_cache_availability_ttl,
+            size=json_size(cabins_data),
+        )
+        flights_cabins[flight_id] = cabins
+    return flights_cabins
+
+
+async def get_flight_details_batch(
+    flight_ids: FlightIds,
+) -> dict[UUID, FlightDetails | None]:
+    """
+    Gets the details of multiple flights, from the flight details cache if possible,
+    and with batched queries to the inventory manager for the rest of the flights.
+
+    :return: The details of each requested flight by its flight ID (in the requested
+        order), or None if the flight was not found.
+    """
+    flights = await asyncio.gather(*map(get_flight_details, flight_ids.flight_ids))
+    return dict(zip(flight_ids.flight_ids, flights))
+
+
+async def get_flight_seats(
     flight_id: UUID = Path(
         ...,
         alias="flightId",
         description="The flight ID of the requested flight.",
     )
-) -> FlightDetails | None:
-    variables = {"flight_id": str(flight_id)}
-    response = await query_inventory_manager(_get_flight_query, variables)
-    flight_data = response["data"]["flight_by_pk"]
-    if not flight_data:
-        return None
-    return FlightDetails(**flight_data)
+) -> FlightSeats | None:
+    flight_seats: FlightSeats | None
+    flight_seats, _ = await _get_cached(
+        get_flight_details_cache(),
+        ("seats", flight_id),
+        lambda: get_flight_seats_loader().load(flight_id),
+    )
+    return flight_seats
 
 
-_get_flight_seats_query = """query getFlightSeats($flight_id: uuid!) {
-  flight_by_pk(id: $flight_id) {
+_get_flights_seats_query = persisted_query(
+    "flights/batch/seats",
+    """query getFlightsSeats($flight_ids: [uuid!]!) {
+  flight(where: { id: { _in: $flight_ids } }) {
     id
     aircraft_model {
       icao_code
-      iata_code
-      name
-      seat_maps {
-        cabin_class
-        start_row
-        end_row
-        column_layout
-      }
     }
     booked_seats {
       seat_row
@@ -253,19 +1352,79 @@ _get_flight_seats_query = """query getFlightSeats($flight_id: uuid!) {
     }
   }
 }
-"""
+""",
+)
 
 
-async def get_flight_seats(
-    flight_id: UUID = Path(
-        ...,
-        alias="flightId",
-        description="The flight ID of the requested flight.",
+@cache
+def get_flight_seats_loader() -> BatchLoader[UUID, FlightSeats]:
+    """
+    Creates the flight seats loader on first call, and returns the cached instance
+    on subsequent calls.
+
+    The loader batches concurrent flight seats lookups into a single query to the
+    inventory manager, and caches the loaded seats to be used if they cannot be
+    loaded later on.
+
+    :return: The flight seats loader instance.
+    """
+    return _create_batch_loader(_load_flights_seats)
+
+
+async def _load_flights_seats(flight_ids: list[UUID]) -> dict[UUID, FlightSeats]:
+    details_cache = get_flight_details_cache()
+    variables = {"flight_ids": [str(i) for i in flight_ids]}
+    response = await query_inventory_manager(_get_flights_seats_query, variables)
+    flights_seats_data = response["data"]["flight"]
+    reference = await get_reference_data_index().get(
+        aircraft_models=[f["aircraft_model"]["icao_code"] for f in flights_seats_data]
     )
-) -> FlightSeats | None:
-    variables = {"flight_id": str(flight_id)}
-    response = await query_inventory_manager(_get_flight_seats_query, variables)
-    flight_seats_data = response["data"]["flight_by_pk"]
-    if not flight_seats_data:
-        return None
-    return FlightSeats(**flight_seats_data)
+    flights_seats: dict[UUID, FlightSeats] = {}
+    with tracer.start_as_current_span("parse FlightSeats"):
+        for flight_seats_data in flights_seats_data:
+            flight_seats = FlightSeats(
+                **reference.join_flight(flight_seats_data, seat_map=True)
+            )
+            _set_cached(
+                details_cache,
+                ("seats", flight_seats.flight_id),
+                flight_seats,
+                ttl=0,
+                size=json_size(flight_seats_data),
+            )
+            flights_seats[flight_seats.flight_id] = flight_seats
+    return flights_seats
+
+
+@cache
+def get_flight_seats_streams() -> FlightSeatsStreams:
+    """
+    Creates the flight seats streams on first call, and returns the cached instance
+    on subsequent calls.
+
+    All streams of the same flight share a single poll loop, whose lookups are
+    batched with the lookups of other flights by the flight seats loader.
+
+    :return: The flight seats streams instance.
+    """
+    settings = get_settings()
+    return FlightSeatsStreams(
+        get_flight_seats_loader().load,
+        poll_interval=settings.flight_seats_stream_poll_interval,
+        heartbeat_interval=settings.flight_seats_stream_heartbeat_interval,
+        queue_size=settings.flight_seats_stream_queue_size,
+        max_streams=settings.flight_seats_stream_max_streams,
+    )
+
+
+async def get_flight_seats_batch(
+    flight_ids: FlightIds,
+) -> dict[UUID, FlightSeats | None]:
+    """
+    Gets the seats of multiple flights with batched queries to the inventory manager.
+
+    :return: The seats of each requested flight by its flight ID (in the requested
+        order), or None if the flight was not found.
+    """
+    flights_seats = await asyncio.gather(*map(get_flight_seats, flight_ids.flight_ids))
+    return dict(zip(flight_ids.flight_ids, flights_seats))
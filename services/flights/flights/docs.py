@@ -1,8 +1,11 @@
+import json
 from typing import Any
 
 from starlette import status
 
 from .exceptions import ErrorDetails
+from .seats import SEATS_BITMAP_MEDIA_TYPE
+from .streams import SSE_MEDIA_TYPE
 
 app_description = """
 The flights service presents an external API for the inventory,
@@ -12,6 +15,9 @@ which contains all of the flights information.
 - Get a list of all available flights for from the origin to the destination.
 - Get details about specific flights.
 - Get flight seats and seat maps.
+- Stream the changes in flight seats as they are booked.
+- Get the details and seats of multiple flights at once.
+- Get a calendar of the flights availability of a route over a range of days.
 """
 
 flights_examples: dict[int | str, Any] = {
@@ -79,6 +85,19 @@ flights_examples: dict[int | str, Any] = {
     },
 }
 
+service_unavailable_example: dict[str, Any] = {
+    "error": "Service unavailable",
+    "message": "The server is overloaded, try again later.",
+}
+
+
+service_unavailable_response: dict[str, Any] = {
+    "model": ErrorDetails,
+    "description": "The server is overloaded, try again after `Retry-After` seconds",
+    "content": {"application/json": {"example": service_unavailable_example}},
+}
+
+
 flights_responses: dict[int | str, Any] = {
     status.HTTP_200_OK: {
         "content": {
@@ -103,6 +122,70 @@ flights_responses: dict[int | str, Any] = {
             }
         },
     },
+    status.HTTP_503_SERVICE_UNAVAILABLE: service_unavailable_response,
+}
+
+
+flights_calendar_examples: dict[int | str, Any] = {
+    status.HTTP_200_OK: {
+        "name": "SK1",
+        "origin": "TLV",
+        "destination": "LAX",
+        "days": [
+            {
+                "date": "2020-01-01",
+                "flightsCount": 2,
+                "cabins": [
+                    {"cabinClass": "E", "maxAvailableSeatsCount": 151},
+                    {"cabinClass": "B", "maxAvailableSeatsCount": 16},
+                    {"cabinClass": "F", "maxAvailableSeatsCount": 20},
+                ],
+            },
+            {"date": "2020-01-02", "flightsCount": 0, "cabins": []},
+        ],
+    },
+    status.HTTP_404_NOT_FOUND: flights_examples[status.HTTP_404_NOT_FOUND],
+    status.HTTP_422_UNPROCESSABLE_ENTITY: {
+        "error": "Validation error",
+        "message": "Request has an invalid format.",
+        "details": [
+            {
+                "cause": "query/to",
+                "message": "ensure the calendar has at most 62 days",
+            },
+        ],
+    },
+}
+
+flights_calendar_responses: dict[int | str, Any] = {
+    status.HTTP_200_OK: {
+        "content": {
+            "application/json": {
+                "example": flights_calendar_examples[status.HTTP_200_OK]
+            }
+        }
+    },
+    status.HTTP_404_NOT_FOUND: {
+        "model": ErrorDetails,
+        "description": "Flights not found",
+        "content": {
+            "application/json": {
+                "example": flights_calendar_examples[status.HTTP_404_NOT_FOUND],
+            }
+        },
+    },
+    status.HTTP_422_UNPROCESSABLE_ENTITY: {
+        "model": ErrorDetails,
+        "description": "Validation error",
+        "content": {
+            "application/json": {
+                "example": flights_calendar_examples[
+                    status.HTTP_422_UNPROCESSABLE_ENTITY
+                ]
+            }
+        },
+    },
+    status.HTTP_503_SERVICE_UNAVAILABLE: service_unavailable_response,
 }
 
 
@@ -171,6 +254,12 @@ flight_responses: dict[int | str, Any] = {
             "application/json": {"example": flight_examples[status.HTTP_200_OK]}
         }
     },
+    status.HTTP_304_NOT_MODIFIED: {
+        "description": (
+            "Not modified, the response has the entity tag given in the "
+            "`If-None-Match` header"
+        ),
+    },
     status.HTTP_404_NOT_FOUND: {
         "model": ErrorDetails,
         "description": "Flight not found",
@@ -187,6 +276,7 @@ flight_responses: dict[int | str, Any] = {
             }
         },
     },
+    status.HTTP_503_SERVICE_UNAVAILABLE: service_unavailable_response,
 }
 
 
@@ -252,11 +342,205 @@ flight_seats_examples: dict[int | str, Any] = {
 }
 
 
+flight_seats_bitmap_example: dict[str, Any] = {
+    "flightId": "eb2e5080-000e-440d-8242-46428e577ce5",
+    "aircraftModel": {
+        "icaoCode": "B789",
+        "iataCode": "789",
+        "name": "Boeing 787-9 Dreamliner",
+    },
+    "cabins": [
+        {
+            "cabinClass": "F",
+            "seatMap": [
+                {
+                    "cabinClass": "F",
+                    "startRow": 1,
+                    "endRow": 8,
+                    "columnLayout": "A-DG-K",
+                }
+            ],
+            "seatsCount": 32,
+            "availableSeatsCount": 32,
+            "bookedSeatsBitmap": "AAAAAA==",
+        },
+        {
+            "cabinClass": "B",
+            "seatMap": [
+                {
+                    "cabinClass": "B",
+                    "startRow": 10,
+                    "endRow": 14,
+                    "columnLayout": "AC-DFG-HK",
+                }
+            ],
+            "seatsCount": 35,
+            "availableSeatsCount": 35,
+            "bookedSeatsBitmap": "AAAAAAA=",
+        },
+        {
+            "cabinClass": "E",
+            "seatMap": [
+                {
+                    "cabinClass": "E",
+                    "startRow": 21,
+                    "endRow": 28,
+                    "columnLayout": "ABC-DFG-HJK",
+                },
+                {
+                    "cabinClass": "E",
+                    "startRow": 29,
+                    "endRow": 30,
+                    "columnLayout": "###-###-HJK",
+                },
+                {
+                    "cabinClass": "E",
+                    "startRow": 35,
+                    "endRow": 36,
+                    "columnLayout": "ABC-###-HJK",
+                },
+                {
+                    "cabinClass": "E",
+                    "startRow": 37,
+                    "endRow": 48,
+                    "columnLayout": "ABC-DFG-HJK",
+                },
+                {
+                    "cabinClass": "E",
+                    "startRow": 49,
+                    "endRow": 50,
+                    "columnLayout": "###-DFG-###",
+                },
+            ],
+            "seatsCount": 204,
+            "availableSeatsCount": 201,
+            "bookedSeatsBitmap": "AAAAAAAAAAAAAAAAAAAA4AAAAAAAAAAAAAA=",
+        },
+    ],
+}
+
 flight_seats_responses: dict[int | str, Any] = {
     **flight_responses,
     status.HTTP_200_OK: {
         "content": {
-            "application/json": {"example": flight_seats_examples[status.HTTP_200_OK]}
+            "application/json": {
+                "examples": {
+                    "list": {
+                        "summary": "List format",
+                        "value": flight_seats_examples[status.HTTP_200_OK],
+                    },
+                    "bitmap": {
+                        "summary": "Bitmap format",
+                        "value": flight_seats_bitmap_example,
+                    },
+                }
+            },
+            SEATS_BITMAP_MEDIA_TYPE: {"example": flight_seats_bitmap_example},
+        }
+    },
+}
+
+
+flight_seats_change_example: dict[str, Any] = {
+    "flightId": "eb2e5080-000e-440d-8242-46428e577ce5",
+    "bookedSeats": [{"row": 41, "column": "A"}],
+    "releasedSeats": [{"row": 40, "column": "G"}],
+}
+
+
+flight_seats_stream_example = (
+    "id: 1\n"
+    "event: seats\n"
+    f"data: {json.dumps(flight_seats_examples[status.HTTP_200_OK])}\n\n"
+    ": heartbeat\n\n"
+    "id: 2\n"
+    "event: change\n"
+    f"data: {json.dumps(flight_seats_change_example)}\n\n"
+)
+
+
+flight_seats_stream_responses: dict[int | str, Any] = {
+    status.HTTP_200_OK: {
+        "description": (
+            "A stream of server-sent events. The `seats` event has the flight's "
+            "seats (as in the list format of the flight seats), and is sent first, "
+            "and whenever the stream falls behind. Each `change` event has the seats "
+            "which were booked or released since the previous event"
+        ),
+        "content": {SSE_MEDIA_TYPE: {"example": flight_seats_stream_example}},
+    },
+    status.HTTP_404_NOT_FOUND: flight_responses[status.HTTP_404_NOT_FOUND],
+    status.HTTP_422_UNPROCESSABLE_ENTITY: flight_responses[
+        status.HTTP_422_UNPROCESSABLE_ENTITY
+    ],
+    status.HTTP_503_SERVICE_UNAVAILABLE: service_unavailable_response
+    | {"description": "Too many concurrent streams, or the server is overloaded"},
+}
+
+
+flight_details_batch_examples: dict[int | str, Any] = {
+    status.HTTP_200_OK: {
+        "flights": {
+            "eb2e5080-000e-440d-8242-46428e577ce5": flight_examples[status.HTTP_200_OK]
+        },
+        "notFound": ["dd196d12-d12e-4c97-97db-4e24e253b6b4"],
+    },
+    status.HTTP_422_UNPROCESSABLE_ENTITY: {
+        "error": "Validation error",
+        "message": "Request has an invalid format.",
+        "details": [
+            {
+                "cause": "body/flightIds",
+                "message": "ensure this value has at most 50 items",
+            }
+        ],
+    },
+}
+
+
+flight_details_batch_responses: dict[int | str, Any] = {
+    status.HTTP_200_OK: {
+        "content": {
+            "application/json": {
+                "example": flight_details_batch_examples[status.HTTP_200_OK]
+            }
+        }
+    },
+    status.HTTP_422_UNPROCESSABLE_ENTITY: {
+        "model": ErrorDetails,
+        "description": "Validation error",
+        "content": {
+            "application/json": {
+                "example": flight_details_batch_examples[
+                    status.HTTP_422_UNPROCESSABLE_ENTITY
+                ]
+            }
+        },
+    },
+    status.HTTP_503_SERVICE_UNAVAILABLE: service_unavailable_response,
+}
+
+
+flight_seats_batch_examples: dict[int | str, Any] = {
+    **flight_details_batch_examples,
+    status.HTTP_200_OK: {
+        "flights": {
+            "eb2e5080-000e-440d-8242-46428e577ce5": flight_seats_examples[
+                status.HTTP_200_OK
+            ]
+        },
+        "notFound": ["dd196d12-d12e-4c97-97db-4e24e253b6b4"],
+    },
+}
+
+
+flight_seats_batch_responses: dict[int | str, Any] = {
+    **flight_details_batch_responses,
+    status.HTTP_200_OK: {
+        "content": {
+            "application/json": {
+                "example": flight_seats_batch_examples[status.HTTP_200_OK]
+            }
         }
     },
 }
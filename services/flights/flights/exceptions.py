@@ -56,3 +56,18 @@ class FlightNotFoundException(EndpointException):
 
 class ExternalDependencyException(Exception):
     pass
+
+
+class TransientExternalDependencyException(ExternalDependencyException):
+    """
+    Raised when a request to an external dependency failed transiently, e.g. it
+    timed out or the dependency was temporarily unavailable, so it may be retried.
+    """
+
+    pass
+
+
+class ServiceUnavailableException(Exception):
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Service unavailable, retry after {retry_after} seconds")
@@ -1,13 +1,13 @@
 import logging
-import time
-from datetime import datetime
+from uuid import UUID
 
-from fastapi import Depends, FastAPI, Request, Response, status
+from fastapi import Depends, FastAPI, Query, Request, Response, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
-from . import dependencies, docs, models, schemas
+from . import dependencies, docs, metrics, models, openapi, schemas
 from .config import config_logging, get_settings
 from .exceptions import (
     EndpointException,
@@ -15,10 +15,20 @@ from .exceptions import (
     ExternalDependencyException,
     FlightNotFoundException,
     ServiceNotFoundException,
+    ServiceUnavailableException,
 )
-from .util import log_access
+from .middleware import (
+    AccessLogMiddleware,
+    MetricsMiddleware,
+    RequestDeadlineMiddleware,
+)
+from .seats import SEATS_BITMAP_MEDIA_TYPE, SeatsFormat
+from .streams import SSE_MEDIA_TYPE
+from .tracing import config_tracing, shutdown_tracing
+from .util import conditional_json_response
 
 config_logging()
+config_tracing()
 log = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -32,22 +42,66 @@ app = FastAPI(
     ],
     root_path=get_settings().openapi_schema_prefix,
     root_path_in_servers=False,
+    default_response_class=ORJSONResponse,
 )
 
 
-@app.middleware("http")
-async def access_log_middleware(request: Request, call_next):
-    start_time = datetime.utcnow()
-    start_measure_ns = time.perf_counter_ns()
+REGISTRY.register(
+    metrics.StatisticsCollector(
+        caches={
+            "search": dependencies.get_flights_search_cache,
+            "calendar": dependencies.get_flights_calendar_cache,
+            "details": dependencies.get_flight_details_cache,
+        },
+        inventory_manager_caller=dependencies.get_inventory_manager_caller,
+        flight_seats_streams=dependencies.get_flight_seats_streams,
+    )
+)
+
+
+@app.on_event("startup")
+def load_openapi():
+    openapi.load_openapi(app)
+
+
+@app.on_event("startup")
+async def open_inventory_manager_client():
+    await dependencies.open_inventory_manager_client()
+
+
+@app.on_event("startup")
+async def start_reference_data_refresh():
+    await dependencies.start_reference_data_refresh()
+
+
+@app.on_event("startup")
+async def start_availability_mirror():
+    await dependencies.start_availability_mirror()
+
+
+@app.on_event("shutdown")
+async def stop_reference_data_refresh():
+    await dependencies.stop_reference_data_refresh()
+
 
-    response: Response = await call_next(request)
+@app.on_event("shutdown")
+async def stop_availability_mirror():
+    await dependencies.stop_availability_mirror()
 
-    duration_ns = time.perf_counter_ns() - start_measure_ns
-    end_time = datetime.utcnow()
 
-    log_access(log, request, response, start_time, end_time, duration_ns)
+@app.on_event("shutdown")
+async def close_inventory_manager_client():
+    await dependencies.close_inventory_manager_client()
 
-    return response
+
+@app.on_event("shutdown")
+def stop_tracing():
+    shutdown_tracing()
+
+
+app.add_middleware(AccessLogMiddleware, logger=log)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestDeadlineMiddleware, timeout=get_settings().request_timeout)
 
 
 @app.exception_handler(RequestValidationError)
@@ -78,6 +132,42 @@ async def request_exception_handler(request: Request, exc: ExternalDependencyExc
     )
 
 
+@app.exception_handler(ServiceUnavailableException)
+async def service_unavailable_exception_handler(
+    request: Request, exc: ServiceUnavailableException
+):
+    response = ErrorDetails(
+        error="Service unavailable",
+        message="The server is overloaded, try again later.",
+    )
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=jsonable_encoder(response, exclude_none=True),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+@app.get(
+    "/flights/{origin}/{destination}/calendar",
+    response_model=schemas.FlightsCalendar,
+    responses=docs.flights_calendar_responses,
+    summary="Get flights calendar",
+    tags=["flights"],
+)
+async def get_flights_calendar(
+    calendar: models.ServiceCalendar
+    | None = Depends(dependencies.get_flights_calendar),
+):
+    if not calendar:
+        raise ServiceNotFoundException
+    return ORJSONResponse(schemas.FlightsCalendar.dump_model(calendar))
+
+
 @app.get(
     "/flights/{origin}/{destination}/{departureTime}",
     response_model=schemas.FlightsList,
@@ -90,7 +180,37 @@ async def find_flights(
 ):
     if not service_flights:
         raise ServiceNotFoundException
-    return schemas.FlightsList.from_model(service_flights)
+    return ORJSONResponse(schemas.FlightsList.dump_model(service_flights))
+
+
+@app.post(
+    "/flights/batch",
+    response_model=schemas.FlightDetailsBatch,
+    responses=docs.flight_details_batch_responses,
+    summary="Get flight details batch",
+    tags=["flights"],
+)
+async def get_flight_details_batch(
+    flights: dict[UUID, models.FlightDetails | None] = Depends(
+        dependencies.get_flight_details_batch
+    ),
+):
+    return ORJSONResponse(schemas.FlightDetailsBatch.dump_models(flights))
+
+
+@app.post(
+    "/flights/batch/seats",
+    response_model=schemas.FlightSeatsBatch,
+    responses=docs.flight_seats_batch_responses,
+    summary="Get flight seats batch",
+    tags=["flights"],
+)
+async def get_flight_seats_batch(
+    flights_seats: dict[UUID, models.FlightSeats | None] = Depends(
+        dependencies.get_flight_seats_batch
+    ),
+):
+    return ORJSONResponse(schemas.FlightSeatsBatch.dump_models(flights_seats))
 
 
 @app.get(
@@ -101,23 +221,81 @@ async def find_flights(
     tags=["flights"],
 )
 async def get_flight_details(
+    request: Request,
     flight: models.FlightDetails | None = Depends(dependencies.get_flight_details),
 ):
     if not flight:
         raise FlightNotFoundException
-    return schemas.FlightDetails.from_model(flight)
+    return conditional_json_response(
+        request,
+        schemas.FlightDetails.etag(flight),
+        lambda: schemas.FlightDetails.dump_model(flight),
+    )
 
 
 @app.get(
     "/flight/{flightId}/seats",
-    response_model=schemas.FlightSeats,
+    response_model=schemas.FlightSeatsResponse,
     responses=docs.flight_seats_responses,
     summary="Get flight seats",
     tags=["flights"],
 )
 async def get_flight_seats(
+    request: Request,
+    seats_format: SeatsFormat = Query(
+        SeatsFormat.LIST,
+        alias="format",
+        description=(
+            "The representation of the flight's seats. The bitmap representation "
+            "may also be requested with the `Accept` header "
+            f"`{SEATS_BITMAP_MEDIA_TYPE}`."
+        ),
+    ),
+    flight_seats: models.FlightSeats = Depends(dependencies.get_flight_seats),
+):
+    if not flight_seats:
+        raise FlightNotFoundException
+    # The representation depends on the Accept header
+    headers = {"Vary": "Accept"}
+    if SEATS_BITMAP_MEDIA_TYPE in request.headers.get("accept", ""):
+        return conditional_json_response(
+            request,
+            schemas.FlightSeatsBitmap.etag(flight_seats),
+            lambda: schemas.FlightSeatsBitmap.dump_model(flight_seats),
+            media_type=SEATS_BITMAP_MEDIA_TYPE,
+            headers=headers,
+        )
+    if seats_format == SeatsFormat.BITMAP:
+        return conditional_json_response(
+            request,
+            schemas.FlightSeatsBitmap.etag(flight_seats),
+            lambda: schemas.FlightSeatsBitmap.dump_model(flight_seats),
+            headers=headers,
+        )
+    return conditional_json_response(
+        request,
+        schemas.FlightSeats.etag(flight_seats),
+        lambda: schemas.FlightSeats.dump_model(flight_seats),
+        headers=headers,
+    )
+
+
+@app.get(
+    "/flight/{flightId}/seats/stream",
+    response_class=StreamingResponse,
+    responses=docs.flight_seats_stream_responses,
+    summary="Stream flight seats",
+    tags=["flights"],
+)
+async def stream_flight_seats(
     flight_seats: models.FlightSeats = Depends(dependencies.get_flight_seats),
 ):
     if not flight_seats:
         raise FlightNotFoundException
-    return schemas.FlightSeats.from_model(flight_seats)
+    events = dependencies.get_flight_seats_streams().open(flight_seats)
+    return StreamingResponse(
+        events,
+        media_type=SSE_MEDIA_TYPE,
+        # Disables buffering of the stream by proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,230 @@
+import logging
+import time
+import weakref
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Any
+
+from prometheus_client import Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from starlette.applications import Starlette
+from starlette.types import Scope
+
+from .cache import TtlLruCache
+from .concurrency import AdaptiveConcurrencyLimiter
+from .config import QueuedStreamHandler
+from .streams import FlightSeatsStreams
+from .upstream import UpstreamCaller
+
+REQUEST_DURATION = Histogram(
+    "flights_http_request_duration_seconds",
+    "Duration of HTTP requests until their response is sent, in seconds",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "flights_http_requests_in_flight",
+    "Number of HTTP requests currently being handled",
+)
+INVENTORY_MANAGER_QUERY_DURATION = Histogram(
+    "flights_inventory_manager_query_duration_seconds",
+    "Duration of attempts of inventory manager queries, in seconds",
+    ["operation", "outcome"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+ROUTE_LABEL_SCOPE_KEY = "flights.route_label"
+
+_route_paths: "weakref.WeakKeyDictionary[Starlette, tuple[int, dict[Any, str]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def route_label(scope: Scope) -> str:
+    """
+    Gets the path template of the route which handled a request, so that requests
+    are labeled by a bounded set of routes rather than by their paths.
+
+    The route is found by the endpoint which the router matched and recorded in the
+    request's scope, so it should be called after the request was handled. The label
+    is stored in the scope, so that it is only found once per request.
+
+    :param scope: The ASGI scope of the handled request.
+    :return: The route's path template, e.g. ``/flight/{flightId}``.
+    """
+    label: str | None = scope.get(ROUTE_LABEL_SCOPE_KEY)
+    if label is None:
+        label = UNMATCHED_ROUTE
+        if "app" in scope and "endpoint" in scope:
+            paths = _get_route_paths(scope["app"])
+            label = paths.get(scope["endpoint"], UNMATCHED_ROUTE)
+        scope[ROUTE_LABEL_SCOPE_KEY] = label
+    return label
+
+
+def _get_route_paths(app: Starlette) -> dict[Any, str]:
+    """
+    :return: The path templates of an application's routes, by their endpoints.
+        Rebuilt when routes are added to the application.
+    """
+    routes_count, paths = _route_paths.get(app, (-1, {}))
+    if routes_count != len(app.routes):
+        paths = {}
+        for route in reversed(app.routes):
+            endpoint = getattr(route, "endpoint", getattr(route, "app", None))
+            path = getattr(route, "path", None)
+            if endpoint is not None and path is not None:
+                # The first route of an endpoint is the one matched by the router
+                paths[endpoint] = path
+        _route_paths[app] = (len(app.routes), paths)
+    return paths
+
+
+@contextmanager
+def observe_inventory_manager_query(operation: str) -> Iterator[None]:
+    """
+    Observes the duration and outcome of a single attempt of an inventory manager
+    query: ``success``, ``error`` or ``cancelled`` (e.g. timed out or hedged).
+
+    :param operation: The GraphQL operation name of the query.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    except BaseException as exc:
+        if not isinstance(exc, Exception):
+            outcome = "cancelled"
+        raise
+    finally:
+        INVENTORY_MANAGER_QUERY_DURATION.labels(operation, outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def _counters(
+    prefix: str,
+    documentation: str,
+    label: str,
+    statistics: dict[str, Any],
+) -> Iterable[Metric]:
+    """
+    Creates a counter family for each field of the given statistics dataclasses.
+    """
+    if not statistics:
+        return
+    for field in fields(next(iter(statistics.values()))):
+        counter = CounterMetricFamily(
+            f"{prefix}_{field.name}",
+            f"{documentation}: {field.name.replace('_', ' ')}",
+            labels=[label],
+        )
+        for name, value in statistics.items():
+            counter.add_metric([name], getattr(value, field.name))
+        yield counter
+
+
+def log_records_dropped() -> int:
+    """
+    :return: The number of log records dropped by the queued log handlers of the
+        service's loggers.
+    """
+    handlers = {*logging.getLogger().handlers, *logging.getLogger("flights").handlers}
+    return sum(h.dropped for h in handlers if isinstance(h, QueuedStreamHandler))
+
+
+class StatisticsCollector:
+    """
+    Exports the statistics which are kept by the service's components, such as its
+    caches and the calls to the inventory manager, when the metrics are scraped.
+
+    The components are given by their getters, which are only called on scrapes.
+    """
+
+    def __init__(
+        self,
+        *,
+        caches: dict[str, Callable[[], TtlLruCache[Any]]],
+        inventory_manager_caller: Callable[[], UpstreamCaller],
+        flight_seats_streams: Callable[[], FlightSeatsStreams],
+    ):
+        """
+        Initializes the collector.
+
+        :param caches: The getters of the caches, by their names.
+        :param inventory_manager_caller: The getter of the inventory manager's caller.
+        :param flight_seats_streams: The getter of the flight seats streams.
+        """
+        self._caches = caches
+        self._inventory_manager_caller = inventory_manager_caller
+        self._flight_seats_streams = flight_seats_streams
+
+    def collect(self) -> Iterable[Metric]:
+        yield from self._collect_caches()
+        caller = self._inventory_manager_caller()
+        yield from _counters(
+            "flights_inventory_manager",
+            "Inventory manager queries",
+            "operation",
+            dict(caller.statistics),
+        )
+        if caller.limiter is not None:
+            yield from self._collect_limiter(caller.limiter)
+        streams = self._flight_seats_streams()
+        yield GaugeMetricFamily(
+            "flights_seats_streams",
+            "Number of open flight seats streams",
+            value=streams.streams_count,
+        )
+        yield GaugeMetricFamily(
+            "flights_seats_streams_watched_flights",
+            "Number of flights watched by flight seats streams",
+            value=streams.watchers_count,
+        )
+        yield CounterMetricFamily(
+            "flights_log_records_dropped",
+            "Number of log records dropped as the log queue was full",
+            value=log_records_dropped(),
+        )
+
+    def _collect_caches(self) -> Iterable[Metric]:
+        caches = {name: get_cache() for name, get_cache in self._caches.items()}
+        yield from _counters(
+            "flights_cache",
+            "Cache lookups",
+            "cache",
+            {name: c.statistics for name, c in caches.items()},
+        )
+        entries = GaugeMetricFamily(
+            "flights_cache_entries", "Number of cache entries", labels=["cache"]
+        )
+        size = GaugeMetricFamily(
+            "flights_cache_size_bytes",
+            "Estimated size of cache entries, in bytes",
+            labels=["cache"],
+        )
+        for name, c in caches.items():
+            entries.add_metric([name], len(c))
+            size.add_metric([name], c.size)
+        yield entries
+        yield size
+
+    def _collect_limiter(self, limiter: AdaptiveConcurrencyLimiter) -> Iterable[Metric]:
+        for name, documentation, value in [
+            ("limit", "Current concurrency limit", limiter.limit),
+            ("in_flight", "Number of queries in flight", limiter.in_flight),
+            ("queued", "Number of queries waiting for the limit", limiter.queued),
+        ]:
+            yield GaugeMetricFamily(
+                f"flights_inventory_manager_concurrency_{name}",
+                f"Inventory manager concurrency limiter: {documentation}",
+                value=value,
+            )
+        for field in fields(limiter.statistics):
+            documentation = field.name.replace("_", " ")
+            yield CounterMetricFamily(
+                f"flights_inventory_manager_concurrency_{field.name}",
+                f"Inventory manager concurrency limiter: {documentation}",
+                value=getattr(limiter.statistics, field.name),
+            )
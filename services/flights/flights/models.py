@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -60,6 +60,34 @@ class FlightDetails(Flight):
     service: Service
 
 
+class CabinAvailability(BaseModel):
+    cabin_class: CabinClass
+    available_seats_count: int
+
+
+class FlightAvailability(BaseModel):
+    departure_time: datetime
+    cabins: list[CabinAvailability] = Field(alias="available_seats_counts")
+
+
+class ServiceFlightsAvailability(BaseModel):
+    id: int
+    flights: list[FlightAvailability]
+
+
+class CalendarDay(BaseModel):
+    day: date
+    flights_count: int
+    cabins: list[CabinAvailability]
+
+
+class ServiceCalendar(BaseModel):
+    id: int
+    origin: str
+    destination: str
+    days: list[CalendarDay]
+
+
 class SeatMapSection(BaseModel):
     cabin_class: CabinClass
     start_row: int
@@ -82,3 +110,9 @@ class FlightSeats(BaseModel):
         alias="aircraft_model"
     )
     booked_seats: list[BookedSeat]
+
+
+class FlightSeatsChange(BaseModel):
+    flight_id: UUID
+    booked_seats: list[BookedSeat]
+    released_seats: list[BookedSeat]
@@ -0,0 +1,115 @@
+"""
+The service's OpenAPI document is generated at build time rather than on the first
+request for it, and stored in ``flights/openapi.json``.
+
+To regenerate the document after changing the API, navigate to the project's
+directory and run::
+
+    python -m flights.openapi
+"""
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+
+log = logging.getLogger(__name__)
+
+OPENAPI_PATH = Path(__file__).parent / "openapi.json"
+
+
+def generate_openapi(app: FastAPI) -> dict[str, Any]:
+    """
+    Generates the OpenAPI document of an application.
+
+    The document does not include the application's servers, as they depend on the
+    application's settings. They are added when the document is loaded.
+
+    :param app: The application.
+    :return: The OpenAPI document.
+    """
+    return get_openapi(
+        title=app.title,
+        version=app.version,
+        openapi_version=app.openapi_version,
+        description=app.description,
+        terms_of_service=app.terms_of_service,
+        contact=app.contact,
+        license_info=app.license_info,
+        routes=app.routes,
+        tags=app.openapi_tags,
+    )
+
+
+def dump_openapi(document: dict[str, Any]) -> str:
+    """
+    :param document: An OpenAPI document.
+    :return: The document's JSON, as stored in the prebuilt document file.
+    """
+    return json.dumps(document, indent=2) + "\n"
+
+
+def load_openapi(app: FastAPI, path: Path = OPENAPI_PATH):
+    """
+    Loads the prebuilt OpenAPI document for the application to serve, instead of
+    generating it on the first request for it.
+
+    If the prebuilt document does not exist, the document is generated on the first
+    request for it, as usual.
+
+    :param app: The application.
+    :param path: The path of the prebuilt document.
+    """
+    try:
+        document = json.loads(path.read_text())
+    except FileNotFoundError:
+        log.warning("Prebuilt OpenAPI document %s does not exist", path)
+        return
+    if app.servers:
+        document["servers"] = app.servers
+    app.openapi_schema = document
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m flights.openapi",
+        description="Generates the prebuilt OpenAPI document of the service.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that the prebuilt document is up to date",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=OPENAPI_PATH,
+        help="Path of the prebuilt document (default: flights/openapi.json)",
+    )
+    args = parser.parse_args(argv)
+
+    # The document does not depend on the settings, but the application requires them
+    os.environ.setdefault(
+        "SKYLINE_INVENTORY_MANAGER_URL", "http://localhost:8080/v1/graphql"
+    )
+    from .main import app
+
+    content = dump_openapi(generate_openapi(app))
+    if args.check:
+        if not args.output.exists() or args.output.read_text() != content:
+            print(f"{args.output} is out of date, run: python -m flights.openapi")
+            return 1
+        print(f"{args.output} is up to date")
+        return 0
+    args.output.write_text(content)
+    print(f"Saved the OpenAPI document to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
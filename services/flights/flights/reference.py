@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from .concurrency import SingleFlight
+from .exceptions import ExternalDependencyException, ServiceUnavailableException
+from .models import AircraftModel, AircraftModelWithSeatMap, Airport
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """
+    An immutable index of the inventory's reference data, which rarely changes.
+
+    Queries to the inventory manager select only the codes of airports and aircraft
+    models, which are joined locally with this index.
+    """
+
+    airports: Mapping[str, Airport]
+    """Airports by their IATA code."""
+    aircraft_models: Mapping[str, AircraftModel]
+    """Aircraft models by their ICAO code."""
+    aircraft_models_with_seat_map: Mapping[str, AircraftModelWithSeatMap]
+    """Aircraft models with their seat maps by their ICAO code."""
+
+    @classmethod
+    def parse(cls, data: dict[str, Any]) -> "ReferenceData":
+        """
+        Parses the reference data from the response of the ``getReferenceData``
+        query.
+
+        :param data: The data of the response.
+        :return: The reference data index.
+        """
+        airports = {a["iata_code"]: Airport(**a) for a in data["airport"]}
+        aircraft_models_with_seat_map = {
+            m["icao_code"]: AircraftModelWithSeatMap(**m)
+            for m in data["aircraft_model"]
+        }
+        aircraft_models = {
+            icao_code: AircraftModel(
+                icao_code=m.icao_code, iata_code=m.iata_code, name=m.name
+            )
+            for icao_code, m in aircraft_models_with_seat_map.items()
+        }
+        return cls(
+            airports=MappingProxyType(airports),
+            aircraft_models=MappingProxyType(aircraft_models),
+            aircraft_models_with_seat_map=MappingProxyType(
+                aircraft_models_with_seat_map
+            ),
+        )
+
+    def contains(
+        self, airports: Iterable[str] = (), aircraft_models: Iterable[str] = ()
+    ) -> bool:
+        """
+        :param airports: IATA codes of airports.
+        :param aircraft_models: ICAO codes of aircraft models.
+        :return: Whether all of the given airports and aircraft models are indexed.
+        """
+        return all(a in self.airports for a in airports) and all(
+            m in self.aircraft_models for m in aircraft_models
+        )
+
+    def join_service(self, service_data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Joins the airports of a service, selected by their IATA codes only.
+
+        :param service_data: The service's data, which is not modified.
+        :return: The service's data with its airports' models.
+        """
+        return service_data | {
+            "origin_airport": self.airports[
+                service_data["origin_airport"]["iata_code"]
+            ],
+            "destination_airport": self.airports[
+                service_data["destination_airport"]["iata_code"]
+            ],
+        }
+
+    def join_flight(
+        self, flight_data: dict[str, Any], *, seat_map: bool = False
+    ) -> dict[str, Any]:
+        """
+        Joins the aircraft model of a flight, and the airports of its service if
+        selected, which are selected by their codes only.
+
+        :param flight_data: The flight's data, which is not modified.
+        :param seat_map: Whether to join the aircraft model's seat map.
+        :return: The flight's data with its aircraft model's model.
+        """
+        icao_code = flight_data["aircraft_model"]["icao_code"]
+        aircraft_models = (
+            self.aircraft_models_with_seat_map if seat_map else self.aircraft_models
+        )
+        flight_data = flight_data | {"aircraft_model": aircraft_models[icao_code]}
+        if "service" in flight_data:
+            flight_data["service"] = self.join_service(flight_data["service"])
+        return flight_data
+
+
+class ReferenceDataIndex:
+    """
+    Holds the current :class:`ReferenceData`, which is loaded on first use and
+    refreshed periodically in the background.
+
+    Data referencing airports or aircraft models which are not indexed yet causes the
+    reference data to be reloaded immediately.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Awaitable[ReferenceData]],
+        *,
+        refresh_interval: float,
+    ):
+        """
+        Initializes the index, without loading the reference data.
+
+        :param load: Loads the reference data from the inventory manager.
+        :param refresh_interval: The time between reloads of the reference data,
+            in seconds.
+        """
+        self.refresh_interval = refresh_interval
+        self._load = load
+        self._loads: SingleFlight[ReferenceData] = SingleFlight()
+        self._data: ReferenceData | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def get(
+        self, airports: Iterable[str] = (), aircraft_models: Iterable[str] = ()
+    ) -> ReferenceData:
+        """
+        Gets the reference data, which indexes the given airports and aircraft models.
+
+        :param airports: IATA codes of the required airports.
+        :param aircraft_models: ICAO codes of the required aircraft models.
+        :return: The reference data.
+        :raises ExternalDependencyException: If the reference data could not be
+            loaded, or does not index all of the required airports and aircraft
+            models.
+        """
+        airports = set(airports)
+        aircraft_models = set(aircraft_models)
+        data = self._data
+        if data is not None and data.contains(airports, aircraft_models):
+            return data
+        data = await self.reload()
+        if not data.contains(airports, aircraft_models):
+            log.error(
+                "Unknown airports %s or aircraft models %s in inventory manager data",
+                sorted(airports - data.airports.keys()),
+                sorted(aircraft_models - data.aircraft_models.keys()),
+            )
+            raise ExternalDependencyException
+        return data
+
+    async def reload(self) -> ReferenceData:
+        """
+        Reloads the reference data, or awaits a reload which is already in progress.
+
+        :return: The reloaded reference data.
+        """
+        return await self._loads.do(None, self._reload)
+
+    async def _reload(self) -> ReferenceData:
+        data = await self._load()
+        self._data = data
+        log.info(
+            "Loaded reference data of %d airports and %d aircraft models",
+            len(data.airports),
+            len(data.aircraft_models),
+        )
+        return data
+
+    def start(self):
+        """
+        Starts refreshing the reference data in the background, unless it was
+        already started.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        """
+        Stops refreshing the reference data.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh(self):
+        while True:
+            try:
+                await self.reload()
+            except (ExternalDependencyException, ServiceUnavailableException):
+                log.warning("Could not refresh reference data, keeping previous data")
+            await asyncio.sleep(self.refresh_interval)
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
+from typing import Any
 from uuid import UUID
 
 from humps import camelize
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 
 from . import models
 from .config import get_settings
-from .util import CabinClass
+from .seats import SeatsFormat, encode_booked_seats, get_seat_layouts
+from .tracing import traced
+from .util import CabinClass, compute_etag
 
 
 class CamelCaseModel(BaseModel):
+    """
+    Base model of the response schemas, which describe the responses in the OpenAPI
+    schema.
+
+    Responses are not built from the schemas' models, but rather with each schema's
+    ``dump_model`` method directly as JSON compatible dictionaries with camelCase
+    keys, which must match the schema. Schemas of conditionally requested responses
+    also have an ``etag`` method, which must cover every dumped value.
+    """
+
     class Config:
         alias_generator = camelize
         allow_population_by_field_name = True
@@ -27,9 +40,9 @@ class Coordinates(CamelCaseModel):
     )
     data: list[float] = Field(description="The coordinates data")
 
-    @classmethod
-    def from_model(cls, geo_location: models.GeoLocation) -> Coordinates:
-        return cls.construct(crs=geo_location.crs, data=geo_location.coordinates)
+    @staticmethod
+    def dump_model(geo_location: models.GeoLocation) -> dict[str, Any]:
+        return {"crs": geo_location.crs, "data": geo_location.coordinates}
 
 
 class Location(CamelCaseModel):
@@ -51,18 +64,18 @@ class Airport(CamelCaseModel):
     name: str = Field(description="Name of the airport")
     location: Location = Field(description="The airport's location")
 
-    @classmethod
-    def from_model(cls, airport: models.Airport) -> Airport:
-        return cls.construct(
-            iata_code=airport.iata_code,
-            icao_code=airport.icao_code,
-            name=airport.name,
-            location=Location.construct(
-                subdivision_code=airport.subdivision_code,
-                city=airport.city,
-                coordinates=Coordinates.from_model(airport.geo_location),
-            ),
-        )
+    @staticmethod
+    def dump_model(airport: models.Airport) -> dict[str, Any]:
+        return {
+            "iataCode": airport.iata_code,
+            "icaoCode": airport.icao_code,
+            "name": airport.name,
+            "location": {
+                "subdivisionCode": airport.subdivision_code,
+                "city": airport.city,
+                "coordinates": Coordinates.dump_model(airport.geo_location),
+            },
+        }
 
 
 class AircraftModel(CamelCaseModel):
@@ -74,9 +87,13 @@ class AircraftModel(CamelCaseModel):
     )
     name: str = Field(description="Model name of the aircraft")
 
-    @classmethod
-    def from_model(cls, aircraft_model: models.AircraftModel) -> AircraftModel:
-        return cls.parse_obj(aircraft_model)
+    @staticmethod
+    def dump_model(aircraft_model: models.AircraftModel) -> dict[str, Any]:
+        return {
+            "icaoCode": aircraft_model.icao_code,
+            "iataCode": aircraft_model.iata_code,
+            "name": aircraft_model.name,
+        }
 
 
 class Cabin(CamelCaseModel):
@@ -88,13 +105,13 @@ class Cabin(CamelCaseModel):
         title="Available seats count", description="Number of available seats"
     )
 
-    @classmethod
-    def from_model(cls, cabin: models.Cabin) -> Cabin:
-        return cls.construct(
-            cabin_class=cabin.cabin_class,
-            seats_count=cabin.seats_count,
-            available_seats_count=cabin.available_seats_count,
-        )
+    @staticmethod
+    def dump_model(cabin: models.Cabin) -> dict[str, Any]:
+        return {
+            "cabinClass": cabin.cabin_class,
+            "seatsCount": cabin.seats_count,
+            "availableSeatsCount": cabin.available_seats_count,
+        }
 
 
 class Flight(CamelCaseModel):
@@ -117,32 +134,63 @@ class Flight(CamelCaseModel):
     cabins: list[Cabin] = Field(description="Cabins statistics for the flight")
 
 
+def _dump_flight(flight: models.Flight) -> dict[str, Any]:
+    return {
+        "id": flight.id,
+        "departureTerminal": flight.departure_terminal,
+        "departureTime": flight.departure_time,
+        "arrivalTerminal": flight.arrival_terminal,
+        "arrivalTime": flight.arrival_time,
+        "aircraftModel": AircraftModel.dump_model(flight.aircraft_model),
+        "cabins": [Cabin.dump_model(c) for c in flight.cabins],
+    }
+
+
+def _airport_etag_parts(airport: models.Airport) -> tuple[Any, ...]:
+    return (
+        airport.iata_code,
+        airport.icao_code,
+        airport.name,
+        airport.subdivision_code,
+        airport.city,
+        airport.geo_location.crs,
+        tuple(airport.geo_location.coordinates),
+    )
+
+
+def _aircraft_model_etag_parts(aircraft_model: models.AircraftModel) -> tuple[Any, ...]:
+    return (aircraft_model.icao_code, aircraft_model.iata_code, aircraft_model.name)
+
+
+def _flight_seats_etag_parts(flight_seats: models.FlightSeats) -> tuple[Any, ...]:
+    aircraft_model = flight_seats.aircraft_model_with_seat_map
+    return (
+        flight_seats.flight_id,
+        _aircraft_model_etag_parts(aircraft_model),
+        tuple(
+            (s.cabin_class, s.start_row, s.end_row, s.column_layout)
+            for s in aircraft_model.seat_map
+        ),
+        tuple(sorted((b.row, b.column) for b in flight_seats.booked_seats)),
+    )
+
+
 class FlightsList(CamelCaseModel):
     name: str = Field(description="Service name for this itinerary")
     origin: Airport = Field(description="Airport from which the flight originates")
     destination: Airport = Field(description="The destination airport for the flight")
     flights: list[Flight]
 
-    @classmethod
-    def from_model(cls, service_flights: models.ServiceFlights) -> FlightsList:
+    @staticmethod
+    @traced("serialize FlightsList")
+    def dump_model(service_flights: models.ServiceFlights) -> dict[str, Any]:
         settings = get_settings()
-        return cls.construct(
-            name=f"{settings.iata_airline_code}{service_flights.id}",
-            origin=Airport.from_model(service_flights.origin_airport),
-            destination=Airport.from_model(service_flights.destination_airport),
-            flights=[
-                Flight.construct(
-                    id=flight.id,
-                    departure_terminal=flight.departure_terminal,
-                    departure_time=flight.departure_time,
-                    arrival_time=flight.arrival_time,
-                    arrival_terminal=flight.arrival_terminal,
-                    aircraft_model=AircraftModel.from_model(flight.aircraft_model),
-                    cabins=[Cabin.from_model(c) for c in flight.cabins],
-                )
-                for flight in service_flights.flights
-            ],
-        )
+        return {
+            "name": f"{settings.iata_airline_code}{service_flights.id}",
+            "origin": Airport.dump_model(service_flights.origin_airport),
+            "destination": Airport.dump_model(service_flights.destination_airport),
+            "flights": [_dump_flight(f) for f in service_flights.flights],
+        }
 
 
 class FlightDetails(Flight):
@@ -150,22 +198,136 @@ class FlightDetails(Flight):
     origin: Airport = Field(description="Airport from which the flight originates")
     destination: Airport = Field(description="The destination airport for the flight")
 
-    @classmethod
-    def from_model(cls, flight: models.FlightDetails) -> FlightDetails:
+    @staticmethod
+    def etag(flight: models.FlightDetails) -> str:
         settings = get_settings()
-        return cls.construct(
-            id=flight.id,
-            name=f"{settings.iata_airline_code}{flight.service.id}",
-            origin=Airport.from_model(flight.service.origin_airport),
-            destination=Airport.from_model(flight.service.destination_airport),
-            departure_terminal=flight.departure_terminal,
-            departure_time=flight.departure_time,
-            arrival_terminal=flight.arrival_terminal,
-            arrival_time=flight.arrival_time,
-            aircraft_model=AircraftModel.from_model(flight.aircraft_model),
-            cabins=[Cabin.from_model(c) for c in flight.cabins],
+        return compute_etag(
+            settings.iata_airline_code,
+            flight.id,
+            flight.service.id,
+            _airport_etag_parts(flight.service.origin_airport),
+            _airport_etag_parts(flight.service.destination_airport),
+            flight.departure_terminal,
+            flight.departure_time,
+            flight.arrival_terminal,
+            flight.arrival_time,
+            _aircraft_model_etag_parts(flight.aircraft_model),
+            tuple(
+                (c.cabin_class, c.seats_count, c.available_seats_count)
+                for c in flight.cabins
+            ),
         )
 
+    @staticmethod
+    @traced("serialize FlightDetails")
+    def dump_model(flight: models.FlightDetails) -> dict[str, Any]:
+        settings = get_settings()
+        return _dump_flight(flight) | {
+            "name": f"{settings.iata_airline_code}{flight.service.id}",
+            "origin": Airport.dump_model(flight.service.origin_airport),
+            "destination": Airport.dump_model(flight.service.destination_airport),
+        }
+
+
+class CalendarCabin(CamelCaseModel):
+    cabin_class: CabinClass = Field(
+        title="Cabin class", description="Cabin class of this cabin"
+    )
+    max_available_seats_count: int = Field(
+        title="Maximal available seats count",
+        description="Maximal number of available seats in this cabin of a flight",
+    )
+
+    @staticmethod
+    def dump_model(cabin: models.CabinAvailability) -> dict[str, Any]:
+        return {
+            "cabinClass": cabin.cabin_class,
+            "maxAvailableSeatsCount": cabin.available_seats_count,
+        }
+
+
+class CalendarDay(CamelCaseModel):
+    day: date = Field(
+        alias="date", description="The day of the flights' departure (UTC)"
+    )
+    flights_count: int = Field(
+        title="Flights count",
+        description="Number of available flights departing on this day",
+    )
+    cabins: list[CalendarCabin] = Field(
+        description="Cabins availability statistics of the day's available flights"
+    )
+
+    @staticmethod
+    def dump_model(day: models.CalendarDay) -> dict[str, Any]:
+        return {
+            "date": day.day,
+            "flightsCount": day.flights_count,
+            "cabins": [CalendarCabin.dump_model(c) for c in day.cabins],
+        }
+
+
+class FlightsCalendar(CamelCaseModel):
+    name: str = Field(description="Service name for this itinerary")
+    origin: str = Field(
+        description="IATA airport code of the airport from which the flights originate"
+    )
+    destination: str = Field(
+        description="IATA airport code of the destination airport of the flights"
+    )
+    days: list[CalendarDay] = Field(description="Availability of flights by day")
+
+    @staticmethod
+    @traced("serialize FlightsCalendar")
+    def dump_model(calendar: models.ServiceCalendar) -> dict[str, Any]:
+        settings = get_settings()
+        return {
+            "name": f"{settings.iata_airline_code}{calendar.id}",
+            "origin": calendar.origin,
+            "destination": calendar.destination,
+            "days": [CalendarDay.dump_model(d) for d in calendar.days],
+        }
+
+
+class FlightIds(CamelCaseModel):
+    flight_ids: list[UUID] = Field(
+        title="Flight IDs",
+        description="IDs of the requested flights",
+        min_items=1,
+    )
+
+    @validator("flight_ids")
+    def validate_batch_size(cls, flight_ids: list[UUID]) -> list[UUID]:
+        max_batch_size = get_settings().flights_batch_max_size
+        if len(flight_ids) > max_batch_size:
+            raise ValueError(f"ensure this value has at most {max_batch_size} items")
+        # Remove duplicate IDs, while keeping the requested order
+        return list(dict.fromkeys(flight_ids))
+
+
+class FlightDetailsBatch(CamelCaseModel):
+    flights: dict[UUID, FlightDetails] = Field(
+        description="Details of the requested flights which were found, by flight ID"
+    )
+    not_found: list[UUID] = Field(
+        title="Not found",
+        description="IDs of the requested flights which were not found",
+    )
+
+    @staticmethod
+    @traced("serialize FlightDetailsBatch")
+    def dump_models(flights: dict[UUID, models.FlightDetails | None]) -> dict[str, Any]:
+        return {
+            "flights": {
+                str(flight_id): FlightDetails.dump_model(flight)
+                for flight_id, flight in flights.items()
+                if flight
+            },
+            "notFound": [
+                flight_id for flight_id, flight in flights.items() if not flight
+            ],
+        }
+
 
 class SeatMapSection(CamelCaseModel):
     cabin_class: CabinClass = Field(
@@ -178,18 +340,23 @@ class SeatMapSection(CamelCaseModel):
         description="Column layout for this section, e.g. ABC-DE-F#H",
     )
 
-    @classmethod
-    def from_model(cls, seat_map_section: models.SeatMapSection) -> SeatMapSection:
-        return cls.parse_obj(seat_map_section)
+    @staticmethod
+    def dump_model(seat_map_section: models.SeatMapSection) -> dict[str, Any]:
+        return {
+            "cabinClass": seat_map_section.cabin_class,
+            "startRow": seat_map_section.start_row,
+            "endRow": seat_map_section.end_row,
+            "columnLayout": seat_map_section.column_layout,
+        }
 
 
 class BookedSeat(CamelCaseModel):
     row: int = Field(description="Row number of the booked seat")
     column: str = Field(description="Column name of the booked seat")
 
-    @classmethod
-    def from_model(cls, booked_seat: models.BookedSeat) -> BookedSeat:
-        return cls.parse_obj(booked_seat)
+    @staticmethod
+    def dump_model(booked_seat: models.BookedSeat) -> dict[str, Any]:
+        return {"row": booked_seat.row, "column": booked_seat.column}
 
 
 class FlightSeats(CamelCaseModel):
@@ -204,16 +371,128 @@ class FlightSeats(CamelCaseModel):
         title="Booked seats", description="The flight's booked seats"
     )
 
-    @classmethod
-    def from_model(cls, flight_seats: models.FlightSeats) -> FlightSeats:
-        return cls.construct(
-            flight_id=flight_seats.flight_id,
-            aircraft_model=AircraftModel.from_model(
-                flight_seats.aircraft_model_with_seat_map
-            ),
-            seat_map=[
-                SeatMapSection.from_model(s)
-                for s in flight_seats.aircraft_model_with_seat_map.seat_map
+    @staticmethod
+    def etag(flight_seats: models.FlightSeats) -> str:
+        return compute_etag(SeatsFormat.LIST, *_flight_seats_etag_parts(flight_seats))
+
+    @staticmethod
+    @traced("serialize FlightSeats")
+    def dump_model(flight_seats: models.FlightSeats) -> dict[str, Any]:
+        aircraft_model = flight_seats.aircraft_model_with_seat_map
+        return {
+            "flightId": flight_seats.flight_id,
+            "aircraftModel": AircraftModel.dump_model(aircraft_model),
+            "seatMap": [SeatMapSection.dump_model(s) for s in aircraft_model.seat_map],
+            "bookedSeats": [
+                BookedSeat.dump_model(b) for b in flight_seats.booked_seats
             ],
-            booked_seats=[BookedSeat.from_model(b) for b in flight_seats.booked_seats],
-        )
+        }
+
+
+class CabinSeats(CamelCaseModel):
+    cabin_class: CabinClass = Field(
+        title="Cabin class", description="Cabin class of this cabin"
+    )
+    seat_map: list[SeatMapSection] = Field(
+        title="Seat map", description="Seat map sections of this cabin"
+    )
+    seats_count: int = Field(title="Seats count", description="Total number of seats")
+    available_seats_count: int = Field(
+        title="Available seats count", description="Number of available seats"
+    )
+    booked_seats_bitmap: str = Field(
+        title="Booked seats bitmap",
+        description=(
+            "Bitmap of the booked seats of this cabin, encoded with URL-safe base64. "
+            "Each seat is represented by a single bit, ordered by row and then by "
+            "column from left to right according to the seat map, starting from the "
+            "most significant bit of the first byte. A set bit marks a booked seat"
+        ),
+    )
+
+
+class FlightSeatsChange(CamelCaseModel):
+    flight_id: UUID = Field(title="Flight ID", description="ID of the flight")
+    booked_seats: list[BookedSeat] = Field(
+        title="Booked seats", description="The seats which were booked"
+    )
+    released_seats: list[BookedSeat] = Field(
+        title="Released seats",
+        description="The seats which were booked, and are now available",
+    )
+
+    @staticmethod
+    def dump_model(change: models.FlightSeatsChange) -> dict[str, Any]:
+        return {
+            "flightId": change.flight_id,
+            "bookedSeats": [BookedSeat.dump_model(b) for b in change.booked_seats],
+            "releasedSeats": [BookedSeat.dump_model(b) for b in change.released_seats],
+        }
+
+
+class FlightSeatsBitmap(CamelCaseModel):
+    flight_id: UUID = Field(title="Flight ID", description="ID of the flight")
+    aircraft_model: AircraftModel = Field(
+        title="Aircraft model", description="The flight's aircraft model"
+    )
+    cabins: list[CabinSeats] = Field(description="Seats of the flight's cabins")
+
+    @staticmethod
+    def etag(flight_seats: models.FlightSeats) -> str:
+        return compute_etag(SeatsFormat.BITMAP, *_flight_seats_etag_parts(flight_seats))
+
+    @staticmethod
+    @traced("serialize FlightSeatsBitmap")
+    def dump_model(flight_seats: models.FlightSeats) -> dict[str, Any]:
+        aircraft_model = flight_seats.aircraft_model_with_seat_map
+        cabins: list[dict[str, Any]] = []
+        for layout in get_seat_layouts(aircraft_model):
+            bitmap, booked_seats_count = encode_booked_seats(
+                layout, flight_seats.booked_seats
+            )
+            cabins.append(
+                {
+                    "cabinClass": layout.cabin_class,
+                    "seatMap": [SeatMapSection.dump_model(s) for s in layout.sections],
+                    "seatsCount": layout.seats_count,
+                    "availableSeatsCount": layout.seats_count - booked_seats_count,
+                    "bookedSeatsBitmap": bitmap,
+                }
+            )
+        return {
+            "flightId": flight_seats.flight_id,
+            "aircraftModel": AircraftModel.dump_model(aircraft_model),
+            "cabins": cabins,
+        }
+
+
+class FlightSeatsResponse(BaseModel):
+    __root__: FlightSeats | FlightSeatsBitmap
+
+
+class FlightSeatsBatch(CamelCaseModel):
+    flights: dict[UUID, FlightSeats] = Field(
+        description="Seats of the requested flights which were found, by flight ID"
+    )
+    not_found: list[UUID] = Field(
+        title="Not found",
+        description="IDs of the requested flights which were not found",
+    )
+
+    @staticmethod
+    @traced("serialize FlightSeatsBatch")
+    def dump_models(
+        flights_seats: dict[UUID, models.FlightSeats | None]
+    ) -> dict[str, Any]:
+        return {
+            "flights": {
+                str(flight_id): FlightSeats.dump_model(flight_seats)
+                for flight_id, flight_seats in flights_seats.items()
+                if flight_seats
+            },
+            "notFound": [
+                flight_id
+                for flight_id, flight_seats in flights_seats.items()
+                if not flight_seats
+            ],
+        }
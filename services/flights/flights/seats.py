@@ -0,0 +1,117 @@
+import base64
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+
+from .models import AircraftModelWithSeatMap, BookedSeat, SeatMapSection
+from .util import CabinClass
+
+SEATS_BITMAP_MEDIA_TYPE = "application/vnd.skyline.seats-bitmap+json"
+
+
+class SeatsFormat(str, Enum):
+    """
+    Representation format of a flight's seats.
+
+    * list - The seat map, along with a list of the booked seats.
+    * bitmap - The seat map of each cabin, along with a bitmap of its booked seats.
+    """
+
+    LIST = "list"
+    BITMAP = "bitmap"
+
+
+@dataclass(frozen=True)
+class CabinSeatLayout:
+    """
+    The seats of an aircraft's cabin, in the order of the cabin's bitmap: by row, and
+    then by column from left to right.
+    """
+
+    cabin_class: CabinClass
+    sections: tuple[SeatMapSection, ...]
+    seat_indexes: dict[tuple[int, str], int]
+
+    @property
+    def seats_count(self) -> int:
+        return len(self.seat_indexes)
+
+
+def get_seat_layouts(
+    aircraft_model: AircraftModelWithSeatMap,
+) -> tuple[CabinSeatLayout, ...]:
+    """
+    Expands the column layouts of an aircraft model's seat map to the seats of each
+    of its cabins. The expansion is cached by the aircraft model and its seat map.
+
+    :param aircraft_model: The aircraft model with its seat map.
+    :return: The seat layout of each cabin, in the order of the seat map.
+    """
+    sections = tuple(
+        (s.cabin_class, s.start_row, s.end_row, s.column_layout)
+        for s in aircraft_model.seat_map
+    )
+    return _expand_seat_map(aircraft_model.icao_code, sections)
+
+
+@lru_cache(maxsize=128)
+def _expand_seat_map(
+    icao_code: str,
+    sections: tuple[tuple[CabinClass, int, int, str], ...],
+) -> tuple[CabinSeatLayout, ...]:
+    cabins_sections: dict[CabinClass, list[SeatMapSection]] = {}
+    for cabin_class, start_row, end_row, column_layout in sections:
+        cabins_sections.setdefault(cabin_class, []).append(
+            SeatMapSection(
+                cabin_class=cabin_class,
+                start_row=start_row,
+                end_row=end_row,
+                column_layout=column_layout,
+            )
+        )
+
+    layouts: list[CabinSeatLayout] = []
+    for cabin_class, cabin_sections in cabins_sections.items():
+        seat_indexes: dict[tuple[int, str], int] = {}
+        for section in sorted(cabin_sections, key=lambda s: s.start_row):
+            columns = [c for c in section.column_layout if c not in "-#"]
+            for row in range(section.start_row, section.end_row + 1):
+                for column in columns:
+                    seat_indexes.setdefault((row, column), len(seat_indexes))
+        layouts.append(
+            CabinSeatLayout(
+                cabin_class=cabin_class,
+                sections=tuple(cabin_sections),
+                seat_indexes=seat_indexes,
+            )
+        )
+    return tuple(layouts)
+
+
+def encode_booked_seats(
+    layout: CabinSeatLayout, booked_seats: list[BookedSeat]
+) -> tuple[str, int]:
+    """
+    Encodes the booked seats of a cabin as a bitmap aligned to the cabin's layout.
+
+    Each seat of the cabin is represented by a single bit, in the order of the cabin's
+    layout, starting from the most significant bit of the first byte. A set bit marks
+    a booked seat. The bitmap is padded with zero bits to a whole number of bytes,
+    and is encoded with URL-safe base64.
+
+    :param layout: The cabin's seat layout.
+    :param booked_seats: The booked seats of the flight. Seats which are not part of
+        the cabin are ignored.
+    :return: The encoded bitmap, and the number of booked seats in the cabin.
+    """
+    bitmap = bytearray((layout.seats_count + 7) // 8)
+    booked_seats_count = 0
+    for seat in booked_seats:
+        index = layout.seat_indexes.get((seat.row, seat.column))
+        if index is None:
+            continue
+        mask = 0x80 >> (index % 8)
+        if not bitmap[index // 8] & mask:
+            bitmap[index // 8] |= mask
+            booked_seats_count += 1
+    return base64.urlsafe_b64encode(bitmap).decode("ascii"), booked_seats_count
@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import weakref
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+import orjson
+
+from . import models, schemas
+from .exceptions import ExternalDependencyException, ServiceUnavailableException
+from .util import set_request_deadline
+
+log = logging.getLogger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEARTBEAT = b": heartbeat\n\n"
+
+
+@dataclass(frozen=True)
+class ServerSentEvent:
+    """
+    An event of a server-sent events (SSE) stream.
+    """
+
+    event: str
+    data: dict[str, Any]
+    id: int | None = None
+
+    def encode(self) -> bytes:
+        """
+        :return: The event in the ``text/event-stream`` format, with its data encoded
+            as JSON in a single line.
+        """
+        lines = [] if self.id is None else [f"id: {self.id}"]
+        lines.append(f"event: {self.event}")
+        lines.append(f"data: {orjson.dumps(self.data).decode()}")
+        return ("\n".join(lines) + "\n\n").encode()
+
+
+class FlightSeatsListener:
+    """
+    A listener of a flight's seats stream, with a bounded queue of events.
+
+    A slow listener whose queue is full is not sent every change, but rather only the
+    current seats, once its queue is drained.
+    """
+
+    def __init__(self, queue_size: int):
+        self._queue: asyncio.Queue[ServerSentEvent | None] = asyncio.Queue(queue_size)
+        self.dropped_events = 0
+
+    def put(self, event: ServerSentEvent, get_seats: Callable[[], ServerSentEvent]):
+        """
+        Queues an event, or replaces all queued events with the current seats if the
+        queue is full.
+
+        :param event: The event to queue.
+        :param get_seats: Creates an event of the current seats.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped_events += self._queue.qsize() + 1
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(get_seats())
+
+    def close(self):
+        """
+        Ends the listener's stream after its queued events.
+        """
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def events(self, heartbeat_interval: float) -> AsyncIterator[bytes]:
+        """
+        Iterates over the encoded events of the stream, with a heartbeat comment
+        whenever there are no events for the heartbeat interval.
+
+        :param heartbeat_interval: The maximal time between events, in seconds.
+        """
+        while True:
+            try:
+                event = await asyncio.wait_for(self._queue.get(), heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield SSE_HEARTBEAT
+                continue
+            if event is None:
+                return
+            yield event.encode()
+
+
+class FlightSeatsWatcher:
+    """
+    Polls the seats of a single flight on behalf of all of its listeners, and
+    publishes the changes in its booked seats to them.
+
+    The events of the stream are:
+
+    * ``seats`` - The flight's seats, with the ``FlightSeats`` schema. Sent first,
+      and whenever the flight's seat map changes or a listener falls behind.
+    * ``change`` - The booked seats which changed since the previous event, with the
+      ``FlightSeatsChange`` schema.
+
+    Each event's ID is the version of the seats it describes. The stream ends if the
+    flight is not found anymore.
+    """
+
+    def __init__(
+        self,
+        flight_seats: models.FlightSeats,
+        load: Callable[[UUID], Awaitable[models.FlightSeats | None]],
+        *,
+        poll_interval: float,
+    ):
+        """
+        Initializes the watcher, without polling the flight's seats.
+
+        :param flight_seats: The current seats of the flight.
+        :param load: Loads the seats of a flight by its ID, or None if the flight is
+            not found.
+        :param poll_interval: The time between polls of the flight's seats, in seconds.
+        """
+        self.flight_id = flight_seats.flight_id
+        self.poll_interval = poll_interval
+        self.listeners: set[FlightSeatsListener] = set()
+        self._load = load
+        self._seats = flight_seats
+        self._version = 1
+        self._task: asyncio.Task[None] | None = None
+
+    def seats_event(self) -> ServerSentEvent:
+        """
+        :return: An event of the current seats of the flight.
+        """
+        return ServerSentEvent(
+            "seats", schemas.FlightSeats.dump_model(self._seats), self._version
+        )
+
+    def subscribe(self, listener: FlightSeatsListener):
+        """
+        Adds a listener, which is sent the current seats, and starts polling unless
+        already started.
+
+        :param listener: The listener to add.
+        """
+        self.listeners.add(listener)
+        listener.put(self.seats_event(), self.seats_event)
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    def unsubscribe(self, listener: FlightSeatsListener):
+        """
+        Removes a listener, and stops polling if it was the last one.
+
+        :param listener: The listener to remove.
+        """
+        self.listeners.discard(listener)
+        if not self.listeners and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _poll(self):
+        # Polls outlive the request which started them
+        set_request_deadline(None)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                flight_seats = await self._load(self.flight_id)
+            except (ExternalDependencyException, ServiceUnavailableException):
+                log.warning("Could not poll the seats of flight %s", self.flight_id)
+                continue
+            if flight_seats is None:
+                for listener in self.listeners:
+                    listener.close()
+                return
+            self._update(flight_seats)
+
+    def _update(self, flight_seats: models.FlightSeats):
+        previous_seats, self._seats = self._seats, flight_seats
+        if (
+            flight_seats.aircraft_model_with_seat_map
+            != previous_seats.aircraft_model_with_seat_map
+        ):
+            self._version += 1
+            self._publish(self.seats_event())
+            return
+
+        previous = {(s.row, s.column): s for s in previous_seats.booked_seats}
+        current = {(s.row, s.column): s for s in flight_seats.booked_seats}
+        if previous.keys() == current.keys():
+            return
+        change = models.FlightSeatsChange(
+            flight_id=self.flight_id,
+            booked_seats=[s for k, s in current.items() if k not in previous],
+            released_seats=[s for k, s in previous.items() if k not in current],
+        )
+        self._version += 1
+        self._publish(
+            ServerSentEvent(
+                "change", schemas.FlightSeatsChange.dump_model(change), self._version
+            )
+        )
+
+    def _publish(self, event: ServerSentEvent):
+        for listener in self.listeners:
+            listener.put(event, self.seats_event)
+
+
+class FlightSeatsStreams:
+    """
+    Streams the changes in the seats of flights to any number of listeners, with a
+    single :class:`FlightSeatsWatcher` per watched flight.
+    """
+
+    retry_after = 5
+    """The time to wait before retrying when there are too many streams, in seconds."""
+
+    def __init__(
+        self,
+        load: Callable[[UUID], Awaitable[models.FlightSeats | None]],
+        *,
+        poll_interval: float,
+        heartbeat_interval: float,
+        queue_size: int,
+        max_streams: int,
+    ):
+        """
+        Initializes the streams.
+
+        :param load: Loads the seats of a flight by its ID, or None if the flight is
+            not found.
+        :param poll_interval: The time between polls of each watched flight's seats,
+            in seconds.
+        :param heartbeat_interval: The maximal time between events of a stream,
+            in seconds.
+        :param queue_size: The maximal number of events queued for each stream.
+        :param max_streams: The maximal number of concurrent streams.
+        """
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self.streams_count = 0
+        self._load = load
+        self._watchers: dict[UUID, FlightSeatsWatcher] = {}
+
+    @property
+    def watchers_count(self) -> int:
+        return len(self._watchers)
+
+    def open(self, flight_seats: models.FlightSeats) -> AsyncIterator[bytes]:
+        """
+        Opens a stream of a flight's seats.
+
+        :param flight_seats: The current seats of the flight, used if the flight is
+            not watched yet.
+        :return: The encoded events of the stream.
+        :raises ServiceUnavailableException: If there are too many streams.
+        """
+        if self.streams_count >= self.max_streams:
+            raise ServiceUnavailableException(self.retry_after)
+        # The stream's slot is reserved before it is iterated, so that concurrently
+        # opened streams are counted
+        self.streams_count += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.streams_count -= 1
+
+        events = self._stream(flight_seats, release)
+        # Releases the slot of a stream which is discarded without being iterated
+        weakref.finalize(events, release)
+        return events
+
+    async def _stream(
+        self,
+        flight_seats: models.FlightSeats,
+        release: Callable[[], None],
+    ) -> AsyncIterator[bytes]:
+        watcher = self._watchers.get(flight_seats.flight_id)
+        if watcher is None:
+            watcher = FlightSeatsWatcher(
+                flight_seats, self._load, poll_interval=self.poll_interval
+            )
+            self._watchers[flight_seats.flight_id] = watcher
+        listener = FlightSeatsListener(self.queue_size)
+        watcher.subscribe(listener)
+        try:
+            async for event in listener.events(self.heartbeat_interval):
+                yield event
+        finally:
+            release()
+            watcher.unsubscribe(listener)
+            if (
+                self._watchers.get(watcher.flight_id) is watcher
+                and not watcher.listeners
+            ):
+                del self._watchers[watcher.flight_id]
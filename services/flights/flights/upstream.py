@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from .concurrency import AdaptiveConcurrencyLimiter
+from .exceptions import (
+    ExternalDependencyException,
+    TransientExternalDependencyException,
+)
+from .util import get_remaining_time
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class UpstreamStatistics:
+    """
+    Counters describing the calls to an operation of an upstream dependency.
+    """
+
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    timeouts: int = 0
+    deadline_exceeded: int = 0
+    failures: int = 0
+
+
+class LatencyTracker:
+    """
+    Tracks the latencies of the most recent successful attempts of an operation.
+    """
+
+    def __init__(self, window: int = 1000, min_samples: int = 100):
+        """
+        Initializes the tracker.
+
+        :param window: The number of most recent latencies to keep.
+        :param min_samples: The minimal number of latencies required for estimating
+            quantiles.
+        """
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float):
+        """
+        :param latency: The latency of an attempt, in seconds.
+        """
+        self._latencies.append(latency)
+
+    def quantile(self, q: float) -> float | None:
+        """
+        :param q: The quantile to estimate, between 0 and 1.
+        :return: The latency at the given quantile, in seconds, or None if there are
+            not enough tracked latencies.
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(math.ceil(q * len(latencies)), len(latencies)) - 1]
+
+
+class UpstreamCaller:
+    """
+    Calls the idempotent operations of an upstream dependency with bounded
+    per-attempt timeouts, retries with jittered exponential backoff, and optional
+    hedging.
+
+    A hedged call starts a second, concurrent attempt if the first one did not
+    complete within the observed latency of the operation at the hedge quantile,
+    and uses whichever attempt succeeds first.
+
+    All attempts, backoffs and hedges of a call respect the deadline of the current
+    request (see :func:`flights.util.set_request_deadline`), if it is set.
+
+    Attempts may be limited by an :class:`AdaptiveConcurrencyLimiter`, in which case
+    hedges are only sent if the limit is not exhausted.
+    """
+
+    def __init__(
+        self,
+        *,
+        limiter: AdaptiveConcurrencyLimiter | None = None,
+        retries: int,
+        retry_backoff: float,
+        retry_max_backoff: float,
+        hedging: bool,
+        hedge_quantile: float,
+        latency_window: int = 1000,
+        latency_min_samples: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+        jitter: Callable[[], float] = random.random,
+    ):
+        """
+        Initializes the caller.
+
+        :param limiter: Limits the concurrent attempts of all operations.
+        :param retries: The maximal number of retries of a failed call.
+        :param retry_backoff: The backoff before the first retry, in seconds, which is
+            doubled for each subsequent retry.
+        :param retry_max_backoff: The maximal backoff before a retry, in seconds.
+        :param hedging: Whether to hedge slow attempts.
+        :param hedge_quantile: The quantile of an operation's latencies after which
+            an attempt is hedged.
+        :param latency_window: The number of most recent latencies of each operation
+            used for hedging.
+        :param latency_min_samples: The minimal number of latencies of an operation
+            required before its attempts are hedged.
+        :param clock: Clock function used to measure latencies, in seconds.
+        :param jitter: Returns a random factor between 0 and 1 for each backoff
+            (full jitter).
+        """
+        self.limiter = limiter
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.statistics: defaultdict[str, UpstreamStatistics] = defaultdict(
+            UpstreamStatistics
+        )
+        self._latencies: defaultdict[str, LatencyTracker] = defaultdict(
+            lambda: LatencyTracker(latency_window, latency_min_samples)
+        )
+        self._clock = clock
+        self._jitter = jitter
+
+    def hedge_delay(self, operation: str) -> float | None:
+        """
+        :param operation: The name of the operation.
+        :return: The time after which an attempt of the operation is hedged, in
+            seconds, or None if it is not hedged.
+        """
+        if not self.hedging:
+            return None
+        return self._latencies[operation].quantile(self.hedge_quantile)
+
+    async def call(
+        self,
+        operation: str,
+        attempt: Callable[[], Awaitable[T]],
+        *,
+        timeout: float,
+    ) -> T:
+        """
+        Calls an operation, retrying attempts which fail transiently.
+
+        :param operation: The name of the operation, used for its latencies and
+            statistics.
+        :param attempt: Makes a single attempt of the operation. Raises
+            :class:`TransientExternalDependencyException` if the attempt may be
+            retried, or :class:`ExternalDependencyException` if it may not.
+        :param timeout: The timeout of each attempt, in seconds.
+        :return: The result of the first successful attempt.
+        :raises ExternalDependencyException: If all attempts failed, or the deadline
+            of the current request was exceeded.
+        :raises ServiceUnavailableException: If an attempt was rejected by the
+            concurrency limiter.
+        """
+        statistics = self.statistics[operation]
+        statistics.calls += 1
+        try:
+            for retry in range(1, self.retries + 1):
+                try:
+                    return await self._attempt(operation, attempt, timeout)
+                except TransientExternalDependencyException:
+                    log.warning("Attempt %d of %s failed, retrying", retry, operation)
+                await self._backoff(operation, retry)
+            return await self._attempt(operation, attempt, timeout)
+        except ExternalDependencyException:
+            statistics.failures += 1
+            raise
+
+    async def _backoff(self, operation: str, retry: int):
+        backoff = min(self.retry_backoff * 2 ** (retry - 1), self.retry_max_backoff)
+        delay = backoff * self._jitter()
+        remaining = get_remaining_time()
+        if remaining is not None and delay >= remaining:
+            self.statistics[operation].deadline_exceeded += 1
+            log.warning("Deadline exceeded before retrying %s", operation)
+            raise ExternalDependencyException
+        self.statistics[operation].retries += 1
+        await asyncio.sleep(delay)
+
+    async def _attempt(
+        self,
+        operation: str,
+        attempt: Callable[[], Awaitable[T]],
+        timeout: float,
+    ) -> T:
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        remaining = get_remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                if self.limiter is not None:
+                    self.limiter.release()
+                self.statistics[operation].deadline_exceeded += 1
+                log.warning("Deadline exceeded before calling %s", operation)
+                raise ExternalDependencyException
+            timeout = min(timeout, remaining)
+
+        hedge_delay = self.hedge_delay(operation)
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await self._timed_attempt(operation, attempt, timeout)
+
+        first = asyncio.ensure_future(self._timed_attempt(operation, attempt, timeout))
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        if done:
+            return first.result()
+        if self.limiter is not None and not self.limiter.try_acquire():
+            return await first
+
+        self.statistics[operation].hedges += 1
+        hedge = asyncio.ensure_future(
+            self._timed_attempt(operation, attempt, timeout - hedge_delay)
+        )
+        pending = {first, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if (exc := task.exception()) is None:
+                        if task is hedge:
+                            self.statistics[operation].hedge_wins += 1
+                        return task.result()
+                    error = exc
+        finally:
+            for task in pending:
+                task.cancel()
+        assert error is not None
+        raise error
+
+    async def _timed_attempt(
+        self,
+        operation: str,
+        attempt: Callable[[], Awaitable[T]],
+        timeout: float,
+    ) -> T:
+        # The attempt holds the concurrency limit, if any, until it is done
+        statistics = self.statistics[operation]
+        statistics.attempts += 1
+        start = self._clock()
+        latency: float | None = None
+        dropped = False
+        try:
+            result = await asyncio.wait_for(attempt(), timeout)
+            latency = self._clock() - start
+        except asyncio.TimeoutError:
+            dropped = True
+            statistics.timeouts += 1
+            log.warning("Attempt of %s timed out after %.3fs", operation, timeout)
+            raise TransientExternalDependencyException
+        except TransientExternalDependencyException:
+            dropped = True
+            raise
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(latency, dropped=dropped)
+        self._latencies[operation].record(latency)
+        return result
@@ -1,10 +1,18 @@
+import hashlib
 import logging
-from datetime import datetime
+import random
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Any
 
 import fastapi
 import httpx
+from fastapi.responses import ORJSONResponse
+from starlette.types import Scope
 
 
 class CabinClass(str, Enum):
@@ -23,12 +31,140 @@ class CabinClass(str, Enum):
     FIRST = "F"
 
 
+def compute_etag(*parts: Any) -> str:
+    """
+    Computes a strong entity tag (ETag) from the given parts.
+
+    The parts must have a stable representation with ``repr``, e.g. strings, numbers,
+    enums, datetimes, UUIDs and tuples of them.
+
+    :param parts: The parts which identify the representation of a resource.
+    :return: The quoted entity tag.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checks whether an ``If-None-Match`` header matches an entity tag, using the weak
+    comparison defined for ``If-None-Match`` by RFC 7232.
+
+    :param if_none_match: The value of the ``If-None-Match`` header, if any.
+    :param etag: The current entity tag of the resource.
+    :return: True if the header matches the entity tag, otherwise False.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def conditional_json_response(
+    request: fastapi.Request,
+    etag: str,
+    build_content: Callable[[], Any],
+    *,
+    media_type: str = ORJSONResponse.media_type,
+    headers: dict[str, str] | None = None,
+) -> fastapi.Response:
+    """
+    Creates a JSON response with an ``ETag`` header, or a ``304 Not Modified``
+    response without building the content if the request's ``If-None-Match`` header
+    matches the entity tag.
+
+    :param request: The request to respond to.
+    :param etag: The entity tag of the response's content.
+    :param build_content: Builds the JSON compatible content of the response.
+    :param media_type: The media type of the response. Defaults to
+        ``application/json``.
+    :param headers: Additional headers for the response.
+    :return: The response.
+    """
+    headers = (headers or {}) | {"ETag": etag}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return fastapi.Response(
+            status_code=fastapi.status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    return ORJSONResponse(build_content(), headers=headers, media_type=media_type)
+
+
+STALE_RESPONSE_WARNING = '110 - "Response is Stale"'
+
+
+@dataclass
+class StaleResponse:
+    """
+    Tracks whether a response is based (at least partially) on stale cached data.
+    """
+
+    stale: bool = False
+
+
+_stale_response: ContextVar[StaleResponse | None] = ContextVar(
+    "stale_response", default=None
+)
+
+
+def track_stale_response() -> StaleResponse:
+    """
+    Starts tracking whether the response of the current request is stale.
+    Should be called before the request is handled, e.g. in a middleware.
+
+    :return: The tracker of the current response.
+    """
+    tracker = StaleResponse()
+    _stale_response.set(tracker)
+    return tracker
+
+
+def mark_stale_response():
+    """
+    Marks the response of the current request as stale, if it is tracked.
+    """
+    tracker = _stale_response.get()
+    if tracker is not None:
+        tracker.stale = True
+
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+_request_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+def set_request_deadline(timeout: float | None):
+    """
+    Sets the deadline of the current request, which bounds the total time spent on
+    requests to external dependencies on its behalf, including retries.
+    Should be called before the request is handled, e.g. in a middleware.
+
+    Tasks started while handling the request inherit its deadline.
+
+    :param timeout: The time left for handling the request from now, in seconds,
+        or None to clear the deadline (e.g. in background tasks).
+    """
+    _request_deadline.set(None if timeout is None else time.monotonic() + timeout)
+
+
+def get_remaining_time() -> float | None:
+    """
+    :return: The time left until the deadline of the current request, in seconds,
+        which may be negative if it has passed, or None if there is no deadline.
+    """
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
 def log_access(
     logger: logging.Logger,
-    request: fastapi.Request,
-    response: fastapi.Response,
-    start_time: datetime,
-    end_time: datetime,
+    scope: Scope,
+    status_code: int,
+    start_time_ns: int,
     duration_ns: int,
     *,
     level: int = logging.INFO,
@@ -37,36 +173,43 @@ def log_access(
     """
     Logs HTTP access details (request and response details).
 
+    The details are only gathered and formatted if the logger is enabled for the
+    given level.
+
     :param logger: The logger instance to be used for logging.
-    :param request: The request to log.
-    :param response: The corresponding response to the request to log.
-    :param start_time: The time the request was received.
-    :param end_time: The time the response was received.
-    :param duration_ns: The time duration it took to process the request and get a
-        response, in nanoseconds.
+    :param scope: The ASGI scope of the request to log.
+    :param status_code: The status code of the request's response.
+    :param start_time_ns: The time the request was received, in nanoseconds since
+        the epoch.
+    :param duration_ns: The time duration it took to process the request and send
+        its response, in nanoseconds.
     :param level: The logging level for this log. Defaults to INFO.
-    :param time_format: Format for start_time and end_time in parameters using
+    :param time_format: Format for the start and end times of the request using
         datetime.datetime.strftime formatting.
     """
-    duration_ms = duration_ns // 1_000_000
+    if not logger.isEnabledFor(level):
+        return
 
-    path = request.url.path
-    if query := request.url.query:
-        path += f"?{query}"
+    path = scope.get("root_path", "") + scope["path"]
+    if query := scope["query_string"]:
+        path += f"?{query.decode('latin-1')}"
+    host, port = scope.get("client") or (None, None)
+    start_time = datetime.fromtimestamp(start_time_ns / 1e9, timezone.utc)
+    end_time = start_time + timedelta(microseconds=duration_ns // 1000)
 
     params = {
-        "host": request.client.host,
-        "method": request.method,
+        "host": host,
+        "method": scope["method"],
         "path": path,
-        "duration": duration_ms,
-        "responseCode": response.status_code,
+        "duration": duration_ns // 1_000_000,
+        "responseCode": status_code,
     }
     extra = {
         "type": "access",
         "startTime": start_time.strftime(time_format),
         "endTime": end_time.strftime(time_format),
-        "port": request.client.port,
-        "httpVersion": request.scope.get("http_version", None),
+        "port": port,
+        "httpVersion": scope.get("http_version", None),
     }
 
     logger.log(
@@ -77,30 +220,57 @@ def log_access(
     )
 
 
+def _capped_body(body: Any, content: bytes, max_size: int | None) -> Any:
+    if max_size is None or len(content) <= max_size:
+        return body
+    truncated = content[:max_size].decode(errors="ignore")
+    return f"{truncated}... (truncated, {len(content)} bytes)"
+
+
 def log_response(
     logger: logging.Logger,
     message: str,
     *args,
-    request_body: str | dict[str, Any],
+    request_body: Any,
     response: httpx.Response,
+    response_body: Any,
     level: int = logging.INFO,
+    body_sample_rate: float = 1.0,
+    max_body_size: int | None = None,
 ):
     """
     Logs an HTTP response made with the library HTTPX (request and response details).
 
+    The request and response bodies are only included in a sample of the logs,
+    and are truncated to a maximal size. Nothing is done if the logger is not
+    enabled for the given level.
+
     :param logger: The logger instance to be used for logging.
     :param message: The message to add to the log.
     :param args: Arguments for the message parameter format string.
     :param request_body: The request body used to get the response.
     :param response: The response object to log.
+    :param response_body: The response body, as already parsed from the response.
     :param level: The logging level for this log. Defaults to INFO.
+    :param body_sample_rate: The ratio of logs which include the bodies, between 0
+        and 1. Defaults to 1.
+    :param max_body_size: The size in bytes of the encoded bodies above which they
+        are truncated. Defaults to no truncation.
     """
+    if not logger.isEnabledFor(level):
+        return
+
     extras = {
         "type": "request",
         "method": response.request.method,
         "url": response.url,
-        "requestBody": request_body,
         "statusCode": response.status_code,
-        "responseBody": response.json(),
     }
+    if random.random() < body_sample_rate:
+        extras["requestBody"] = _capped_body(
+            request_body, response.request.content, max_body_size
+        )
+        extras["responseBody"] = _capped_body(
+            response_body, response.content, max_body_size
+        )
     logger.log(level, message, *args, extra={"extra": extras})
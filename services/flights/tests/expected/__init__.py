@@ -1 +1 @@
-from . import flight_details, flight_seats, flights  # noqa: F401
+from . import flight_details, flight_seats, flights, flights_calendar  # noqa: F401
@@ -61,6 +61,36 @@ success_response: dict[str, Any] = {
     ],
 }
 
+success_bitmap_response: dict[str, Any] = {
+    "flightId": existing_flight_id,
+    "aircraftModel": success_response["aircraftModel"],
+    "cabins": [
+        {
+            "cabinClass": "F",
+            "seatMap": success_response["seatMap"][0:1],
+            "seatsCount": 32,
+            "availableSeatsCount": 32,
+            "bookedSeatsBitmap": "AAAAAA==",
+        },
+        {
+            "cabinClass": "B",
+            "seatMap": success_response["seatMap"][1:2],
+            "seatsCount": 35,
+            "availableSeatsCount": 35,
+            "bookedSeatsBitmap": "AAAAAAA=",
+        },
+        {
+            "cabinClass": "E",
+            "seatMap": success_response["seatMap"][2:],
+            "seatsCount": 204,
+            "availableSeatsCount": 201,
+            # Row 40 is the 4th row of the 4th section, after 90 seats in the
+            # previous sections, so seats 40D, 40F, 40G are seats 120-122 (0xE0)
+            "bookedSeatsBitmap": "AAAAAAAAAAAAAAAAAAAA4AAAAAAAAAAAAAA=",
+        },
+    ],
+}
+
 flight_not_found_response: dict[str, Any] = {
     "error": "Flight not found",
     "message": "Could not find flight with the requested flight ID.",
@@ -0,0 +1,30 @@
+from typing import Any
+
+origin = "TLV"
+destination = "LAX"
+no_flights_destination = "JFK"
+from_date = "2019-12-30"
+to_date = "2020-01-01"
+
+success_response: dict[str, Any] = {
+    "name": "SK1",
+    "origin": origin,
+    "destination": destination,
+    "days": [
+        {"date": "2019-12-30", "flightsCount": 0, "cabins": []},
+        {
+            "date": "2019-12-31",
+            "flightsCount": 1,
+            "cabins": [
+                {"cabinClass": "E", "maxAvailableSeatsCount": 151},
+                {"cabinClass": "F", "maxAvailableSeatsCount": 20},
+            ],
+        },
+        {"date": "2020-01-01", "flightsCount": 0, "cabins": []},
+    ],
+}
+
+flights_not_found_response: dict[str, Any] = {
+    "error": "Flights not found",
+    "message": "The flights for the requested origin and destination airports.",
+}
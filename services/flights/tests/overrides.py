@@ -1,10 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any
 from uuid import UUID
 
 from fastapi import Path, Query
 
-from flights.models import FlightDetails, FlightSeats, ServiceFlights
+from flights.models import (
+    FlightDetails,
+    FlightSeats,
+    ServiceCalendar,
+    ServiceFlights,
+)
+from flights.schemas import FlightIds
 from flights.util import CabinClass
 
 
@@ -108,6 +114,42 @@ async def get_flights(
     return ServiceFlights(**flights_data)
 
 
+async def get_flights_calendar(
+    origin: str = Path(..., regex=r"^[a-zA-Z]{3}$"),
+    destination: str = Path(..., regex=r"^[a-zA-Z]{3}$"),
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    passengers: int = Query(1, ge=1),
+    cabin_classes: list[CabinClass] | None = Query(None, alias="cabin"),
+) -> ServiceCalendar | None:
+    if origin.upper() != "TLV" or destination.upper() != "LAX":
+        return None
+
+    response_day = date(2019, 12, 31)
+    response_cabins = [
+        {"cabin_class": "E", "available_seats_count": 151},
+        {"cabin_class": "B", "available_seats_count": 16},
+        {"cabin_class": "F", "available_seats_count": 20},
+    ]
+    response_cabins = [
+        c
+        for c in response_cabins
+        if c["available_seats_count"] >= passengers
+        and (not cabin_classes or c["cabin_class"] in cabin_classes)
+    ]
+
+    days: list[dict[str, Any]] = []
+    day = from_date
+    while day <= to_date:
+        if day == response_day and response_cabins:
+            days.append({"day": day, "flights_count": 1, "cabins": response_cabins})
+        else:
+            days.append({"day": day, "flights_count": 0, "cabins": []})
+        day += timedelta(days=1)
+
+    return ServiceCalendar(id=1, origin="TLV", destination="LAX", days=days)
+
+
 async def get_flight_details(
     flight_id: UUID = Path(..., alias="flightId")
 ) -> FlightDetails | None:
@@ -243,3 +285,15 @@ async def get_flight_seats(
     if UUID(response_flight_id) != flight_id:
         return None
     return FlightSeats(**flight_seats_data)
+
+
+async def get_flight_details_batch(
+    flight_ids: FlightIds,
+) -> dict[UUID, FlightDetails | None]:
+    return {i: await get_flight_details(i) for i in flight_ids.flight_ids}
+
+
+async def get_flight_seats_batch(
+    flight_ids: FlightIds,
+) -> dict[UUID, FlightSeats | None]:
+    return {i: await get_flight_seats(i) for i in flight_ids.flight_ids}
@@ -0,0 +1,347 @@
+import asyncio
+import json
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID
+
+import websockets
+
+from flights.availability import GRAPHQL_WS_SUBPROTOCOL, AvailabilityMirror
+from flights.models import ServiceFlights
+
+from .test_dependencies import airport, upstream_flights
+
+now = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def flight_availability(flight_id: str, available_seats_count: int) -> dict[str, Any]:
+    return {
+        "id": flight_id,
+        "available_seats_counts": [
+            {
+                "cabin_class": "E",
+                "total_seats_count": 30,
+                "available_seats_count": available_seats_count,
+            }
+        ],
+    }
+
+
+def flights_result(
+    *flights: tuple[str, int, str | None]
+) -> dict[str, list[dict[str, Any]]]:
+    """
+    :param flights: The ID, available seats count and time of the latest
+        availability change (if any) of each flight.
+    :return: A result of the subscription to the availability of all flights.
+    """
+    return {
+        "flight": [
+            flight_availability(flight_id, available_seats_count)
+            | {
+                "availability_changes_aggregate": {
+                    "aggregate": {
+                        "max": {
+                            "changed_at": changed_at and f"{changed_at}+00:00",
+                        }
+                    }
+                }
+            }
+            for flight_id, available_seats_count, changed_at in flights
+        ]
+    }
+
+
+def changes_result(*changes: tuple[str, int, str]) -> dict[str, list[dict[str, Any]]]:
+    """
+    :param changes: The flight ID, available seats count and time of each
+        availability change.
+    :return: A result of the subscription to the availability changes.
+    """
+    return {
+        "flight_availability_change": [
+            {
+                "changed_at": f"{changed_at}+00:00",
+                "flight": flight_availability(flight_id, available_seats_count),
+            }
+            for flight_id, available_seats_count, changed_at in changes
+        ]
+    }
+
+
+class StandInSubscriptionServer:
+    """
+    A local stand-in for the inventory manager's subscriptions, which speaks the
+    ``graphql-ws`` protocol and pushes the queued results to every subscription.
+    """
+
+    def __init__(self):
+        self.messages: list[dict[str, Any]] = []
+        self.results: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        self.url = ""
+        self._server: Any = None
+        self._subscription_id: str | None = None
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, subprotocols=[GRAPHQL_WS_SUBPROTOCOL]
+        )
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}/v1/graphql"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, websocket):
+        init = json.loads(await websocket.recv())
+        self.messages.append(init)
+        await websocket.send(json.dumps({"type": "connection_ack"}))
+        await websocket.send(json.dumps({"type": "ka"}))
+        start = json.loads(await websocket.recv())
+        self.messages.append(start)
+        self._subscription_id = start["id"]
+        receive = asyncio.create_task(self._receive(websocket))
+        try:
+            while (result := await self._next_result(receive)) is not None:
+                await websocket.send(
+                    json.dumps(
+                        {
+                            "id": self._subscription_id,
+                            "type": "data",
+                            "payload": {"data": result},
+                        }
+                    )
+                )
+        finally:
+            receive.cancel()
+
+    async def _next_result(self, receive: asyncio.Task[None]) -> dict[str, Any] | None:
+        # Stops waiting for results once the client disconnects
+        result = asyncio.ensure_future(self.results.get())
+        await asyncio.wait([result, receive], return_when=asyncio.FIRST_COMPLETED)
+        if not result.done():
+            result.cancel()
+            return None
+        return result.result()
+
+    async def _receive(self, websocket):
+        async for raw_message in websocket:
+            message = json.loads(raw_message)
+            self.messages.append(message)
+            if message["type"] == "start":
+                self._subscription_id = message["id"]
+
+
+def create_mirror(url: str, resubscribe_interval: float = 60) -> AvailabilityMirror:
+    return AvailabilityMirror(
+        url,
+        days=7,
+        resubscribe_interval=resubscribe_interval,
+        reconnect_delay=0.01,
+        cursor_overlap=60,
+        clock=lambda: now,
+    )
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float = 2):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def subscriptions(messages: list[dict[str, Any]]) -> list[tuple[str, dict[str, Any]]]:
+    """
+    :return: The operation name and variables of each started subscription.
+    """
+    return [
+        (m["payload"]["query"].split()[1].split("(")[0], m["payload"]["variables"])
+        for m in messages
+        if m["type"] == "start"
+    ]
+
+
+def available_seats(mirror: AvailabilityMirror, flight_id: str) -> int | None:
+    cabins = mirror.get(UUID(flight_id))
+    return cabins[0].available_seats_count if cabins else None
+
+
+window = {
+    "from_time": "2020-01-01T00:00:00+00:00",
+    "to_time": "2020-01-08T00:00:00+00:00",
+}
+
+
+def test_mirror_loads_flights_then_follows_their_changes():
+    flight_id = "00000000-0000-0000-0000-000000000001"
+    other_flight_id = "00000000-0000-0000-0000-000000000002"
+
+    async def run():
+        async with StandInSubscriptionServer() as server:
+            mirror = create_mirror(server.url)
+            mirror.start()
+            await server.results.put(
+                flights_result(
+                    (flight_id, 10, "2019-12-31T00:00:00"),
+                    (other_flight_id, 20, None),
+                )
+            )
+            await wait_until(lambda: len(subscriptions(server.messages)) == 2)
+            first = available_seats(mirror, flight_id)
+            await server.results.put(
+                changes_result((flight_id, 9, "2019-12-31T00:00:01.5"))
+            )
+            await wait_until(lambda: len(subscriptions(server.messages)) == 3)
+            seats = (
+                available_seats(mirror, flight_id),
+                available_seats(mirror, other_flight_id),
+            )
+            await mirror.stop()
+            return server.messages, first, seats, mirror.ready
+
+    messages, first, seats, ready = asyncio.run(run())
+
+    assert first == 10
+    assert seats == (9, 20)
+    assert not ready
+    assert messages[0]["type"] == "connection_init"
+    # Loads all flights, then only the changes after the latest change, less the
+    # cursor overlap
+    assert subscriptions(messages) == [
+        ("watchFlightsAvailability", window),
+        (
+            "watchFlightsAvailabilityChanges",
+            window | {"changed_after": "2019-12-30T23:59:00+00:00"},
+        ),
+        (
+            "watchFlightsAvailabilityChanges",
+            window | {"changed_after": "2019-12-30T23:59:01.500000+00:00"},
+        ),
+    ]
+
+
+def test_mirror_keeps_loading_flights_until_they_change():
+    flight_id = "00000000-0000-0000-0000-000000000001"
+
+    async def run():
+        async with StandInSubscriptionServer() as server:
+            mirror = create_mirror(server.url)
+            mirror.start()
+            await server.results.put(flights_result((flight_id, 10, None)))
+            await wait_until(lambda: mirror.ready)
+            await asyncio.sleep(0.05)
+            unchanged = subscriptions(server.messages)
+            await server.results.put(
+                flights_result((flight_id, 9, "2019-12-31T00:00:00"))
+            )
+            await wait_until(lambda: len(subscriptions(server.messages)) == 2)
+            seats = available_seats(mirror, flight_id)
+            await mirror.stop()
+            return server.messages, unchanged, seats
+
+    messages, unchanged, seats = asyncio.run(run())
+
+    assert unchanged == [("watchFlightsAvailability", window)]
+    assert seats == 9
+    assert subscriptions(messages)[1] == (
+        "watchFlightsAvailabilityChanges",
+        window | {"changed_after": "2019-12-30T23:59:00+00:00"},
+    )
+
+
+def test_mirror_keeps_subscription_without_later_changes():
+    flight_id = "00000000-0000-0000-0000-000000000001"
+
+    async def run():
+        async with StandInSubscriptionServer() as server:
+            mirror = create_mirror(server.url)
+            mirror.start()
+            await server.results.put(
+                flights_result((flight_id, 10, "2019-12-31T00:00:00"))
+            )
+            await wait_until(lambda: len(subscriptions(server.messages)) == 2)
+            # A change which was already received, within the overlap
+            await server.results.put(
+                changes_result((flight_id, 10, "2019-12-31T00:00:00"))
+            )
+            # A change committed after the latest change, but timestamped before it
+            await server.results.put(
+                changes_result((flight_id, 8, "2019-12-30T23:59:30"))
+            )
+            await server.results.put(changes_result())
+            await wait_until(server.results.empty)
+            await asyncio.sleep(0.05)
+            seats = available_seats(mirror, flight_id)
+            await mirror.stop()
+            return server.messages, seats
+
+    messages, seats = asyncio.run(run())
+
+    assert seats == 8
+    assert len(subscriptions(messages)) == 2
+
+
+def test_mirror_reconnects_after_disconnection():
+    flight_id = "00000000-0000-0000-0000-000000000001"
+
+    async def run():
+        async with StandInSubscriptionServer() as server:
+            mirror = create_mirror(server.url)
+            mirror.start()
+            await server.results.put(flights_result((flight_id, 10, None)))
+            await wait_until(lambda: mirror.ready)
+            # Closes the connection
+            await server.results.put(None)
+            await wait_until(lambda: not mirror.ready)
+            await server.results.put(flights_result((flight_id, 5, None)))
+            await wait_until(lambda: mirror.ready)
+            seats = available_seats(mirror, flight_id)
+            await mirror.stop()
+            return server.messages, seats
+
+    messages, seats = asyncio.run(run())
+
+    assert seats == 5
+    assert [m["type"] for m in messages].count("connection_init") == 2
+
+
+def test_mirror_resubscribes_periodically():
+    async def run():
+        async with StandInSubscriptionServer() as server:
+            mirror = create_mirror(server.url, resubscribe_interval=0.05)
+            mirror.start()
+            await wait_until(lambda: len(server.messages) >= 4)
+            await mirror.stop()
+            return server.messages
+
+    messages = asyncio.run(run())
+
+    assert [(m["type"], m.get("id")) for m in messages[1:4]] == [
+        ("start", "1"),
+        ("stop", "1"),
+        ("start", "2"),
+    ]
+
+
+def test_mirror_applies_availability_to_mirrored_flights():
+    mirror = create_mirror("ws://127.0.0.1/v1/graphql")
+    service_flights = ServiceFlights(
+        id=1,
+        origin_airport=airport,
+        destination_airport=airport,
+        flights=upstream_flights[:2],
+    )
+
+    unchanged = mirror.apply(service_flights)
+    mirror._reload(flights_result((upstream_flights[0]["id"], 1, None))["flight"])
+    applied = mirror.apply(service_flights)
+
+    assert unchanged is service_flights
+    assert [[c.available_seats_count for c in f.cabins] for f in applied.flights] == [
+        [1],
+        [0, 0, 5],
+    ]
@@ -0,0 +1,32 @@
+from benchmarks import suite
+
+
+def test_benchmarks_stages_run():
+    for stages in suite.create_benchmarks().values():
+        for stage in stages.values():
+            stage()
+
+
+def test_find_regressions():
+    baselines = {
+        "flights_list[1]": {
+            "parse": suite.Measurement(time=1.0, peak_memory=1000),
+            "dump": suite.Measurement(time=1.0, peak_memory=1000),
+        }
+    }
+    results = {
+        "flights_list[1]": {
+            "parse": suite.Measurement(time=1.4, peak_memory=1050),
+            "dump": suite.Measurement(time=1.6, peak_memory=1200),
+            "encode": suite.Measurement(time=100.0, peak_memory=100_000),
+        }
+    }
+
+    regressions = suite.find_regressions(
+        results, baselines, time_tolerance=0.5, memory_tolerance=0.1
+    )
+
+    assert regressions == [
+        "flights_list[1] dump: time 1.60 s exceeds baseline 1.00 s",
+        "flights_list[1] dump: peak memory 1.2 KiB exceeds baseline 1000 B",
+    ]
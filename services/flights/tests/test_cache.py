@@ -0,0 +1,113 @@
+from flights.cache import TtlLruCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def test_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=10, max_bytes=100, clock=clock)
+
+    cache.set("short", "a", ttl=1, size=1)
+    cache.set("long", "b", ttl=10, size=1)
+    clock.time = 5
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "b"
+    assert len(cache) == 1
+    assert cache.size == 1
+    assert cache.statistics.hits == 1
+    assert cache.statistics.misses == 1
+    assert cache.statistics.expirations == 1
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=2, max_bytes=100)
+
+    cache.set("a", "a", ttl=10, size=1)
+    cache.set("b", "b", ttl=10, size=1)
+    cache.get("a")
+    cache.set("c", "c", ttl=10, size=1)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
+    assert cache.statistics.evictions == 1
+
+
+def test_cache_is_bounded_by_size():
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=10, max_bytes=10)
+
+    cache.set("a", "a", ttl=10, size=4)
+    cache.set("b", "b", ttl=10, size=4)
+    cache.set("c", "c", ttl=10, size=4)
+    cache.set("too-large", "d", ttl=10, size=11)
+
+    assert cache.get("a") is None
+    assert cache.get("too-large") is None
+    assert cache.size == 8
+    assert cache.statistics.evictions == 1
+
+
+def test_cache_replaces_existing_entries():
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=10, max_bytes=10)
+
+    cache.set("a", "a", ttl=10, size=4)
+    cache.set("a", "b", ttl=10, size=6)
+
+    assert cache.get("a") == "b"
+    assert cache.size == 6
+
+
+def test_cache_is_disabled_without_entries():
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=0, max_bytes=10)
+
+    cache.set("a", "a", ttl=10, size=1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_keeps_stale_entries_within_stale_window():
+    clock = FakeClock()
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=10, max_bytes=100, clock=clock)
+
+    cache.set("a", "a", ttl=1, size=1, stale_while_revalidate=2, stale_if_error=5)
+    clock.time = 2
+    revalidated = cache.lookup("a")
+    clock.time = 4
+    stale = cache.lookup("a")
+
+    assert cache.get("a") is None
+    assert revalidated is not None
+    assert (revalidated.value, revalidated.fresh, revalidated.revalidate) == (
+        "a",
+        False,
+        True,
+    )
+    assert stale is not None
+    assert (stale.value, stale.fresh, stale.revalidate) == ("a", False, False)
+    assert cache.statistics.stale_hits == 3
+
+    clock.time = 6
+    assert cache.lookup("a") is None
+    assert len(cache) == 0
+    assert cache.statistics.expirations == 1
+
+
+def test_cache_keeps_entries_without_ttl_only_if_error():
+    clock = FakeClock()
+    cache: TtlLruCache[str] = TtlLruCache(max_entries=10, max_bytes=100, clock=clock)
+
+    cache.set("a", "a", ttl=0, size=1, stale_while_revalidate=2, stale_if_error=5)
+    cache.set("b", "b", ttl=0, size=1, stale_while_revalidate=2)
+    lookup = cache.lookup("a")
+
+    assert lookup is not None
+    assert (lookup.fresh, lookup.revalidate) == (False, False)
+    assert cache.lookup("b") is None
@@ -0,0 +1,217 @@
+import asyncio
+
+import pytest
+
+from flights.concurrency import AdaptiveConcurrencyLimiter, BatchLoader, SingleFlight
+from flights.exceptions import ServiceUnavailableException
+from flights.util import set_request_deadline
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+
+    async def run():
+        single_flight: SingleFlight[dict[str, int]] = SingleFlight()
+        results = await asyncio.gather(
+            *[single_flight.do("key", fetch) for _ in range(10)]
+        )
+        assert single_flight.in_flight() == 0
+        # A call made after completion is not coalesced with the previous one
+        results.append(await single_flight.do("key", fetch))
+        return results
+
+    results = asyncio.run(run())
+    assert calls == 2
+    assert all(r is results[0] for r in results[:10])
+    assert results[10] == {"calls": 2}
+
+
+def test_single_flight_does_not_coalesce_different_keys():
+    async def fetch(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    async def run():
+        single_flight: SingleFlight[int] = SingleFlight()
+        return await asyncio.gather(
+            single_flight.do("a", lambda: fetch(1)),
+            single_flight.do("b", lambda: fetch(2)),
+        )
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_single_flight_propagates_errors_to_all_callers():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream error")
+
+    async def run():
+        single_flight: SingleFlight[None] = SingleFlight()
+        return await asyncio.gather(
+            *[single_flight.do("key", fetch) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_single_flight_caller_cancellation_does_not_cancel_call():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        single_flight: SingleFlight[str] = SingleFlight()
+        first = asyncio.ensure_future(single_flight.do("key", fetch))
+        second = asyncio.ensure_future(single_flight.do("key", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_batch_loader_batches_concurrent_loads():
+    batches: list[list[int]] = []
+
+    async def load_batch(keys):
+        batches.append(keys)
+        await asyncio.sleep(0.01)
+        return {k: k * 10 for k in keys if k != 3}
+
+    async def run():
+        loader: BatchLoader[int, int] = BatchLoader(
+            load_batch, max_batch_size=100, batch_window=0.005
+        )
+        return await asyncio.gather(*[loader.load(k) for k in [1, 2, 3, 2]])
+
+    assert asyncio.run(run()) == [10, 20, None, 20]
+    assert batches == [[1, 2, 3]]
+
+
+def test_batch_loader_dispatches_full_batches_immediately():
+    batches: list[list[int]] = []
+
+    async def load_batch(keys):
+        batches.append(keys)
+        return {k: k for k in keys}
+
+    async def run():
+        loader: BatchLoader[int, int] = BatchLoader(
+            load_batch, max_batch_size=2, batch_window=10
+        )
+        return await asyncio.wait_for(
+            asyncio.gather(*[loader.load(k) for k in range(4)]), timeout=1
+        )
+
+    assert asyncio.run(run()) == [0, 1, 2, 3]
+    assert batches == [[0, 1], [2, 3]]
+
+
+def test_batch_loader_propagates_errors_to_all_callers():
+    async def load_batch(keys):
+        raise ValueError("upstream error")
+
+    async def run():
+        loader: BatchLoader[int, int] = BatchLoader(
+            load_batch, max_batch_size=100, batch_window=0
+        )
+        return await asyncio.gather(
+            *[loader.load(k) for k in range(3)], return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def create_limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        **{
+            "initial_limit": 2,
+            "min_limit": 1,
+            "max_limit": 4,
+            "max_queue_size": 1,
+        }
+        | kwargs
+    )
+
+
+def test_limiter_queues_calls_beyond_limit():
+    async def run():
+        limiter = create_limiter()
+        await limiter.acquire()
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        state = (limiter.in_flight, limiter.queued, queued.done())
+        limiter.release()
+        await queued
+        return state, (limiter.in_flight, limiter.queued)
+
+    before, after = asyncio.run(run())
+
+    assert before == (2, 1, False)
+    assert after == (2, 0)
+
+
+def test_limiter_rejects_calls_when_queue_is_full():
+    async def run():
+        limiter = create_limiter(max_queue_size=0, retry_after=3)
+        await limiter.acquire()
+        await limiter.acquire()
+        try:
+            await limiter.acquire()
+        finally:
+            assert limiter.statistics.rejected == 1
+
+    with pytest.raises(ServiceUnavailableException) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.retry_after == 3
+
+
+def test_limiter_rejects_queued_calls_after_deadline():
+    async def run():
+        limiter = create_limiter(initial_limit=1)
+        await limiter.acquire()
+        set_request_deadline(0.01)
+        await limiter.acquire()
+
+    with pytest.raises(ServiceUnavailableException):
+        asyncio.run(run())
+
+
+def test_limiter_adapts_to_latency():
+    now = 0.0
+    limiter = create_limiter(clock=lambda: now)
+
+    async def run():
+        for _ in range(10):
+            await limiter.acquire()
+            await limiter.acquire()
+            limiter.release(0.01)
+            limiter.release(0.01)
+        increased = limiter.limit
+        await limiter.acquire()
+        limiter.release(0.1)
+        overloaded = limiter.limit
+        await limiter.acquire()
+        limiter.release(dropped=True)
+        return increased, overloaded, limiter.limit
+
+    increased, overloaded, dropped = asyncio.run(run())
+
+    assert increased == 4
+    assert overloaded == 3
+    # The limit is decreased at most once per round trip
+    assert dropped == 3
+    assert limiter.statistics.limit_decreases == 1
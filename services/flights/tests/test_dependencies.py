@@ -0,0 +1,554 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+from fastapi import status
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from flights import dependencies
+from flights.config import Settings
+from flights.exceptions import ExternalDependencyException
+from flights.main import app
+from flights.models import ServiceCalendar, ServiceFlights
+from flights.reference import ReferenceData
+from flights.util import CabinClass, track_stale_response
+
+from .test_cache import FakeClock
+
+airport: dict[str, Any] = {
+    "iata_code": "TLV",
+    "icao_code": "LLBG",
+    "name": "Ben Gurion Airport",
+    "subdivision_code": "IL-M",
+    "city": "Tel Aviv-Yafo",
+    "geo_location": {
+        "type": "Point",
+        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}},
+        "coordinates": [32.009444, 34.882778],
+    },
+}
+
+
+aircraft_model: dict[str, Any] = {
+    "icao_code": "B789",
+    "iata_code": "789",
+    "name": "787",
+    "seat_maps": [
+        {"cabin_class": "E", "start_row": 1, "end_row": 10, "column_layout": "ABC"}
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def reference_data(monkeypatch):
+    data = ReferenceData.parse(
+        {
+            "airport": [airport, airport | {"iata_code": "LAX"}],
+            "aircraft_model": [aircraft_model],
+        }
+    )
+    monkeypatch.setattr(dependencies.get_reference_data_index(), "_data", data)
+    return data
+
+
+def flight(flight_id: str, departure_time: str, cabins: dict[str, int]):
+    return {
+        "id": flight_id,
+        "departure_terminal": "3",
+        "departure_time": departure_time,
+        "arrival_terminal": "B",
+        "arrival_time": "2020-01-05T00:00:00+00:00",
+        "aircraft_model": {"icao_code": "B789", "iata_code": "789", "name": "787"},
+        "available_seats_counts": [
+            {
+                "cabin_class": cabin_class,
+                "total_seats_count": 30,
+                "available_seats_count": available,
+            }
+            for cabin_class, available in cabins.items()
+        ],
+    }
+
+
+upstream_flights = [
+    flight(
+        "00000000-0000-0000-0000-000000000001",
+        "2020-01-01T10:00:00+00:00",
+        {"E": 10, "B": 2, "F": 0},
+    ),
+    flight(
+        "00000000-0000-0000-0000-000000000002",
+        "2020-01-01T20:00:00+00:00",
+        {"E": 0, "B": 0, "F": 5},
+    ),
+    flight(
+        "00000000-0000-0000-0000-000000000003",
+        "2020-01-02T09:59:59+00:00",
+        {"E": 3},
+    ),
+    flight(
+        "00000000-0000-0000-0000-000000000004",
+        "2020-01-02T10:00:01+00:00",
+        {"E": 30},
+    ),
+]
+
+
+def upstream_find_flights(variables: dict[str, Any]) -> dict[str, Any]:
+    """
+    Emulates the inventory manager's filtering of the findFlights query.
+    """
+    if variables["origin"] != "TLV" or variables["destination"] != "LAX":
+        return {"data": {"service": []}}
+    from_time = datetime.fromisoformat(variables["from_time"])
+    to_time = datetime.fromisoformat(variables["to_time"])
+    passengers = variables.get("passengers", 1)
+    cabin_classes = variables.get("cabin_classes", ["E", "B", "F"])
+    flights = []
+    for f in upstream_flights:
+        departure_time = datetime.fromisoformat(f["departure_time"])
+        counts = f["available_seats_counts"]
+        if not from_time <= departure_time <= to_time:
+            continue
+        if all(c["available_seats_count"] < passengers for c in counts):
+            continue
+        flights.append(
+            f
+            | {
+                "available_seats_counts": [
+                    c
+                    for c in counts
+                    if c["cabin_class"] in cabin_classes
+                    and c["available_seats_count"] >= passengers
+                ]
+            }
+        )
+    service = {
+        "id": 1,
+        "origin_airport": airport,
+        "destination_airport": airport | {"iata_code": "LAX"},
+        "flights": flights,
+    }
+    return {"data": {"service": [service]}}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    queries: list[dict[str, Any]] = []
+
+    async def query_inventory_manager(query: str, variables: dict[str, Any]):
+        queries.append(variables)
+        return upstream_find_flights(variables)
+
+    monkeypatch.setattr(
+        dependencies, "query_inventory_manager", query_inventory_manager
+    )
+    dependencies.get_flights_search_cache().clear()
+    yield queries
+    dependencies.get_flights_search_cache().clear()
+
+
+def find_flights(origin, departure_time, passengers, cabin_classes):
+    return asyncio.run(
+        dependencies.get_flights(
+            origin=origin,
+            destination="LAX",
+            departure_time=departure_time,
+            passengers=passengers,
+            cabin_classes=cabin_classes,
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "departure_time, passengers, cabin_classes",
+    [
+        (datetime(2020, 1, 1, 10, tzinfo=timezone.utc), 1, None),
+        (datetime(2020, 1, 1, 10, 0, 0, 1, tzinfo=timezone.utc), 1, None),
+        (datetime(2020, 1, 1, 0), 1, None),
+        (datetime(2020, 1, 1, 9, 59, 59, tzinfo=timezone.utc), 3, [CabinClass.ECONOMY]),
+        (datetime(2020, 1, 1, 5, tzinfo=timezone.utc), 2, [CabinClass.BUSINESS]),
+        (datetime(2020, 1, 1, 5, tzinfo=timezone.utc), 5, None),
+        (datetime(2020, 1, 1, 5, tzinfo=timezone.utc), 50, None),
+    ],
+)
+def test_get_flights_matches_upstream_search(
+    upstream, departure_time, passengers, cabin_classes
+):
+    expected = upstream_find_flights(
+        {
+            "origin": "TLV",
+            "destination": "LAX",
+            "from_time": departure_time.replace(
+                tzinfo=departure_time.tzinfo or timezone.utc
+            ).isoformat(),
+            "to_time": (
+                departure_time.replace(tzinfo=departure_time.tzinfo or timezone.utc)
+                + timedelta(days=1)
+            ).isoformat(),
+            "passengers": passengers,
+            "cabin_classes": cabin_classes or ["E", "B", "F"],
+        }
+    )["data"]["service"][0]
+
+    result = find_flights("tlv", departure_time, passengers, cabin_classes)
+
+    assert result == ServiceFlights(**expected)
+
+
+def test_get_flights_serves_searches_from_cached_days(upstream):
+    find_flights("TLV", datetime(2020, 1, 1, 6, tzinfo=timezone.utc), 1, None)
+    find_flights("TLV", datetime(2020, 1, 1, 8, tzinfo=timezone.utc), 2, None)
+    find_flights(
+        "TLV", datetime(2020, 1, 1, 12, tzinfo=timezone.utc), 1, [CabinClass.FIRST]
+    )
+
+    assert [q["from_time"] for q in upstream] == [
+        "2020-01-01T00:00:00+00:00",
+        "2020-01-02T00:00:00+00:00",
+    ]
+
+
+def test_get_flights_for_nonexistent_service(upstream):
+    result = find_flights("JFK", datetime(2020, 1, 1, tzinfo=timezone.utc), 1, None)
+
+    assert result is None
+
+
+@pytest.fixture
+def search_cache_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(dependencies.get_flights_search_cache(), "_clock", clock)
+    return clock
+
+
+def test_get_flights_revalidates_stale_days_in_background(upstream, search_cache_clock):
+    settings = dependencies.get_settings()
+    departure_time = datetime(2020, 1, 1, 0, tzinfo=timezone.utc)
+
+    async def run():
+        stale_response = track_stale_response()
+        result = await dependencies.get_flights(
+            origin="TLV",
+            destination="LAX",
+            departure_time=departure_time,
+            passengers=1,
+            cabin_classes=None,
+        )
+        # Let the background revalidation complete
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return result, stale_response.stale
+
+    find_flights("TLV", departure_time, 1, None)
+    search_cache_clock.time = settings.flights_search_cache_ttl + 0.1
+    result, stale = asyncio.run(run())
+
+    assert result == find_flights("TLV", departure_time, 1, None)
+    assert stale
+    assert len(upstream) == 4
+
+
+def test_get_flights_uses_stale_days_on_upstream_error(
+    upstream, search_cache_clock, monkeypatch
+):
+    settings = dependencies.get_settings()
+    departure_time = datetime(2020, 1, 1, 0, tzinfo=timezone.utc)
+    expected = find_flights("TLV", departure_time, 1, None)
+
+    async def query_inventory_manager(query: str, variables: dict[str, Any]):
+        raise ExternalDependencyException
+
+    async def run():
+        stale_response = track_stale_response()
+        result = await dependencies.get_flights(
+            origin="TLV",
+            destination="LAX",
+            departure_time=departure_time,
+            passengers=1,
+            cabin_classes=None,
+        )
+        return result, stale_response.stale
+
+    monkeypatch.setattr(
+        dependencies, "query_inventory_manager", query_inventory_manager
+    )
+    search_cache_clock.time = (
+        settings.flights_search_cache_ttl + settings.cache_stale_while_revalidate + 1
+    )
+
+    assert asyncio.run(run()) == (expected, True)
+
+    search_cache_clock.time = (
+        settings.flights_search_cache_ttl + settings.cache_stale_if_error + 1
+    )
+    with pytest.raises(ExternalDependencyException):
+        asyncio.run(run())
+
+
+@pytest.fixture
+def upstream_flight_details(monkeypatch):
+    queries: list[dict[str, Any]] = []
+    service = {"id": 1, "origin_airport": airport, "destination_airport": airport}
+
+    async def query_inventory_manager(query: str, variables: dict[str, Any]):
+        queries.append(variables)
+        return {
+            "data": {
+                "flight": [
+                    f | {"service": service}
+                    for f in upstream_flights
+                    if f["id"] in variables["flight_ids"]
+                ]
+            }
+        }
+
+    monkeypatch.setattr(
+        dependencies, "query_inventory_manager", query_inventory_manager
+    )
+    dependencies.get_flight_details_cache().clear()
+    yield queries
+    dependencies.get_flight_details_cache().clear()
+
+
+def test_get_flight_details_batches_concurrent_lookups(upstream_flight_details):
+    flight_ids = [
+        UUID("00000000-0000-0000-0000-000000000001"),
+        UUID("00000000-0000-0000-0000-000000000002"),
+        UUID("00000000-0000-0000-0000-000000000009"),
+    ]
+
+    async def run():
+        return await asyncio.gather(
+            *[dependencies.get_flight_details(i) for i in flight_ids]
+        )
+
+    results = asyncio.run(run())
+
+    assert [r and r.id for r in results] == flight_ids[:2] + [None]
+    assert upstream_flight_details == [{"flight_ids": [str(i) for i in flight_ids]}]
+
+
+def test_get_flight_details_uses_availability_mirror(upstream_flight_details):
+    flight_id = UUID("00000000-0000-0000-0000-000000000001")
+    mirror = dependencies.get_availability_mirror()
+    mirrored_cabins = {
+        "id": str(flight_id),
+        "available_seats_counts": [
+            {"cabin_class": "E", "total_seats_count": 30, "available_seats_count": 1}
+        ],
+        "availability_changes_aggregate": {"aggregate": {"max": {"changed_at": None}}},
+    }
+
+    asyncio.run(dependencies.get_flight_details(flight_id))
+    mirror._reload([mirrored_cabins])
+    try:
+        result = asyncio.run(dependencies.get_flight_details(flight_id))
+    finally:
+        mirror._reset()
+
+    assert result is not None
+    assert [c.available_seats_count for c in result.cabins] == [1]
+    assert len(upstream_flight_details) == 1
+
+
+@pytest.fixture
+def upstream_calendar(monkeypatch):
+    queries: list[dict[str, Any]] = []
+
+    async def query_inventory_manager(query: str, variables: dict[str, Any]):
+        queries.append(variables)
+        if variables["origin"] != "TLV" or variables["destination"] != "LAX":
+            return {"data": {"service": []}}
+        from_time = datetime.fromisoformat(variables["from_time"])
+        to_time = datetime.fromisoformat(variables["to_time"])
+        flights = [
+            {
+                "departure_time": f["departure_time"],
+                "available_seats_counts": [
+                    {
+                        "cabin_class": c["cabin_class"],
+                        "available_seats_count": c["available_seats_count"],
+                    }
+                    for c in f["available_seats_counts"]
+                ],
+            }
+            for f in upstream_flights
+            if from_time <= datetime.fromisoformat(f["departure_time"]) <= to_time
+        ]
+        return {"data": {"service": [{"id": 1, "flights": flights}]}}
+
+    monkeypatch.setattr(
+        dependencies, "query_inventory_manager", query_inventory_manager
+    )
+    dependencies.get_flights_calendar_cache().clear()
+    yield queries
+    dependencies.get_flights_calendar_cache().clear()
+
+
+def get_calendar(origin, from_date, to_date, passengers=1, cabin_classes=None):
+    return asyncio.run(
+        dependencies.get_flights_calendar(
+            origin=origin,
+            destination="LAX",
+            from_date=from_date,
+            to_date=to_date,
+            passengers=passengers,
+            cabin_classes=cabin_classes,
+        )
+    )
+
+
+def test_get_flights_calendar_summarizes_days(upstream_calendar):
+    calendar = get_calendar("tlv", date(2019, 12, 31), date(2020, 1, 2), 3)
+
+    assert calendar == ServiceCalendar(
+        id=1,
+        origin="TLV",
+        destination="LAX",
+        days=[
+            {"day": date(2019, 12, 31), "flights_count": 0, "cabins": []},
+            {
+                "day": date(2020, 1, 1),
+                "flights_count": 2,
+                "cabins": [
+                    {"cabin_class": "E", "available_seats_count": 10},
+                    {"cabin_class": "F", "available_seats_count": 5},
+                ],
+            },
+            {
+                "day": date(2020, 1, 2),
+                "flights_count": 2,
+                "cabins": [{"cabin_class": "E", "available_seats_count": 30}],
+            },
+        ],
+    )
+    assert len(upstream_calendar) == 1
+
+
+def test_get_flights_calendar_queries_only_missing_days(upstream_calendar):
+    get_calendar("TLV", date(2020, 1, 1), date(2020, 1, 1))
+    calendar = get_calendar(
+        "TLV", date(2020, 1, 1), date(2020, 1, 2), cabin_classes=[CabinClass.BUSINESS]
+    )
+
+    assert [d.flights_count for d in calendar.days] == [1, 0]
+    assert [(q["from_time"], q["to_time"]) for q in upstream_calendar] == [
+        ("2020-01-01T00:00:00+00:00", "2020-01-01T23:59:59.999999+00:00"),
+        ("2020-01-02T00:00:00+00:00", "2020-01-02T23:59:59.999999+00:00"),
+    ]
+
+
+def test_get_flights_calendar_for_nonexistent_service(upstream_calendar):
+    assert get_calendar("JFK", date(2020, 1, 1), date(2020, 1, 2)) is None
+
+
+@pytest.mark.parametrize(
+    "from_date, to_date, expected_message",
+    [
+        (
+            date(2020, 1, 2),
+            date(2020, 1, 1),
+            "ensure this value is not before the from date",
+        ),
+        (
+            date(2020, 1, 1),
+            date(2020, 3, 3),
+            "ensure the calendar has at most 62 days",
+        ),
+    ],
+)
+def test_get_flights_calendar_with_invalid_range(
+    upstream_calendar, from_date, to_date, expected_message
+):
+    with pytest.raises(RequestValidationError) as exc_info:
+        get_calendar("TLV", from_date, to_date)
+
+    assert exc_info.value.errors() == [
+        {"loc": ("query", "to"), "msg": expected_message, "type": "value_error"}
+    ]
+    assert upstream_calendar == []
+
+
+@pytest.mark.parametrize("adaptive_concurrency", [False, True])
+def test_inventory_manager_caller_limits_concurrency_when_enabled(
+    adaptive_concurrency, monkeypatch
+):
+    settings = dependencies.get_settings()
+    monkeypatch.setattr(
+        settings, "inventory_manager_adaptive_concurrency", adaptive_concurrency
+    )
+    dependencies.get_inventory_manager_caller.cache_clear()
+    try:
+        caller = dependencies.get_inventory_manager_caller()
+    finally:
+        dependencies.get_inventory_manager_caller.cache_clear()
+
+    assert (caller.limiter is not None) == adaptive_concurrency
+
+
+def test_batch_endpoints_are_limited_to_single_batched_query():
+    settings = Settings(
+        flights_batch_max_size=100, inventory_manager_max_batch_size=100
+    )
+
+    assert settings.flights_batch_max_size == 100
+    with pytest.raises(ValidationError, match="inventory_manager_max_batch_size"):
+        Settings(flights_batch_max_size=101, inventory_manager_max_batch_size=100)
+
+
+def test_inventory_manager_client_is_shared_for_application_lifetime(monkeypatch):
+    clients: list[tuple[httpx.AsyncClient, dict[str, Any]]] = []
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = {"flight": [], "airport": [], "aircraft_model": []}
+        if request.url.path.startswith("/api/rest/"):
+            return httpx.Response(200, json=body)
+        return httpx.Response(200, json={"data": body})
+
+    class MockAsyncClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(handler), **kwargs)
+            clients.append((self, kwargs))
+
+    settings = dependencies.get_settings()
+    monkeypatch.setattr(settings, "inventory_manager_max_connections", 7)
+    monkeypatch.setattr(settings, "inventory_manager_max_keepalive_connections", 3)
+    monkeypatch.setattr(settings, "inventory_manager_keepalive_expiry", 2.0)
+    monkeypatch.setattr(settings, "inventory_manager_timeout", 1.5)
+    monkeypatch.setattr(settings, "inventory_manager_http2", True)
+    monkeypatch.setattr(httpx, "AsyncClient", MockAsyncClient)
+    monkeypatch.setattr(dependencies, "_inventory_manager_client", None)
+    monkeypatch.setattr(app, "dependency_overrides", {})
+
+    with TestClient(app) as client:
+        for _ in range(2):
+            response = client.get(f"/flight/{uuid4()}")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+        shared_client = dependencies._inventory_manager_client
+
+    [(created_client, kwargs)] = clients
+    assert shared_client is created_client
+    flight_lookups = [
+        r
+        for r in requests
+        if r.url.path != "/api/rest/flights/reference"
+        and b"getReferenceData" not in r.content
+    ]
+    assert len(flight_lookups) == 2
+    assert created_client.is_closed
+    assert dependencies._inventory_manager_client is None
+    assert kwargs == {
+        "limits": httpx.Limits(
+            max_connections=7, max_keepalive_connections=3, keepalive_expiry=2.0
+        ),
+        "timeout": 1.5,
+        "http2": True,
+    }
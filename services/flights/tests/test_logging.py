@@ -0,0 +1,161 @@
+import io
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from uuid import UUID
+
+import httpx
+import pytest
+
+from benchmarks.fixtures import access_log_record, tlv_airport
+from flights import models
+from flights.config import JsonLogFormatter, LogDropPolicy, QueuedStreamHandler
+from flights.util import log_response
+
+
+class BlockedStream(io.StringIO):
+    """
+    A stream which blocks writes until it is unblocked.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.unblocked.wait()
+        return super().write(s)
+
+
+def create_logger(handler: logging.Handler) -> logging.Logger:
+    handler.setFormatter(JsonLogFormatter(fields=["message"]))
+    logger = logging.getLogger(f"flights.tests.logging.{id(handler)}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def written_messages(stream: io.StringIO) -> list[str]:
+    return [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+
+
+def test_queued_handler_writes_records_in_background():
+    stream = io.StringIO()
+    handler = QueuedStreamHandler(stream)
+    logger = create_logger(handler)
+
+    for i in range(3):
+        logger.warning("Record %d", i)
+    # The handler is closed while holding its lock on shutdown (see logging.shutdown)
+    with handler.lock:  # type: ignore[union-attr]
+        handler.close()
+
+    assert written_messages(stream) == ["Record 0", "Record 1", "Record 2"]
+    assert handler.dropped == 0
+
+
+@pytest.mark.parametrize(
+    "drop_policy, expected_messages",
+    [
+        (LogDropPolicy.NEWEST, ["Record 0", "Record 1", "Record 2"]),
+        (LogDropPolicy.OLDEST, ["Record 0", "Record 3", "Record 4"]),
+    ],
+)
+def test_queued_handler_drops_records_when_queue_is_full(
+    drop_policy, expected_messages
+):
+    stream = BlockedStream()
+    handler = QueuedStreamHandler(stream, queue_size=2, drop_policy=drop_policy)
+    logger = create_logger(handler)
+
+    logger.warning("Record 0")
+    # Wait for the writer to block on writing the first record
+    while not handler._queue.empty():
+        pass
+    for i in range(1, 5):
+        logger.warning("Record %d", i)
+    stream.unblocked.set()
+    handler.close()
+
+    assert handler.dropped == 2
+    assert written_messages(stream) == expected_messages + [
+        "Dropped 2 log records, as the log queue was full"
+    ]
+
+
+def create_response(request_body: dict, response_body: dict) -> httpx.Response:
+    request = httpx.Request("POST", "http://inventory-manager", json=request_body)
+    return httpx.Response(200, json=response_body, request=request)
+
+
+def test_log_response_truncates_large_bodies(caplog):
+    request_body = {"flight_ids": []}
+    response_body = {"data": {"flight": ["flight"] * 100}}
+    response = create_response(request_body, response_body)
+
+    with caplog.at_level(logging.INFO):
+        log_response(
+            logging.getLogger(),
+            "Queried",
+            request_body=request_body,
+            response=response,
+            response_body=response_body,
+            max_body_size=50,
+        )
+
+    extra = caplog.records[0].extra  # type: ignore[attr-defined]
+    assert extra["requestBody"] == request_body
+    assert extra["responseBody"] == (
+        response.content[:50].decode()
+        + f"... (truncated, {len(response.content)} bytes)"
+    )
+
+
+def test_log_response_samples_bodies(caplog):
+    response = create_response({}, {})
+
+    with caplog.at_level(logging.INFO):
+        log_response(
+            logging.getLogger(),
+            "Queried",
+            request_body={},
+            response=response,
+            response_body={},
+            body_sample_rate=0,
+        )
+
+    extra = caplog.records[0].extra  # type: ignore[attr-defined]
+    assert extra["statusCode"] == 200
+    assert "requestBody" not in extra and "responseBody" not in extra
+
+
+def test_fast_formatter_matches_formatter():
+    record = access_log_record()
+
+    log = json.loads(JsonLogFormatter().format(record))
+    fast_log = json.loads(JsonLogFormatter(fast=True).format(record))
+
+    assert fast_log == log
+
+
+def test_fast_formatter_encodes_extra_types():
+    record = access_log_record()
+    record.extra = {
+        "id": UUID("eb2e5080-000e-440d-8242-46428e577ce5"),
+        "time": datetime(2022, 1, 15, 20, 36, 10, tzinfo=timezone.utc),
+        "codes": {"TLV"},
+        "location": models.GeoLocation(**tlv_airport["geo_location"]),
+    }
+
+    log = json.loads(JsonLogFormatter(fast=True).format(record))
+
+    assert log["extra"] == {
+        "id": "eb2e5080-000e-440d-8242-46428e577ce5",
+        "time": "2022-01-15T20:36:10+00:00",
+        "codes": ["TLV"],
+        "location": {
+            "crs": "urn:ogc:def:crs:EPSG::4326",
+            "coordinates": [32.009444, 34.882778],
+        },
+    }
@@ -0,0 +1,132 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from flights import metrics
+from flights.middleware import (
+    AccessLogMiddleware,
+    MetricsMiddleware,
+    RequestDeadlineMiddleware,
+)
+from flights.util import (
+    REQUEST_TIMEOUT_HEADER,
+    STALE_RESPONSE_WARNING,
+    get_remaining_time,
+    mark_stale_response,
+)
+
+log = logging.getLogger("flights.tests.access")
+
+app = FastAPI()
+app.add_middleware(AccessLogMiddleware, logger=log)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestDeadlineMiddleware, timeout=10)
+client = TestClient(app)
+
+
+@app.get("/stream")
+async def stream():
+    async def chunks():
+        for chunk in ["first\n", "second\n"]:
+            yield chunk
+
+    return StreamingResponse(chunks(), status_code=201)
+
+
+@app.get("/stale")
+async def stale():
+    mark_stale_response()
+    return PlainTextResponse("stale")
+
+
+@app.get("/item/{itemId}")
+async def item(itemId: int):
+    return {"itemId": itemId}
+
+
+@app.get("/deadline")
+async def deadline():
+    return {"remaining": get_remaining_time()}
+
+
+def test_access_log_of_streaming_response(caplog):
+    with caplog.at_level(logging.INFO, logger=log.name):
+        response = client.get("/stream?flights=2")
+
+    [record] = caplog.records
+    extra = record.extra  # type: ignore[attr-defined]
+    assert response.text == "first\nsecond\n"
+    assert record.getMessage().startswith("testclient - GET /stream?flights=2 - 201")
+    assert extra["type"] == "access"
+    assert extra["responseCode"] == 201
+    assert extra["startTime"] <= extra["endTime"]
+
+
+def test_access_log_is_skipped_when_disabled(caplog):
+    with caplog.at_level(logging.WARNING, logger=log.name):
+        response = client.get("/stale")
+
+    assert response.headers["Warning"] == STALE_RESPONSE_WARNING
+    assert not caplog.records
+
+
+def test_metrics_of_streaming_response():
+    labels = {"method": "GET", "route": "/stream", "status": "201"}
+    count = "flights_http_request_duration_seconds_count"
+    before = REGISTRY.get_sample_value(count, labels) or 0
+
+    client.get("/stream")
+
+    assert REGISTRY.get_sample_value(count, labels) == before + 1
+    assert REGISTRY.get_sample_value("flights_http_requests_in_flight") == 0
+
+
+@pytest.mark.parametrize(
+    "path, route", [("/item/1", "/item/{itemId}"), ("/missing", "unmatched")]
+)
+def test_metrics_are_labeled_by_route(path, route):
+    def requests_count() -> float:
+        return sum(
+            sample.value
+            for metric in REGISTRY.collect()
+            for sample in metric.samples
+            if sample.name == "flights_http_request_duration_seconds_count"
+            and sample.labels["route"] == route
+        )
+
+    before = requests_count()
+
+    client.get(path)
+
+    assert requests_count() == before + 1
+
+
+def test_route_is_labeled_once_per_request(monkeypatch):
+    apps = []
+    get_route_paths = metrics._get_route_paths
+
+    def counted_get_route_paths(app):
+        apps.append(app)
+        return get_route_paths(app)
+
+    monkeypatch.setattr(metrics, "_get_route_paths", counted_get_route_paths)
+
+    client.get("/item/1")
+
+    assert apps == [app]
+
+
+@pytest.mark.parametrize(
+    "requested_timeout, min_remaining, max_remaining",
+    [(None, 9, 10), ("2", 1, 2), ("20", 9, 10), ("0", 9, 10), ("invalid", 9, 10)],
+)
+def test_request_deadline(requested_timeout, min_remaining, max_remaining):
+    headers = {REQUEST_TIMEOUT_HEADER: requested_timeout} if requested_timeout else {}
+
+    remaining = client.get("/deadline", headers=headers).json()["remaining"]
+
+    assert min_remaining < remaining <= max_remaining
@@ -0,0 +1,34 @@
+import json
+
+from flights import openapi
+from flights.main import app
+
+from .test_routes import client
+
+
+def test_prebuilt_openapi_is_up_to_date():
+    # If this fails, regenerate the document with: python -m flights.openapi
+    assert openapi.OPENAPI_PATH.read_text() == openapi.dump_openapi(
+        openapi.generate_openapi(app)
+    )
+
+
+def test_prebuilt_openapi_is_served(monkeypatch):
+    monkeypatch.setattr(app, "openapi_schema", None)
+    openapi.load_openapi(app)
+
+    response = client.get("/openapi.json")
+
+    assert response.status_code == 200
+    assert response.json() == json.loads(openapi.OPENAPI_PATH.read_text()) | {
+        "servers": app.servers
+    }
+
+
+def test_missing_prebuilt_openapi_is_generated(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "openapi_schema", None)
+    openapi.load_openapi(app, tmp_path / "openapi.json")
+
+    response = client.get("/openapi.json")
+
+    assert response.json() == openapi.generate_openapi(app) | {"servers": app.servers}
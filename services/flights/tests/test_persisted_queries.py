@@ -0,0 +1,160 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import yaml
+
+from flights import availability, dependencies
+from flights.exceptions import ExternalDependencyException
+from flights.util import set_request_deadline
+
+metadata_path = Path(__file__).parents[2] / "inventory-manager" / "metadata"
+
+
+@pytest.mark.skipif(
+    not metadata_path.exists(), reason="Inventory manager metadata is not available"
+)
+def test_persisted_queries_match_inventory_manager_metadata():
+    collections = yaml.safe_load((metadata_path / "query_collections.yaml").read_text())
+    rest_endpoints = yaml.safe_load((metadata_path / "rest_endpoints.yaml").read_text())
+    allow_list = yaml.safe_load((metadata_path / "allow_list.yaml").read_text())
+
+    flights_collection = next(c for c in collections if c["name"] == "flights")
+    queries = {
+        q["name"]: q["query"] for q in flights_collection["definition"]["queries"]
+    }
+    endpoints = {
+        e["url"]: queries[e["definition"]["query"]["query_name"]]
+        for e in rest_endpoints
+        if e["definition"]["query"]["collection_name"] == "flights"
+    }
+
+    assert {"collection": "flights"} in allow_list
+    assert endpoints == {
+        endpoint: query
+        for query, endpoint in dependencies._persisted_query_endpoints.items()
+    }
+    assert (
+        queries["watchFlightsAvailability"] == availability._watch_flights_subscription
+    )
+    assert (
+        queries["watchFlightsAvailabilityChanges"]
+        == availability._watch_changes_subscription
+    )
+
+
+@pytest.fixture
+def inventory_manager(monkeypatch):
+    requests: list[httpx.Request] = []
+    available_endpoints = {"flights/batch/seats"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.startswith("/api/rest/"):
+            if request.url.path.removeprefix("/api/rest/") not in available_endpoints:
+                return httpx.Response(
+                    404,
+                    json={
+                        "path": "$",
+                        "error": "Endpoint not found",
+                        "code": "not-found",
+                    },
+                )
+            return httpx.Response(200, json={"flight": []})
+        return httpx.Response(200, json={"data": {"flight": []}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(dependencies, "_inventory_manager_client", client)
+    monkeypatch.setattr(dependencies, "_unavailable_persisted_query_endpoints", set())
+    yield requests
+    asyncio.run(client.aclose())
+
+
+def test_persisted_query_is_sent_by_endpoint(inventory_manager):
+    variables = {"flight_ids": ["eb2e5080-000e-440d-8242-46428e577ce5"]}
+
+    response = asyncio.run(
+        dependencies.query_inventory_manager(
+            dependencies._get_flights_seats_query, variables
+        )
+    )
+
+    assert response == {"data": {"flight": []}}
+    assert [r.url.path for r in inventory_manager] == ["/api/rest/flights/batch/seats"]
+    assert json.loads(inventory_manager[0].content) == variables
+
+
+def test_unavailable_persisted_query_falls_back_to_query_text(inventory_manager):
+    variables = {"flight_ids": ["eb2e5080-000e-440d-8242-46428e577ce5"]}
+
+    for _ in range(2):
+        response = asyncio.run(
+            dependencies.query_inventory_manager(
+                dependencies._get_flights_details_query, variables
+            )
+        )
+        assert response == {"data": {"flight": []}}
+
+    assert [r.url.path for r in inventory_manager] == [
+        "/api/rest/flights/batch",
+        "/v1/graphql",
+        "/v1/graphql",
+    ]
+    assert json.loads(inventory_manager[1].content) == {
+        "query": dependencies._get_flights_details_query,
+        "variables": variables,
+    }
+
+
+def test_unavailable_inventory_manager_is_retried(monkeypatch):
+    statuses = [503, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(statuses.pop(0), json={"flight": []})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(dependencies, "_inventory_manager_client", client)
+
+    response = asyncio.run(
+        dependencies.query_inventory_manager(
+            dependencies._get_flights_seats_query, {"flight_ids": []}
+        )
+    )
+    asyncio.run(client.aclose())
+
+    assert response == {"data": {"flight": []}}
+    assert statuses == []
+    assert dependencies.get_inventory_manager_statistics()["getFlightsSeats"].retries
+
+
+def test_coalesced_query_waits_until_each_caller_deadline(monkeypatch):
+    requests: list[dict[str, Any]] = []
+
+    async def send_inventory_manager_query(query: str, variables: dict[str, Any]):
+        requests.append(variables)
+        await asyncio.sleep(0.1)
+        return {"data": {"flight": []}}
+
+    async def query(timeout: float):
+        set_request_deadline(timeout)
+        return await dependencies.query_inventory_manager(
+            dependencies._get_flights_seats_query, {"flight_ids": []}
+        )
+
+    async def run():
+        return await asyncio.gather(
+            query(0.01), query(1), query(1), return_exceptions=True
+        )
+
+    monkeypatch.setattr(
+        dependencies, "_send_inventory_manager_query", send_inventory_manager_query
+    )
+
+    short, *long = asyncio.run(run())
+
+    assert isinstance(short, ExternalDependencyException)
+    assert long == [{"data": {"flight": []}}] * 2
+    assert len(requests) == 1
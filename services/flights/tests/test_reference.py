@@ -0,0 +1,134 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from flights.exceptions import ExternalDependencyException
+from flights.models import FlightSeats, ServiceFlights
+from flights.reference import ReferenceData, ReferenceDataIndex
+
+from .test_dependencies import aircraft_model, airport, upstream_flights
+
+
+def reference_data(*airports: str) -> ReferenceData:
+    return ReferenceData.parse(
+        {
+            "airport": [airport | {"iata_code": a} for a in airports],
+            "aircraft_model": [aircraft_model],
+        }
+    )
+
+
+class Upstream:
+    """
+    Serves the queued reference data, one on each load.
+    """
+
+    def __init__(self, *results: ReferenceData | Exception):
+        self.results = list(results)
+        self.loads = 0
+
+    async def load(self) -> ReferenceData:
+        self.loads += 1
+        await asyncio.sleep(0)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def slim_flight(flight: dict[str, Any]) -> dict[str, Any]:
+    return flight | {
+        "aircraft_model": {"icao_code": flight["aircraft_model"]["icao_code"]}
+    }
+
+
+def test_reference_data_joins_codes():
+    data = reference_data("TLV", "LAX")
+    service = {
+        "id": 1,
+        "origin_airport": {"iata_code": "TLV"},
+        "destination_airport": {"iata_code": "LAX"},
+    }
+
+    service_flights = ServiceFlights(
+        **data.join_service(service)
+        | {"flights": [data.join_flight(slim_flight(f)) for f in upstream_flights]}
+    )
+    flight_seats = FlightSeats(
+        **data.join_flight(
+            {
+                "id": upstream_flights[0]["id"],
+                "aircraft_model": {"icao_code": "B789"},
+                "booked_seats": [],
+            },
+            seat_map=True,
+        )
+    )
+
+    assert service_flights.origin_airport.name == airport["name"]
+    assert service_flights.destination_airport.iata_code == "LAX"
+    assert service_flights.flights[0].aircraft_model.name == "787"
+    assert flight_seats.aircraft_model_with_seat_map.seat_map[0].end_row == 10
+    assert service["origin_airport"] == {"iata_code": "TLV"}
+
+
+def test_index_loads_once_for_concurrent_lookups():
+    upstream = Upstream(reference_data("TLV"))
+    index = ReferenceDataIndex(upstream.load, refresh_interval=60)
+
+    async def run():
+        return await asyncio.gather(
+            index.get(airports=["TLV"]), index.get(aircraft_models=["B789"])
+        )
+
+    first, second = asyncio.run(run())
+
+    assert first is second
+    assert upstream.loads == 1
+
+
+def test_index_reloads_for_unknown_codes():
+    upstream = Upstream(reference_data("TLV"), reference_data("TLV", "LAX"))
+    index = ReferenceDataIndex(upstream.load, refresh_interval=60)
+
+    async def run():
+        await index.get(airports=["TLV"])
+        known = await index.get(airports=["TLV"])
+        reloaded = await index.get(airports=["TLV", "LAX"])
+        return known, reloaded
+
+    known, reloaded = asyncio.run(run())
+
+    assert "LAX" not in known.airports
+    assert "LAX" in reloaded.airports
+    assert upstream.loads == 2
+
+
+def test_index_fails_for_codes_unknown_after_reload():
+    upstream = Upstream(reference_data("TLV"), reference_data("TLV"))
+    index = ReferenceDataIndex(upstream.load, refresh_interval=60)
+
+    async def run():
+        await index.get(airports=["TLV"])
+        await index.get(aircraft_models=["A320"])
+
+    with pytest.raises(ExternalDependencyException):
+        asyncio.run(run())
+
+
+def test_index_keeps_previous_data_when_refresh_fails():
+    upstream = Upstream(
+        reference_data("TLV"), ExternalDependencyException(), reference_data("LAX")
+    )
+    index = ReferenceDataIndex(upstream.load, refresh_interval=0.01)
+
+    async def run():
+        index.start()
+        while upstream.loads < 2:
+            await asyncio.sleep(0.001)
+        data = await index.get()
+        await index.stop()
+        return data
+
+    assert "TLV" in asyncio.run(run()).airports
@@ -1,9 +1,14 @@
+from uuid import UUID
+
 import pytest
-from fastapi import status
+from fastapi import Path, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.testclient import TestClient
 
-from flights import dependencies
+from flights import dependencies, schemas
 from flights.main import app
+from flights.seats import SEATS_BITMAP_MEDIA_TYPE
+from flights.util import STALE_RESPONSE_WARNING, mark_stale_response
 
 from . import expected, overrides
 
@@ -12,8 +17,11 @@ client = TestClient(app)
 app.dependency_overrides.update(
     {
         dependencies.get_flights: overrides.get_flights,
+        dependencies.get_flights_calendar: overrides.get_flights_calendar,
         dependencies.get_flight_details: overrides.get_flight_details,
         dependencies.get_flight_seats: overrides.get_flight_seats,
+        dependencies.get_flight_details_batch: overrides.get_flight_details_batch,
+        dependencies.get_flight_seats_batch: overrides.get_flight_seats_batch,
     }
 )
 
@@ -49,6 +57,35 @@ def test_find_flights_for_existing_service(
     assert response.json() == expected_response
 
 
+@pytest.mark.parametrize(
+    "destination, expected_status, expected_response",
+    [
+        (
+            expected.flights_calendar.destination,
+            status.HTTP_200_OK,
+            expected.flights_calendar.success_response,
+        ),
+        (
+            expected.flights_calendar.no_flights_destination,
+            status.HTTP_404_NOT_FOUND,
+            expected.flights_calendar.flights_not_found_response,
+        ),
+    ],
+)
+def test_get_flights_calendar(destination, expected_status, expected_response):
+    response = client.get(
+        f"/flights/{expected.flights_calendar.origin}/{destination}/calendar",
+        params={
+            "from": expected.flights_calendar.from_date,
+            "to": expected.flights_calendar.to_date,
+            "passengers": 20,
+            "cabin": ["E", "F"],
+        },
+    )
+    assert response.status_code == expected_status
+    assert response.json() == expected_response
+
+
 @pytest.mark.parametrize(
     "flight_id, expected_status, expected_response",
     [
@@ -70,6 +107,25 @@ def test_get_flight_details(flight_id, expected_status, expected_response):
     assert response.json() == expected_response
 
 
+def test_stale_response_has_warning_header(monkeypatch):
+    async def get_stale_flight_details(flight_id: UUID = Path(..., alias="flightId")):
+        mark_stale_response()
+        return await overrides.get_flight_details(flight_id)
+
+    flight_id = expected.flight_details.existing_flight_id
+    fresh_response = client.get(f"/flight/{flight_id}")
+    monkeypatch.setitem(
+        app.dependency_overrides,
+        dependencies.get_flight_details,
+        get_stale_flight_details,
+    )
+    stale_response = client.get(f"/flight/{flight_id}")
+
+    assert "Warning" not in fresh_response.headers
+    assert stale_response.headers["Warning"] == STALE_RESPONSE_WARNING
+    assert stale_response.json() == fresh_response.json()
+
+
 @pytest.mark.parametrize(
     "flight_id, expected_status, expected_response",
     [
@@ -89,3 +145,198 @@ def test_get_flight_seats(flight_id, expected_status, expected_response):
     response = client.get(f"/flight/{flight_id}/seats")
     assert response.status_code == expected_status
     assert response.json() == expected_response
+
+
+@pytest.mark.parametrize(
+    "params, headers, expected_content_type",
+    [
+        ({"format": "bitmap"}, {}, "application/json"),
+        ({}, {"Accept": SEATS_BITMAP_MEDIA_TYPE}, SEATS_BITMAP_MEDIA_TYPE),
+    ],
+)
+def test_get_flight_seats_bitmap(params, headers, expected_content_type):
+    response = client.get(
+        f"/flight/{expected.flight_seats.existing_flight_id}/seats",
+        params=params,
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"] == expected_content_type
+    assert response.json() == expected.flight_seats.success_bitmap_response
+
+
+@pytest.mark.parametrize(
+    "path, headers",
+    [
+        (f"/flight/{expected.flight_details.existing_flight_id}", {}),
+        (f"/flight/{expected.flight_seats.existing_flight_id}/seats", {}),
+        (f"/flight/{expected.flight_seats.existing_flight_id}/seats?format=bitmap", {}),
+        (
+            f"/flight/{expected.flight_seats.existing_flight_id}/seats",
+            {"Accept": SEATS_BITMAP_MEDIA_TYPE},
+        ),
+    ],
+)
+def test_conditional_get(path, headers):
+    response = client.get(path, headers=headers)
+    etag = response.headers["ETag"]
+
+    not_modified_response = client.get(
+        path, headers=headers | {"If-None-Match": f'"other", W/{etag}'}
+    )
+    modified_response = client.get(path, headers=headers | {"If-None-Match": '"a"'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert not_modified_response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified_response.headers["ETag"] == etag
+    assert not_modified_response.content == b""
+    assert modified_response.status_code == status.HTTP_200_OK
+    assert modified_response.content == response.content
+
+
+def test_flight_seats_representations_have_different_etags():
+    path = f"/flight/{expected.flight_seats.existing_flight_id}/seats"
+
+    list_response = client.get(path)
+    bitmap_response = client.get(path, params={"format": "bitmap"})
+
+    assert list_response.headers["ETag"] != bitmap_response.headers["ETag"]
+    assert list_response.headers["Vary"] == "Accept"
+
+
+@pytest.mark.parametrize(
+    "path, expected_flight",
+    [
+        ("/flights/batch", expected.flight_details.success_response),
+        ("/flights/batch/seats", expected.flight_seats.success_response),
+    ],
+)
+def test_get_flights_batch(path, expected_flight):
+    existing_flight_id = expected.flight_details.existing_flight_id
+    nonexistent_flight_id = expected.flight_details.nonexistent_flight_id
+
+    response = client.post(
+        path,
+        json={
+            "flightIds": [existing_flight_id, nonexistent_flight_id, existing_flight_id]
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "flights": {existing_flight_id: expected_flight},
+        "notFound": [nonexistent_flight_id],
+    }
+
+
+@pytest.mark.parametrize("path", ["/flights/batch", "/flights/batch/seats"])
+@pytest.mark.parametrize(
+    "flight_ids, expected_message",
+    [
+        ([], "ensure this value has at least 1 items"),
+        (
+            [expected.flight_details.existing_flight_id] * 51,
+            "ensure this value has at most 50 items",
+        ),
+    ],
+)
+def test_get_flights_batch_with_invalid_size(path, flight_ids, expected_message):
+    response = client.post(path, json={"flightIds": flight_ids})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["details"] == [
+        {"cause": "body/flightIds", "message": expected_message}
+    ]
+
+
+@pytest.mark.parametrize(
+    "method, path, body, response_model",
+    [
+        (
+            "GET",
+            f"/flights/{expected.flights.origin}/{expected.flights.destination}"
+            f"/{expected.flights.departure_time}",
+            None,
+            schemas.FlightsList,
+        ),
+        (
+            "GET",
+            f"/flights/{expected.flights_calendar.origin}"
+            f"/{expected.flights_calendar.destination}/calendar"
+            f"?from={expected.flights_calendar.from_date}"
+            f"&to={expected.flights_calendar.to_date}",
+            None,
+            schemas.FlightsCalendar,
+        ),
+        (
+            "GET",
+            f"/flight/{expected.flight_details.existing_flight_id}",
+            None,
+            schemas.FlightDetails,
+        ),
+        (
+            "GET",
+            f"/flight/{expected.flight_seats.existing_flight_id}/seats",
+            None,
+            schemas.FlightSeats,
+        ),
+        (
+            "GET",
+            f"/flight/{expected.flight_seats.existing_flight_id}/seats?format=bitmap",
+            None,
+            schemas.FlightSeatsBitmap,
+        ),
+        (
+            "POST",
+            "/flights/batch",
+            {"flightIds": [expected.flight_details.existing_flight_id]},
+            schemas.FlightDetailsBatch,
+        ),
+        (
+            "POST",
+            "/flights/batch/seats",
+            {"flightIds": [expected.flight_seats.existing_flight_id]},
+            schemas.FlightSeatsBatch,
+        ),
+    ],
+)
+def test_responses_match_response_models(method, path, body, response_model):
+    response = client.request(method, path, json=body)
+
+    assert response.status_code == status.HTTP_200_OK
+    parsed_response = response_model.parse_raw(response.content)
+    assert jsonable_encoder(parsed_response, by_alias=True) == response.json()
+
+
+def test_stream_flight_seats_for_nonexistent_flight():
+    flight_id = expected.flight_seats.nonexistent_flight_id
+    response = client.get(f"/flight/{flight_id}/seats/stream")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == expected.flight_seats.flight_not_found_response
+
+
+def test_stream_flight_seats_with_too_many_streams(monkeypatch):
+    monkeypatch.setattr(dependencies.get_flight_seats_streams(), "max_streams", 0)
+    flight_id = expected.flight_seats.existing_flight_id
+    response = client.get(f"/flight/{flight_id}/seats/stream")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_metrics():
+    flight_id = expected.flight_seats.nonexistent_flight_id
+    client.get(f"/flight/{flight_id}")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {
+        line.split(" ")[0] for line in response.text.splitlines() if line[0] != "#"
+    }
+    assert (
+        'flights_http_request_duration_seconds_count{method="GET",'
+        'route="/flight/{flightId}",status="404"}'
+    ) in samples
+    assert 'flights_cache_hits_total{cache="details"}' in samples
+    assert "flights_http_requests_in_flight" in samples
@@ -0,0 +1,64 @@
+from flights import models, schemas
+
+from .test_dependencies import airport, upstream_flights
+
+flight_seats_data = {
+    "id": "00000000-0000-0000-0000-000000000001",
+    "aircraft_model": {
+        "icao_code": "A320",
+        "iata_code": "320",
+        "name": "Airbus A320",
+        "seat_maps": [
+            {
+                "cabin_class": "E",
+                "start_row": 1,
+                "end_row": 30,
+                "column_layout": "ABC-DEF",
+            }
+        ],
+    },
+    "booked_seats": [
+        {"seat_row": 1, "seat_column": "A"},
+        {"seat_row": 2, "seat_column": "B"},
+    ],
+}
+
+
+def test_flight_details_etag_changes_with_availability():
+    flight_data = upstream_flights[0] | {
+        "service": {"id": 1, "origin_airport": airport, "destination_airport": airport}
+    }
+    flight = models.FlightDetails(**flight_data)
+    cabins = [c.copy(update={"available_seats_count": 0}) for c in flight.cabins]
+    booked_flight = flight.copy(update={"cabins": cabins})
+
+    assert schemas.FlightDetails.etag(flight) == schemas.FlightDetails.etag(
+        models.FlightDetails(**flight_data)
+    )
+    assert schemas.FlightDetails.etag(flight) != schemas.FlightDetails.etag(
+        booked_flight
+    )
+
+
+def test_flight_seats_etag_changes_with_booked_seats():
+    flight_seats = models.FlightSeats(**flight_seats_data)
+    reordered_flight_seats = models.FlightSeats(
+        **flight_seats_data
+        | {"booked_seats": list(reversed(flight_seats_data["booked_seats"]))}
+    )
+    # The same number of booked seats, but different seats
+    rebooked_flight_seats = models.FlightSeats(
+        **flight_seats_data
+        | {
+            "booked_seats": [
+                {"seat_row": 1, "seat_column": "A"},
+                {"seat_row": 2, "seat_column": "C"},
+            ]
+        }
+    )
+
+    etag = schemas.FlightSeats.etag(flight_seats)
+
+    assert etag == schemas.FlightSeats.etag(reordered_flight_seats)
+    assert etag != schemas.FlightSeats.etag(rebooked_flight_seats)
+    assert etag != schemas.FlightSeatsBitmap.etag(flight_seats)
@@ -0,0 +1,49 @@
+import base64
+
+from flights.models import AircraftModelWithSeatMap, BookedSeat
+from flights.seats import encode_booked_seats, get_seat_layouts
+
+aircraft_model_data = {
+    "icao_code": "A320",
+    "iata_code": "320",
+    "name": "Airbus A320",
+    "seat_maps": [
+        {
+            "cabin_class": "E",
+            "start_row": 10,
+            "end_row": 11,
+            "column_layout": "ABC-DEF",
+        },
+        {"cabin_class": "B", "start_row": 1, "end_row": 2, "column_layout": "A#C-D#F"},
+        {"cabin_class": "E", "start_row": 5, "end_row": 5, "column_layout": "###-DEF"},
+    ],
+}
+
+
+def test_seat_layouts_are_expanded_once_per_aircraft_model():
+    first = get_seat_layouts(AircraftModelWithSeatMap(**aircraft_model_data))
+    second = get_seat_layouts(AircraftModelWithSeatMap(**aircraft_model_data))
+
+    assert first is second
+    assert [(c.cabin_class, c.seats_count) for c in first] == [("E", 15), ("B", 8)]
+    # Seats are ordered by row, even if the sections are not
+    economy = first[0]
+    assert economy.seat_indexes[(5, "D")] == 0
+    assert economy.seat_indexes[(10, "A")] == 3
+    assert economy.seat_indexes[(11, "F")] == 14
+
+
+def test_encode_booked_seats():
+    economy, _ = get_seat_layouts(AircraftModelWithSeatMap(**aircraft_model_data))
+    booked_seats = [
+        BookedSeat(seat_row=5, seat_column="D"),
+        BookedSeat(seat_row=11, seat_column="F"),
+        BookedSeat(seat_row=11, seat_column="F"),
+        # Seats outside of the cabin are ignored
+        BookedSeat(seat_row=1, seat_column="A"),
+    ]
+
+    bitmap, booked_seats_count = encode_booked_seats(economy, booked_seats)
+
+    assert booked_seats_count == 2
+    assert base64.urlsafe_b64decode(bitmap) == bytes([0b1000_0000, 0b0000_0010])
@@ -0,0 +1,198 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+from uuid import UUID
+
+import pytest
+
+from flights.exceptions import ExternalDependencyException, ServiceUnavailableException
+from flights.models import BookedSeat, FlightSeats
+from flights.streams import SSE_HEARTBEAT, FlightSeatsStreams
+
+from . import expected, overrides
+
+flight_id = UUID(expected.flight_seats.existing_flight_id)
+upstream_flight_seats = asyncio.run(overrides.get_flight_seats(flight_id))
+
+
+def flight_seats(*booked_seats: tuple[int, str]) -> FlightSeats:
+    assert upstream_flight_seats is not None
+    return upstream_flight_seats.copy(
+        update={
+            "booked_seats": [
+                BookedSeat(seat_row=row, seat_column=column)
+                for row, column in booked_seats
+            ]
+        }
+    )
+
+
+class Upstream:
+    """
+    Serves the queued seats of the flight, one on each load.
+    """
+
+    def __init__(self, *results: FlightSeats | Exception | None):
+        self.results = list(results)
+        self.last: FlightSeats | None = flight_seats()
+        self.loads = 0
+
+    async def load(self, requested_flight_id: UUID) -> FlightSeats | None:
+        assert requested_flight_id == flight_id
+        self.loads += 1
+        if not self.results:
+            return self.last
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        self.last = result
+        return result
+
+
+def create_streams(upstream: Upstream, **kwargs: Any) -> FlightSeatsStreams:
+    return FlightSeatsStreams(
+        upstream.load,
+        **{
+            "poll_interval": 0.01,
+            "heartbeat_interval": 60,
+            "queue_size": 16,
+            "max_streams": 10,
+        }
+        | kwargs,
+    )
+
+
+def parse_event(chunk: bytes) -> tuple[str, dict[str, Any]]:
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+async def next_event(events: AsyncIterator[bytes]) -> tuple[str, dict[str, Any]]:
+    return parse_event(await asyncio.wait_for(events.__anext__(), 1))
+
+
+def test_streams_of_a_flight_share_a_single_watcher():
+    initial = flight_seats((40, "D"), (40, "F"))
+    upstream = Upstream(flight_seats((40, "D"), (41, "A")))
+
+    async def run():
+        streams = create_streams(upstream)
+        first = streams.open(initial)
+        second = streams.open(initial)
+        events = [await next_event(first), await next_event(second)]
+        events += [await next_event(first), await next_event(second)]
+        watchers_count = streams.watchers_count
+        await first.aclose()
+        await second.aclose()
+        return events, watchers_count, streams.watchers_count
+
+    events, watchers_count, final_watchers_count = asyncio.run(run())
+
+    assert [e[0] for e in events] == ["seats", "seats", "change", "change"]
+    assert len(events[0][1]["bookedSeats"]) == 2
+    assert events[2][1] == {
+        "flightId": str(flight_id),
+        "bookedSeats": [{"row": 41, "column": "A"}],
+        "releasedSeats": [{"row": 40, "column": "F"}],
+    }
+    assert events[3] == events[2]
+    assert watchers_count == 1
+    assert final_watchers_count == 0
+
+
+def test_stream_keeps_polling_after_upstream_errors():
+    upstream = Upstream(ExternalDependencyException(), flight_seats((1, "A")))
+
+    async def run():
+        events = create_streams(upstream).open(flight_seats())
+        await next_event(events)
+        event = await next_event(events)
+        await events.aclose()
+        return event
+
+    event = asyncio.run(run())
+
+    assert event[1]["bookedSeats"] == [{"row": 1, "column": "A"}]
+    assert upstream.loads >= 2
+
+
+def test_slow_stream_is_resynchronized_with_current_seats():
+    upstream = Upstream(
+        flight_seats((1, "A")), flight_seats((1, "A"), (2, "A")), flight_seats()
+    )
+
+    async def run():
+        events = create_streams(upstream, queue_size=1).open(flight_seats())
+        await next_event(events)
+        # Let the watcher poll all changes before consuming the rest of the stream
+        while upstream.results:
+            await asyncio.sleep(0.01)
+        event = await next_event(events)
+        await events.aclose()
+        return event
+
+    event_type, data = asyncio.run(run())
+
+    assert event_type == "seats"
+    assert data["bookedSeats"] == []
+
+
+def test_stream_sends_heartbeats():
+    async def run():
+        events = create_streams(Upstream(), heartbeat_interval=0.01).open(
+            flight_seats()
+        )
+        await next_event(events)
+        heartbeat = await asyncio.wait_for(events.__anext__(), 1)
+        await events.aclose()
+        return heartbeat
+
+    assert asyncio.run(run()) == SSE_HEARTBEAT
+
+
+def test_stream_ends_when_flight_is_not_found():
+    async def run():
+        events = create_streams(Upstream(None)).open(flight_seats())
+        return [event async for event in events]
+
+    assert len(asyncio.run(run())) == 1
+
+
+def test_streams_are_limited():
+    async def run():
+        streams = create_streams(Upstream(), max_streams=1)
+        events = streams.open(flight_seats())
+        await next_event(events)
+        try:
+            streams.open(flight_seats())
+        finally:
+            await events.aclose()
+
+    with pytest.raises(ServiceUnavailableException):
+        asyncio.run(run())
+
+
+def test_streams_are_limited_before_they_are_iterated():
+    streams = create_streams(Upstream(), max_streams=2)
+    events = [streams.open(flight_seats()) for _ in range(2)]
+
+    with pytest.raises(ServiceUnavailableException):
+        streams.open(flight_seats())
+
+    # The slot of a stream which was never iterated is released once it is discarded
+    del events[0]
+    assert streams.streams_count == 1
+    streams.open(flight_seats())
+
+
+def test_stream_slot_is_released_once():
+    async def run():
+        streams = create_streams(Upstream())
+        events = streams.open(flight_seats())
+        await next_event(events)
+        await events.aclose()
+        del events
+        return streams
+
+    assert asyncio.run(run()).streams_count == 0
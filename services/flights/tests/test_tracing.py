@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from flights import dependencies, tracing
+from flights.config import TracingExporter
+
+from . import expected
+from .test_routes import client
+
+exporter = InMemorySpanExporter()
+
+trace_id = "0af7651916cd43dd8448eb211c80319c"
+parent_span_id = "b7ad6b7169203331"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tracer_provider():
+    # The global tracer provider may only be set once, so it is kept for later tests
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+@pytest.fixture(autouse=True)
+def spans():
+    exporter.clear()
+    yield
+    exporter.clear()
+
+
+def test_request_span_continues_caller_trace():
+    response = client.get(
+        f"/flight/{expected.flight_details.existing_flight_id}",
+        headers={"traceparent": f"00-{trace_id}-{parent_span_id}-01"},
+    )
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    request_span = spans["GET /flight/{flightId}"]
+    serialize_span = spans["serialize FlightDetails"]
+    assert response.status_code == 200
+    assert format(request_span.context.trace_id, "032x") == trace_id
+    assert format(request_span.parent.span_id, "016x") == parent_span_id
+    assert request_span.kind == trace.SpanKind.SERVER
+    assert request_span.attributes["http.route"] == "/flight/{flightId}"
+    assert request_span.attributes["http.status_code"] == 200
+    assert serialize_span.parent.span_id == request_span.context.span_id
+
+
+def test_inventory_manager_query_propagates_trace_context(monkeypatch):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"flight": []})
+
+    inventory_manager_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(
+        dependencies, "_inventory_manager_client", inventory_manager_client
+    )
+
+    async def query():
+        with tracing.tracer.start_as_current_span("request") as span:
+            await dependencies.query_inventory_manager(
+                dependencies._get_flights_seats_query, {"flight_ids": []}
+            )
+            return span
+
+    span = asyncio.run(query())
+    asyncio.run(inventory_manager_client.aclose())
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    attempt_span = spans["inventory_manager getFlightsSeats"]
+    _, traceparent_trace_id, traceparent_span_id, _ = (
+        requests[0].headers["traceparent"].split("-")
+    )
+    assert int(traceparent_trace_id, 16) == span.context.trace_id
+    assert int(traceparent_span_id, 16) == attempt_span.context.span_id
+    assert attempt_span.kind == trace.SpanKind.CLIENT
+    assert spans["query_inventory_manager"].parent.span_id == span.context.span_id
+
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    file = tmp_path / "traces.jsonl"
+    provider = tracing.create_tracer_provider(
+        sample_rate=1, exporter=TracingExporter.FILE, file=str(file)
+    )
+    tracer = provider.get_tracer(__name__)
+
+    for name in ["first", "second"]:
+        with tracer.start_as_current_span(name):
+            pass
+    provider.shutdown()
+
+    spans = [json.loads(line) for line in file.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["first", "second"]
+    assert spans[0]["resource"]["service.name"] == "flights"
+
+
+def test_unsampled_traces_are_not_exported(tmp_path):
+    file = tmp_path / "traces.jsonl"
+    provider = tracing.create_tracer_provider(
+        sample_rate=0, exporter=TracingExporter.FILE, file=str(file)
+    )
+
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    provider.shutdown()
+
+    assert file.read_text() == ""
+
+
+def test_console_exporter_writes_to_standard_error(capsys):
+    provider = tracing.create_tracer_provider(
+        sample_rate=1, exporter=TracingExporter.CONSOLE, file=""
+    )
+
+    with provider.get_tracer(__name__).start_as_current_span("span"):
+        pass
+    provider.shutdown()
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert json.loads(captured.err)["name"] == "span"
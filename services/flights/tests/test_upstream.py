@@ -0,0 +1,136 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from flights.exceptions import (
+    ExternalDependencyException,
+    TransientExternalDependencyException,
+)
+from flights.upstream import LatencyTracker, UpstreamCaller
+from flights.util import set_request_deadline
+
+
+def create_caller(**kwargs: Any) -> UpstreamCaller:
+    return UpstreamCaller(
+        **{
+            "retries": 2,
+            "retry_backoff": 0.001,
+            "retry_max_backoff": 0.01,
+            "hedging": False,
+            "hedge_quantile": 0.95,
+            "latency_min_samples": 5,
+            "jitter": lambda: 1.0,
+        }
+        | kwargs
+    )
+
+
+class Upstream:
+    """
+    Serves the queued results, one on each attempt, after the attempt's delay.
+    """
+
+    def __init__(self, *results: tuple[float, str | Exception]):
+        self.results = list(results)
+        self.attempts = 0
+
+    async def attempt(self) -> str:
+        self.attempts += 1
+        delay, result = self.results.pop(0)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_latency_tracker_quantile():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for latency in range(1, 10):
+        tracker.record(latency)
+
+    assert tracker.quantile(0.95) is None
+    tracker.record(10)
+    assert tracker.quantile(0.95) == 10
+    assert tracker.quantile(0.5) == 5
+
+
+def test_call_retries_transient_failures():
+    upstream = Upstream(
+        (0, TransientExternalDependencyException()),
+        (1, "late"),
+        (0, "result"),
+    )
+    caller = create_caller()
+
+    result = asyncio.run(caller.call("op", upstream.attempt, timeout=0.05))
+
+    statistics = caller.statistics["op"]
+    assert result == "result"
+    assert upstream.attempts == 3
+    assert (statistics.retries, statistics.timeouts, statistics.failures) == (2, 1, 0)
+
+
+def test_call_does_not_retry_permanent_failures():
+    upstream = Upstream((0, ExternalDependencyException()))
+    caller = create_caller()
+
+    with pytest.raises(ExternalDependencyException):
+        asyncio.run(caller.call("op", upstream.attempt, timeout=1))
+
+    assert upstream.attempts == 1
+    assert caller.statistics["op"].failures == 1
+
+
+def test_call_fails_after_last_retry():
+    upstream = Upstream(*[(0, TransientExternalDependencyException())] * 2)
+    caller = create_caller(retries=1)
+
+    with pytest.raises(TransientExternalDependencyException):
+        asyncio.run(caller.call("op", upstream.attempt, timeout=1))
+
+    assert upstream.attempts == 2
+    assert caller.statistics["op"].failures == 1
+
+
+def test_call_respects_request_deadline():
+    upstream = Upstream((1, "late"), (0, "result"))
+    caller = create_caller(retry_backoff=0.05)
+
+    async def run():
+        set_request_deadline(0.05)
+        return await caller.call("op", upstream.attempt, timeout=1)
+
+    with pytest.raises(ExternalDependencyException):
+        asyncio.run(run())
+
+    statistics = caller.statistics["op"]
+    assert upstream.attempts == 1
+    assert (statistics.timeouts, statistics.deadline_exceeded) == (1, 1)
+
+
+def test_call_hedges_attempts_slower_than_quantile():
+    upstream = Upstream(*[(0.01, "fast")] * 5, (1, "slow"), (0, "hedged"))
+    caller = create_caller(hedging=True)
+
+    async def run():
+        for _ in range(5):
+            await caller.call("op", upstream.attempt, timeout=1)
+        return await caller.call("op", upstream.attempt, timeout=1)
+
+    result = asyncio.run(run())
+
+    statistics = caller.statistics["op"]
+    assert result == "hedged"
+    assert (statistics.hedges, statistics.hedge_wins) == (1, 1)
+    assert statistics.attempts == 7
+
+
+def test_call_does_not_hedge_before_enough_latencies():
+    upstream = Upstream((0.05, "result"))
+    caller = create_caller(hedging=True)
+
+    result = asyncio.run(caller.call("op", upstream.attempt, timeout=1))
+
+    assert result == "result"
+    assert caller.statistics["op"].hedges == 0
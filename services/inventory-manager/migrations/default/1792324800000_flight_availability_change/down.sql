@@ -0,0 +1,7 @@
+DROP TRIGGER IF EXISTS delete_expired_flight_availability_changes ON flight_availability_change;
+DROP TRIGGER IF EXISTS record_flight_availability_change ON seat_map;
+DROP TRIGGER IF EXISTS record_flight_availability_change ON booked_seat;
+DROP TRIGGER IF EXISTS record_flight_availability_change ON flight;
+DROP FUNCTION IF EXISTS delete_expired_flight_availability_changes();
+DROP FUNCTION IF EXISTS record_flight_availability_change();
+DROP TABLE IF EXISTS flight_availability_change;
@@ -1,11 +1,15 @@
 import json
 import logging
+import queue
+import threading
 import time
+from contextlib import suppress
 from enum import Enum
 from functools import cache
-from typing import Any
+from typing import Any, TextIO
 
-from pydantic import AnyUrl, BaseModel, BaseSettings
+import orjson
+from pydantic import AnyUrl, BaseModel, BaseSettings, Field
 
 
 class LogLevel(str, Enum):
@@ -20,6 +24,15 @@ class LogLevel(str, Enum):
     DEBUG = "DEBUG"
 
 
+class TracingExporter(str, Enum):
+    """
+    Exporter of the spans of traces, as JSON lines.
+    """
+
+    CONSOLE = "console"
+    FILE = "file"
+
+
 class Settings(BaseSettings):
     """
     Provides application setting for the entire application, which are configurable
@@ -31,6 +44,12 @@ class Settings(BaseSettings):
     """
 
     log_level: LogLevel | None = None
+    log_body_sample_rate: float = Field(0.01, ge=0, le=1)
+    log_body_max_size: int = Field(4096, ge=0)
+    tracing: bool = False
+    tracing_sample_rate: float = Field(0.1, ge=0, le=1)
+    tracing_exporter: TracingExporter = TracingExporter.CONSOLE
+    tracing_file: str = "traces.jsonl"
     openapi_server_url: str = "/"
     openapi_schema_prefix: str = "/"
     pnr_db_url: AnyUrl
@@ -114,6 +133,7 @@ class JsonLogFormatter(logging.Formatter):
         time_format: str = "%Y-%m-%dT%H:%M:%S",
         msec_format: str = "%s.%03dZ",
         validate: bool = True,
+        fast: bool = False,
     ):
         """
         Initializes the formatter.
@@ -128,6 +148,11 @@ class JsonLogFormatter(logging.Formatter):
         :param validate: If the fields list should be validated for containing
             supported fields.
             Defaults to True.
+        :param fast: If the logs should be formatted in the fast mode, which caches
+            the formatted time of the current second and encodes the logs with
+            orjson. In this mode, datetimes in extra data are encoded in RFC 3339
+            format.
+            Defaults to False.
 
         :raises ConfigurationException: Raised when validation is enabled and the given
             fields list is invalid.
@@ -138,6 +163,16 @@ class JsonLogFormatter(logging.Formatter):
             self._validate_fields(fields)
 
         self._fields = fields if fields else self.default_fields
+        self._field_attributes = [
+            (field, attribute)
+            for field, attribute in self.fields_mapping.items()
+            if field in self._fields
+        ]
+        self._uses_time = "time" in self._fields
+        self._fast = fast
+        self._time_format = time_format
+        self._msec_format = msec_format
+        self._cached_time: tuple[int, str] = (-1, "")
 
         self.default_time_format = time_format
         self.default_msec_format = msec_format
@@ -153,7 +188,16 @@ class JsonLogFormatter(logging.Formatter):
         """
         Checks if "time" should be used in the log (if is included in the fields list).
         """
-        return "time" in self._fields
+        return self._uses_time
+
+    def _format_time_fast(self, record: logging.LogRecord) -> str:
+        # Only the milliseconds are formatted for records of the last formatted second
+        second = int(record.created)
+        cached_second, formatted_second = self._cached_time
+        if second != cached_second:
+            formatted_second = time.strftime(self._time_format, time.gmtime(second))
+            self._cached_time = (second, formatted_second)
+        return self._msec_format % (formatted_second, record.msecs)
 
     @staticmethod
     def _json_dumps_fallback(o: Any) -> Any:
@@ -164,14 +208,27 @@ class JsonLogFormatter(logging.Formatter):
         else:
             return str(o)
 
+    @staticmethod
+    def _orjson_dumps_fallback(o: Any) -> Any:
+        # orjson natively encodes UUIDs, datetimes, enums and dataclasses
+        if isinstance(o, BaseModel):
+            return o.dict()
+        elif isinstance(o, (set, frozenset)):
+            return list(o)
+        else:
+            return str(o)
+
     def format(self, record: logging.LogRecord) -> str:
         """
         Formats the :class:`logging.LogRecord` to a structured JSON log.
         """
         record.message = record.getMessage().strip()
 
-        if self.usesTime():
-            record.asctime = self.formatTime(record)
+        if self._uses_time:
+            if self._fast:
+                record.asctime = self._format_time_fast(record)
+            else:
+                record.asctime = self.formatTime(record)
 
         if record.exc_info:
             # Cache the traceback text to avoid converting it multiple times
@@ -179,10 +236,10 @@ class JsonLogFormatter(logging.Formatter):
             if not record.exc_text:
                 record.exc_text = self.formatException(record.exc_info)
 
-        message_dict: dict[str, Any] = {}
-        for field, attribute in self.fields_mapping.items():
-            if field in self._fields:
-                message_dict[field] = getattr(record, attribute)
+        message_dict: dict[str, Any] = {
+            field: getattr(record, attribute)
+            for field, attribute in self._field_attributes
+        }
 
         if extra := record.__dict__.get("extra"):
             message_dict["extra"] = extra
@@ -199,9 +256,128 @@ class JsonLogFormatter(logging.Formatter):
         if record.stack_info:
             message_dict["extra"]["stackFrame"] = self.formatStack(record.stack_info)
 
+        if self._fast:
+            return orjson.dumps(
+                message_dict,
+                default=JsonLogFormatter._orjson_dumps_fallback,
+                option=orjson.OPT_NON_STR_KEYS,
+            ).decode()
         return json.dumps(message_dict, default=JsonLogFormatter._json_dumps_fallback)
 
 
+class LogDropPolicy(str, Enum):
+    """
+    Which log records are dropped by a :class:`QueuedStreamHandler` when its queue
+    is full.
+    """
+
+    NEWEST = "newest"
+    OLDEST = "oldest"
+
+
+class QueuedStreamHandler(logging.StreamHandler):
+    """
+    :class:`logging.StreamHandler` which formats and writes the records to the stream
+    in a background writer thread, so that logging never blocks on the stream (e.g.
+    when the stream is consumed slowly by the container log driver).
+
+    The records are handed to the writer thread through a bounded queue. When the
+    queue is full, records are dropped according to the drop policy, and are
+    counted by the ``dropped`` attribute. The writer reports the number of dropped
+    records once it catches up.
+
+    Can be configured in a logging configuration file like a
+    :class:`logging.StreamHandler`, with the additional ``queue_size`` and
+    ``drop_policy`` parameters.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        queue_size: int = 10000,
+        drop_policy: str = LogDropPolicy.NEWEST,
+    ):
+        """
+        Initializes the handler and starts its writer thread.
+
+        :param stream: The stream to write the records to. Defaults to stderr.
+        :param queue_size: The maximal number of records waiting to be written.
+            Defaults to 10000.
+        :param drop_policy: Which records are dropped when the queue is full: the
+            ``newest`` records, which are not queued, or the ``oldest`` queued
+            records. Defaults to newest.
+        """
+        super().__init__(stream)
+        self.drop_policy = LogDropPolicy(drop_policy)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: queue.Queue[logging.LogRecord | None] = queue.Queue(queue_size)
+        self._writer = threading.Thread(
+            target=self._write, name="log-writer", daemon=True
+        )
+        self._writer.start()
+
+    def emit(self, record: logging.LogRecord):
+        """
+        Queues the record to be written, or drops a record if the queue is full.
+        """
+        try:
+            # Merge the message arguments now, as they may change after logging
+            record.msg = record.getMessage()
+            record.args = None
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.drop_policy == LogDropPolicy.OLDEST:
+                with suppress(queue.Empty, queue.Full):
+                    self._queue.get_nowait()
+                    self._queue.put_nowait(record)
+
+    def _write(self):
+        while (record := self._queue.get()) is not None:
+            self._write_record(record)
+            if self._queue.empty() and self.dropped > self._reported_dropped:
+                self._report_dropped()
+
+    def _write_record(self, record: logging.LogRecord):
+        # Unlike StreamHandler.emit, the handler's lock is not acquired for flushing,
+        # as it is held by the logging threads while they queue the records
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _report_dropped(self):
+        dropped = self.dropped
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records, as the log queue was full",
+            args=(dropped - self._reported_dropped,),
+            exc_info=None,
+        )
+        self._reported_dropped = dropped
+        self._write_record(record)
+
+    def close(self):
+        """
+        Writes the queued records and stops the writer thread.
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        super().close()
+
+
 def config_logging():
     """
     Configures logging for the application. Should be called before instantiating
@@ -1,16 +1,23 @@
 import logging
 
 from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
+from opentelemetry.trace import SpanKind
 
 from .config import get_settings
+from .metrics import PnrDbPoolListener, observe_pnr_db_operation
 from .models import PnrValidationDetails
 from .schemas import LoginDetails
+from .tracing import trace_context_headers, tracer
 from .util import log_query
 
 log = logging.getLogger(__name__)
 
 settings = get_settings()
-client = AsyncIOMotorClient(settings.pnr_db_url, uuidRepresentation="standard")
+client = AsyncIOMotorClient(
+    settings.pnr_db_url,
+    uuidRepresentation="standard",
+    event_listeners=[PnrDbPoolListener()],
+)
 db = client[settings.pnr_db_name]
 pnrs = db[settings.pnr_db_collection_name]
 
@@ -23,13 +30,21 @@ async def validate_login_details(
         "_id": 1,
         "contact": {"firstName": 1, "surname": 1},
     }
-    pnr_dict = await pnrs.find_one(query, projection)
+    with tracer.start_as_current_span(
+        "pnr_db findOne", kind=SpanKind.CLIENT
+    ), observe_pnr_db_operation("findOne"):
+        # The trace context is attached to the query as a comment, which is logged
+        # by the database (e.g. in its profiler and slow query log)
+        traceparent = trace_context_headers().get("traceparent")
+        pnr_dict = await pnrs.find_one(query, projection, comment=traceparent)
 
     log_query(
         log,
         "Queried the PNR database successfully",
         query={"type": "findOne", "body": query, "projection": projection},
         response=pnr_dict,
+        body_sample_rate=settings.log_body_sample_rate,
+        max_body_size=settings.log_body_max_size,
     )
 
     if pnr_dict is None:
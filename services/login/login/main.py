@@ -1,5 +1,4 @@
 import logging
-import time
 from datetime import datetime, timedelta, timezone
 
 import jwt
@@ -7,8 +6,9 @@ from fastapi import Depends, FastAPI, Request, Response, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
-from . import docs
+from . import docs, metrics, openapi
 from .config import Settings, config_logging, get_settings
 from .dependencies import validate_login_details
 from .exceptions import (
@@ -16,11 +16,14 @@ from .exceptions import (
     ErrorDetails,
     ExternalDependencyException,
 )
+from .middleware import AccessLogMiddleware, MetricsMiddleware
 from .models import PnrValidationDetails
 from .schemas import AccessToken
-from .util import UuidJsonEncoder, log_access
+from .tracing import config_tracing, shutdown_tracing
+from .util import UuidJsonEncoder
 
 config_logging()
+config_tracing()
 log = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -36,20 +39,21 @@ app = FastAPI(
     root_path_in_servers=False,
 )
 
+REGISTRY.register(metrics.LogRecordsDroppedCollector())
 
-@app.middleware("http")
-async def access_log_middleware(request: Request, call_next):
-    start_time = datetime.utcnow()
-    start_measure_ns = time.perf_counter_ns()
 
-    response: Response = await call_next(request)
+@app.on_event("startup")
+def load_openapi():
+    openapi.load_openapi(app)
 
-    duration_ns = time.perf_counter_ns() - start_measure_ns
-    end_time = datetime.utcnow()
 
-    log_access(log, request, response, start_time, end_time, duration_ns)
+@app.on_event("shutdown")
+def stop_tracing():
+    shutdown_tracing()
 
-    return response
+
+app.add_middleware(AccessLogMiddleware, logger=log)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -82,6 +86,11 @@ async def request_exception_handler(request: Request, exc: ExternalDependencyExc
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 @app.post(
     "/login",
     response_model=AccessToken,
@@ -0,0 +1,168 @@
+import logging
+import time
+import weakref
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, Metric
+from pymongo import monitoring
+from starlette.applications import Starlette
+from starlette.types import Scope
+
+from .config import QueuedStreamHandler
+
+REQUEST_DURATION = Histogram(
+    "login_http_request_duration_seconds",
+    "Duration of HTTP requests until their response is sent, in seconds",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "login_http_requests_in_flight",
+    "Number of HTTP requests currently being handled",
+)
+PNR_DB_OPERATION_DURATION = Histogram(
+    "login_pnr_db_operation_duration_seconds",
+    "Duration of PNR database operations, in seconds",
+    ["operation", "outcome"],
+)
+PNR_DB_POOL_CONNECTIONS = Gauge(
+    "login_pnr_db_pool_connections",
+    "Number of open connections in the PNR database connection pools",
+)
+PNR_DB_POOL_CHECKED_OUT_CONNECTIONS = Gauge(
+    "login_pnr_db_pool_checked_out_connections",
+    "Number of connections checked out of the PNR database connection pools",
+)
+PNR_DB_POOL_CHECKOUT_FAILURES = Counter(
+    "login_pnr_db_pool_checkout_failures",
+    "Number of failures to check out a connection of the PNR database connection pools",
+)
+
+UNMATCHED_ROUTE = "unmatched"
+ROUTE_LABEL_SCOPE_KEY = "login.route_label"
+
+_route_paths: "weakref.WeakKeyDictionary[Starlette, tuple[int, dict[Any, str]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def route_label(scope: Scope) -> str:
+    """
+    Gets the path template of the route which handled a request, so that requests
+    are labeled by a bounded set of routes rather than by their paths.
+
+    The route is found by the endpoint which the router matched and recorded in the
+    request's scope, so it should be called after the request was handled. The label
+    is stored in the scope, so that it is only found once per request.
+
+    :param scope: The ASGI scope of the handled request.
+    :return: The route's path template, e.g. ``/login``.
+    """
+    label: str | None = scope.get(ROUTE_LABEL_SCOPE_KEY)
+    if label is None:
+        label = UNMATCHED_ROUTE
+        if "app" in scope and "endpoint" in scope:
+            paths = _get_route_paths(scope["app"])
+            label = paths.get(scope["endpoint"], UNMATCHED_ROUTE)
+        scope[ROUTE_LABEL_SCOPE_KEY] = label
+    return label
+
+
+def _get_route_paths(app: Starlette) -> dict[Any, str]:
+    """
+    :return: The path templates of an application's routes, by their endpoints.
+        Rebuilt when routes are added to the application.
+    """
+    routes_count, paths = _route_paths.get(app, (-1, {}))
+    if routes_count != len(app.routes):
+        paths = {}
+        for route in reversed(app.routes):
+            endpoint = getattr(route, "endpoint", getattr(route, "app", None))
+            path = getattr(route, "path", None)
+            if endpoint is not None and path is not None:
+                # The first route of an endpoint is the one matched by the router
+                paths[endpoint] = path
+        _route_paths[app] = (len(app.routes), paths)
+    return paths
+
+
+@contextmanager
+def observe_pnr_db_operation(operation: str) -> Iterator[None]:
+    """
+    Observes the duration and outcome of a PNR database operation: ``success`` or
+    ``error``.
+
+    :param operation: The name of the operation, e.g. ``findOne``.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        PNR_DB_OPERATION_DURATION.labels(operation, outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+class PnrDbPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Tracks the connections of the PNR database connection pools in metrics.
+    """
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        PNR_DB_POOL_CONNECTIONS.inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        PNR_DB_POOL_CONNECTIONS.dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        PNR_DB_POOL_CHECKOUT_FAILURES.inc()
+
+    def connection_checked_out(self, event):
+        PNR_DB_POOL_CHECKED_OUT_CONNECTIONS.inc()
+
+    def connection_checked_in(self, event):
+        PNR_DB_POOL_CHECKED_OUT_CONNECTIONS.dec()
+
+
+def log_records_dropped() -> int:
+    """
+    :return: The number of log records dropped by the queued log handlers of the
+        service's loggers.
+    """
+    handlers = {*logging.getLogger().handlers, *logging.getLogger("login").handlers}
+    return sum(h.dropped for h in handlers if isinstance(h, QueuedStreamHandler))
+
+
+class LogRecordsDroppedCollector:
+    """
+    Exports the number of dropped log records when the metrics are scraped.
+    """
+
+    def collect(self) -> Iterable[Metric]:
+        yield CounterMetricFamily(
+            "login_log_records_dropped",
+            "Number of log records dropped as the log queue was full",
+            value=log_records_dropped(),
+        )
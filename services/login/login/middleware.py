@@ -0,0 +1,88 @@
+import logging
+import time
+
+from fastapi import Request, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT, route_label
+from .tracing import end_request_span, start_request_span
+from .util import log_access
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware which logs the access details of each HTTP request once its
+    response is sent, and traces it in a span.
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        :param logger: The logger instance to be used for logging.
+        """
+        self.app = app
+        self.logger = logger
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time_ns = time.time_ns()
+        start_measure_ns = time.perf_counter_ns()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request = Request(scope)
+        with start_request_span(request) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                end_request_span(span, scope["method"], route_label(scope), status_code)
+                duration_ns = time.perf_counter_ns() - start_measure_ns
+                log_access(self.logger, scope, status_code, start_time_ns, duration_ns)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware which observes the duration of each HTTP request until its
+    response is sent, including streaming responses, and the number of requests in
+    flight.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Initializes the middleware.
+
+        :param app: The wrapped ASGI application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            with REQUESTS_IN_FLIGHT.track_inprogress():
+                await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_DURATION.labels(
+                scope["method"], route_label(scope), status_code
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,147 @@
+import sys
+from typing import ContextManager
+
+from fastapi import Request
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+from .config import TracingExporter, get_settings
+
+SERVICE_NAME = "login"
+
+tracer = trace.get_tracer("login")
+"""
+The tracer of the login service. Its spans are not recorded unless tracing is
+enabled with :func:`config_tracing`.
+"""
+
+
+# Only W3C trace context is propagated, so the propagator is used directly rather than
+# through opentelemetry.propagate, whose import loads the configured propagators from
+# all the installed distributions' entry points, which slows down startup
+_propagator = TraceContextTextMapPropagator()
+
+
+def _format_span(span: ReadableSpan) -> str:
+    return span.to_json(indent=None) + "\n"
+
+
+class _FileSpanExporter(ConsoleSpanExporter):
+    """
+    Exports spans as JSON lines to a file, which is closed on shutdown.
+    """
+
+    def __init__(self, file: str):
+        super().__init__(out=open(file, "a", encoding="utf-8"), formatter=_format_span)
+
+    def shutdown(self):
+        self.out.close()
+
+
+def create_tracer_provider(
+    *,
+    sample_rate: float,
+    exporter: TracingExporter,
+    file: str,
+) -> TracerProvider:
+    """
+    Creates a tracer provider, which exports the sampled spans as JSON lines.
+
+    Requests which are part of a trace sampled by the caller (according to their
+    ``traceparent`` header) are always sampled.
+
+    :param sample_rate: The ratio of traces to sample, between 0 and 1.
+    :param exporter: Where to export the spans to.
+    :param file: The path of the file to export the spans to, if exported to a file.
+    :return: The tracer provider.
+    """
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+    )
+    span_exporter: SpanExporter
+    if exporter == TracingExporter.FILE:
+        span_exporter = _FileSpanExporter(file)
+    else:
+        span_exporter = ConsoleSpanExporter(out=sys.stderr, formatter=_format_span)
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    return provider
+
+
+def config_tracing():
+    """
+    Configures tracing for the application, if enabled with environment variables.
+    Should be called before instantiating the application object.
+    """
+    settings = get_settings()
+    if settings.tracing:
+        trace.set_tracer_provider(
+            create_tracer_provider(
+                sample_rate=settings.tracing_sample_rate,
+                exporter=settings.tracing_exporter,
+                file=settings.tracing_file,
+            )
+        )
+
+
+def shutdown_tracing():
+    """
+    Exports the remaining spans, if tracing is enabled.
+    Should be called once on application shutdown.
+    """
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+
+def start_request_span(request: Request) -> ContextManager[Span]:
+    """
+    Starts the server span of a request, as a child of the caller's span if the
+    request has W3C trace context headers (i.e. ``traceparent``).
+
+    :param request: The handled request.
+    :return: A context manager of the request's span, which is the current span
+        within it.
+    """
+    return tracer.start_as_current_span(
+        f"HTTP {request.method}",
+        context=_propagator.extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    )
+
+
+def end_request_span(span: Span, method: str, route: str, status_code: int):
+    """
+    Names the server span of a request after its route, and records its response.
+
+    :param span: The request's span.
+    :param method: The request's method.
+    :param route: The path template of the route which handled the request.
+    :param status_code: The response's status code.
+    """
+    span.update_name(f"{method} {route}")
+    span.set_attribute("http.route", route)
+    span.set_attribute("http.status_code", status_code)
+    if status_code >= 500:
+        span.set_status(Status(StatusCode.ERROR))
+
+
+def trace_context_headers() -> dict[str, str]:
+    """
+    :return: The W3C trace context headers (i.e. ``traceparent``) of the current
+        span, for propagating it to an external dependency. Empty if the current
+        span is not recorded.
+    """
+    headers: dict[str, str] = {}
+    _propagator.inject(headers)
+    return headers
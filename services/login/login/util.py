@@ -1,12 +1,14 @@
+import json
 import logging
-from datetime import datetime
+import random
+from datetime import datetime, timedelta, timezone
 from json import JSONEncoder
 from typing import Any
 from uuid import UUID
 
-import fastapi
 from humps import camelize
 from pydantic import BaseModel
+from starlette.types import Scope
 
 
 class CamelCaseModel(BaseModel):
@@ -24,10 +26,9 @@ class UuidJsonEncoder(JSONEncoder):
 
 def log_access(
     logger: logging.Logger,
-    request: fastapi.Request,
-    response: fastapi.Response,
-    start_time: datetime,
-    end_time: datetime,
+    scope: Scope,
+    status_code: int,
+    start_time_ns: int,
     duration_ns: int,
     *,
     level: int = logging.INFO,
@@ -36,36 +37,43 @@ def log_access(
     """
     Logs HTTP access details (request and response details).
 
+    The details are only gathered and formatted if the logger is enabled for the
+    given level.
+
     :param logger: The logger instance to be used for logging.
-    :param request: The request to log.
-    :param response: The corresponding response to the request to log.
-    :param start_time: The time the request was received.
-    :param end_time: The time the response was received.
-    :param duration_ns: The time duration it took to process the request and get a
-        response, in nanoseconds.
+    :param scope: The ASGI scope of the request to log.
+    :param status_code: The status code of the request's response.
+    :param start_time_ns: The time the request was received, in nanoseconds since
+        the epoch.
+    :param duration_ns: The time duration it took to process the request and send
+        its response, in nanoseconds.
     :param level: The logging level for this log. Defaults to INFO.
-    :param time_format: Format for start_time and end_time in parameters using
+    :param time_format: Format for the start and end times of the request using
         datetime.datetime.strftime formatting.
     """
-    duration_ms = duration_ns // 1_000_000
+    if not logger.isEnabledFor(level):
+        return
 
-    path = request.url.path
-    if query := request.url.query:
-        path += f"?{query}"
+    path = scope.get("root_path", "") + scope["path"]
+    if query := scope["query_string"]:
+        path += f"?{query.decode('latin-1')}"
+    host, port = scope.get("client") or (None, None)
+    start_time = datetime.fromtimestamp(start_time_ns / 1e9, timezone.utc)
+    end_time = start_time + timedelta(microseconds=duration_ns // 1000)
 
     params = {
-        "host": request.client.host,
-        "method": request.method,
+        "host": host,
+        "method": scope["method"],
         "path": path,
-        "duration": duration_ms,
-        "responseCode": response.status_code,
+        "duration": duration_ns // 1_000_000,
+        "responseCode": status_code,
     }
     extra = {
         "type": "access",
         "startTime": start_time.strftime(time_format),
         "endTime": end_time.strftime(time_format),
-        "port": request.client.port,
-        "httpVersion": request.scope.get("http_version", None),
+        "port": port,
+        "httpVersion": scope.get("http_version", None),
     }
 
     logger.log(
@@ -76,6 +84,16 @@ def log_access(
     )
 
 
+def _capped_body(body: Any, max_size: int | None) -> Any:
+    if max_size is None:
+        return body
+    content = json.dumps(body, cls=UuidJsonEncoder).encode()
+    if len(content) <= max_size:
+        return body
+    truncated = content[:max_size].decode(errors="ignore")
+    return f"{truncated}... (truncated, {len(content)} bytes)"
+
+
 def log_query(
     logger: logging.Logger,
     message: str,
@@ -83,20 +101,32 @@ def log_query(
     query: dict[str, Any],
     response: dict[str, Any] | None,
     level: int = logging.INFO,
+    body_sample_rate: float = 1.0,
+    max_body_size: int | None = None,
 ):
     """
     Logs a MongoDB query with its response.
 
+    The query and response are only included in a sample of the logs, and are
+    truncated to a maximal size. Nothing is done if the logger is not enabled for
+    the given level.
+
     :param logger: The logger instance to be used for logging.
     :param message: The message to add to the log.
     :param args: Arguments for the message parameter format string.
     :param query: The query used to get the response.
     :param response: The response object to log.
     :param level: The logging level for this log. Defaults to INFO.
+    :param body_sample_rate: The ratio of logs which include the query and response,
+        between 0 and 1. Defaults to 1.
+    :param max_body_size: The size in bytes of the JSON encoded query and response
+        above which they are truncated. Defaults to no truncation.
     """
-    extras = {
-        "type": "query",
-        "query": query,
-        "response": response,
-    }
+    if not logger.isEnabledFor(level):
+        return
+
+    extras: dict[str, Any] = {"type": "query"}
+    if random.random() < body_sample_rate:
+        extras["query"] = _capped_body(query, max_body_size)
+        extras["response"] = _capped_body(response, max_body_size)
     logger.log(level, message, *args, extra={"extra": extras})
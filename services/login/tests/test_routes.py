@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import datetime, timedelta
 from uuid import UUID
@@ -7,6 +8,7 @@ import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from login import openapi
 from login.dependencies import validate_login_details
 from login.main import app
 from login.models import ContactDetails, PnrValidationDetails
@@ -135,3 +137,39 @@ def test_invalid_login(request_body, expected_response):
 
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     assert response.json() == expected_response
+
+
+def test_metrics():
+    client.post("/login", json={})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {
+        line.split(" ")[0] for line in response.text.splitlines() if line[0] != "#"
+    }
+    assert (
+        'login_http_request_duration_seconds_count{method="POST",'
+        'route="/login",status="422"}'
+    ) in samples
+    assert "login_http_requests_in_flight" in samples
+
+
+def test_prebuilt_openapi_is_up_to_date():
+    # If this fails, regenerate the document with: python -m login.openapi
+    assert openapi.OPENAPI_PATH.read_text() == openapi.dump_openapi(
+        openapi.generate_openapi(app)
+    )
+
+
+def test_prebuilt_openapi_is_served(monkeypatch):
+    monkeypatch.setattr(app, "openapi_schema", None)
+    openapi.load_openapi(app)
+
+    response = client.get("/openapi.json")
+
+    assert response.status_code == 200
+    assert response.json() == json.loads(openapi.OPENAPI_PATH.read_text()) | {
+        "servers": app.servers
+    }